@@ -12,55 +12,58 @@ from models.city import City
 from models.amenity import Amenity
 
 # Import data
-from data import FileStorage
+from data import storage
 from data import (
     country_data, place_data, amenity_data,
     place_to_amenity_data, review_data, user_data, city_data
 )
 
 # Import utility function
-from utils import pretty_json
+from utils import paginate, pretty_json, stream_json_fragments
+
+# Import the serializers, the response cache, row fragments and conditional GET support
+from api.response_cache import response_cache
+from api.fragments import FragmentCache
+from api.serializers import serializer
+from api.conditional import conditional, row_not_modified, with_row_validators
 
 # Create a blueprint
 amenity_api = Blueprint('amenity_api', __name__)
 
+# compiled once, see api.serializers
+serialize_amenity = serializer("Amenity")
+
+
+amenity_fragments = FragmentCache(amenity_data, serialize_amenity)
+
+
 # GET - Retrieve a list of all amenities.
 @amenity_api.route('/amenities', methods=["GET"])
+@conditional(amenity_data)
+@response_cache.cached(amenity_data)
 def amenities_get():
-    """return all amenities"""
-    amenities_info = []
+    """return all amenities, or a page of them (see utils.paginate)"""
 
-    for amenity_value in amenity_data.values():
-        amenity_id = amenity_value["id"]
-        amenities_info.append({
-            "id": amenity_id,
-            "name": amenity_value['name'],
-            "created_at": datetime.fromtimestamp(amenity_value['created_at']).isoformat(),
-            "updated_at": datetime.fromtimestamp(amenity_value['updated_at']).isoformat()
-        })
+    rows, headers = paginate(amenity_data)
 
-    return pretty_json(amenities_info), 200
+    return stream_json_fragments(rows, amenity_fragments), 200, headers
 
 # GET - Retrieve detailed information about a specific amenity by its ID.
 @amenity_api.route('/amenities/<amenity_id>', methods=["GET"])
 def amenity_specific_get(amenity_id):
     """returns specified amenity"""
 
-    for amenity_value in amenity_data.values():
-        if amenity_value["id"] == amenity_id:
-            data = amenity_value
-            break
-    else:
+    data = amenity_data.get(amenity_id)
+    if data is None:
         abort(404, f"Amenity: {amenity_id} not found")
 
-    amenity_info = {
-        "id": amenity_id,
-        "name": data['name'],
-        "created_at": datetime.fromtimestamp(amenity_value['created_at']).isoformat(),
-        "updated_at": datetime.fromtimestamp(amenity_value['updated_at']).isoformat()
-    }
+    not_modified = row_not_modified(data)
+    if not_modified is not None:
+        return not_modified
+
+    amenity_info = serialize_amenity(data)
 
-    return pretty_json(amenity_info), 200
+    return with_row_validators(pretty_json(amenity_info), data), 200
 
 # POST - Create a new amenity.
 @amenity_api.route('/amenities', methods=["POST"])
@@ -82,24 +85,20 @@ def create_new_amenity():
     except ValueError as exc:
         abort(400, repr(exc))
 
-    amenity_data[new_amenity.id] = {
+    new_amenity_data = {
         "id": new_amenity.id,
         "name": new_amenity.name,
         "created_at": new_amenity.created_at,
         "updated_at": new_amenity.updated_at
     }
+    amenity_data.insert(new_amenity_data)
 
     try:
-        FileStorage.save_model_data("amenity_data.json", amenity_data)
+        storage.save_table(amenity_data)
     except Exception as e:
         abort(500, f"Failed to save date: {str(e)}")
 
-    attribs = {
-        "id": new_amenity.id,
-        "name": new_amenity.name,
-        "created_at": datetime.fromtimestamp(new_amenity.created_at).isoformat(),
-        "updated_at": datetime.fromtimestamp(new_amenity.updated_at).isoformat()
-    }
+    attribs = serialize_amenity(new_amenity_data)
     return pretty_json(attribs), 200
 
 
@@ -112,27 +111,21 @@ def update_amenity(amenity_id):
 
     update_data = request.get_json()
 
-    for amenity_value in amenity_data.values():
-        if amenity_value["id"] == amenity_id:
-            found_amenity_data = amenity_value
-            break
-    else:
+    if amenity_id not in amenity_data:
         abort(404, f"Amenity ID not found: {amenity_id}")
 
+    changes = {}
     if "name" in update_data:
-        found_amenity_data["name"] = update_data["name"]
+        changes["name"] = update_data["name"]
+    changes["updated_at"] = datetime.now().timestamp()
+    found_amenity_data = amenity_data.update(amenity_id, changes)
 
     try:
-        FileStorage.save_model_data("amenity_data.json", amenity_data)
+        storage.save_table(amenity_data)
     except Exception as e:
         abort(500, f"Failed to save date: {str(e)}")
 
-    attribs = {
-        "id": found_amenity_data["id"],
-        "name": found_amenity_data["name"],
-        "created_at": datetime.fromtimestamp(found_amenity_data["created_at"]).isoformat(),
-        "updated_at": datetime.fromtimestamp(found_amenity_data["updated_at"]).isoformat()
-    }
+    attribs = serialize_amenity(found_amenity_data)
 
     return pretty_json(attribs), 200
 
@@ -141,20 +134,13 @@ def update_amenity(amenity_id):
 def delete_amenity(amenity_id):
     """Deletes an existing amenity by amenity_id"""
 
-    keys_to_delete = []
-
-    for amenity_key, amenity_value in list(amenity_data.items()):
-        if amenity_value["id"] == amenity_id:
-            keys_to_delete.append(amenity_key)
-
-    if not keys_to_delete:
+    if amenity_id not in amenity_data:
         abort(404, f"Amenity not found with ID: {amenity_id}")
 
-    for amenity_key in keys_to_delete:
-        del amenity_data[amenity_key]
+    amenity_data.delete(amenity_id)
 
     try:
-        FileStorage.save_model_data("amenity_data.json", amenity_data)
+        storage.save_table(amenity_data)
     except Exception as e:
         abort(500, f"Failed to save date: {str(e)}")
 
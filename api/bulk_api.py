@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+
+import io
+from flask import Blueprint, request, abort
+
+# Import data
+from data.bulk import ENTITIES, bulk_import
+
+# Import utility functions
+from utils import pretty_json
+
+# Create a blueprint
+bulk_api = Blueprint('bulk_api', __name__)
+
+
+# POST - Bulk import of NDJSON rows (one JSON object per line), e.g.
+# curl -X POST [URL]/api/v1/bulk/users -H "Content-Type: application/x-ndjson" --data-binary @users.ndjson
+@bulk_api.route('/bulk/<entity>', methods=["POST"])
+def bulk_import_rows(entity):
+    """ imports the rows of the request body, reporting the rows that failed """
+    if entity not in ENTITIES:
+        abort(404, f"Unknown entity: {entity}")
+
+    # the body is read line by line as the import goes
+    lines = io.TextIOWrapper(request.stream, encoding="utf-8")
+
+    try:
+        # validated in this process: a pool of workers would be forked from
+        # the threaded server (see data.bulk.bulk_import)
+        report = bulk_import(entity, lines, workers=0)
+    except UnicodeDecodeError as e:
+        abort(400, f"Invalid NDJSON data: {str(e)}")
+    except Exception as e:
+        abort(500, f"Failed to save data: {str(e)}")
+
+    return pretty_json(report), 200
@@ -12,56 +12,58 @@ from models.city import City
 from models.amenity import Amenity
 
 # Import data
-from data import FileStorage
+from data import storage
 from data import (
     country_data, place_data, amenity_data,
     place_to_amenity_data, review_data, user_data, city_data
 )
 
 # Import utility functions
-from utils import pretty_json
+from utils import paginate, pretty_json, stream_json_fragments
+
+# Import the serializers, the response cache, row fragments and conditional GET support
+from api.response_cache import response_cache
+from api.fragments import FragmentCache
+from api.serializers import serializer
+from api.conditional import conditional, row_not_modified, with_row_validators
 
 # Creates a blueprint 
 city_api = Blueprint('city api', __name__)
 
+# compiled once, see api.serializers
+serialize_city = serializer("City")
+
+
+city_fragments = FragmentCache(city_data, serialize_city)
+
+
 # GET - Retrieve all cities.
 @city_api.route('/cities', methods=["GET"])
+@conditional(city_data)
+@response_cache.cached(city_data)
 def get_cities():
-    """return all cities """
-    cities_info = []
+    """return all cities, or a page of them (see utils.paginate) """
 
-    for city_value in city_data.values():
-        cities_info.append({
-            "id": city_value["id"],
-            "country_id": city_value["country_id"],
-            "name": city_value["name"],
-            "created_at": datetime.fromtimestamp(city_value["created_at"]).isoformat(),
-            "updated_at": datetime.fromtimestamp(city_value["updated_at"]).isoformat()
-        })
+    rows, headers = paginate(city_data)
 
-    return pretty_json(cities_info)
+    return stream_json_fragments(rows, city_fragments), 200, headers
 
 # GET - Retrieve details of a specific city by its ID.
 @city_api.route('/cities/<city_id>', methods=["GET"])
 def get_specific_city(city_id):
     """get specific city"""
 
-    for city_value in city_data.values():
-        if city_value["id"] == city_id:
-            data = city_value
-            break
-    else:
+    data = city_data.get(city_id)
+    if data is None:
         abort(404, f"User: {city_id} not found")
 
-    city_info = {
-        "id": data["id"],
-        "country_id": data["country_id"],
-        "name": data["name"],
-        "created_at": datetime.fromtimestamp(data["created_at"]).isoformat(),
-        "updated_at": datetime.fromtimestamp(data["updated_at"]).isoformat()
-    }
+    not_modified = row_not_modified(data)
+    if not_modified is not None:
+        return not_modified
+
+    city_info = serialize_city(data)
 
-    return pretty_json(city_info), 200
+    return with_row_validators(pretty_json(city_info), data), 200
 
 # POST - Create a new city.
 @city_api.route('/cities', methods=["POST"])
@@ -86,26 +88,21 @@ def create_new_city():
     except ValueError as exc:
         abort(400, repr(exc))
 
-    city_data[new_city.id] = {
+    new_city_data = {
         "id": new_city.id,
         "country_id": new_city.country_id,
         "name": new_city.name,
         "created_at": new_city.created_at,
         "updated_at": new_city.updated_at
     }
+    city_data.insert(new_city_data)
 
     try:
-        FileStorage.save_model_data("city_data.json", city_data)
+        storage.save_table(city_data)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
-    attribs = {
-        "id": new_city.id,
-        "country_id": new_city.country_id,
-        "name": new_city.name,
-        "created_at": datetime.fromtimestamp(new_city.created_at).isoformat(),
-        "updated_at": datetime.fromtimestamp(new_city.updated_at).isoformat()
-    }
+    attribs = serialize_city(new_city_data)
 
     return pretty_json(attribs), 200
 
@@ -118,28 +115,21 @@ def update_city_data(city_id):
 
     new_data = request.get_json()
 
-    for city_value in city_data.values():
-        if city_value["id"] == city_id:
-            found_city_data = city_value
-            break
-    else:
+    if city_id not in city_data:
         abort(404, "City ID not found: {city_id}")
 
+    changes = {}
     if "name" in new_data:
-        found_city_data["name"] = new_data["name"]
+        changes["name"] = new_data["name"]
+    changes["updated_at"] = datetime.now().timestamp()
+    found_city_data = city_data.update(city_id, changes)
 
     try:
-        FileStorage.save_model_data("city_data.json", city_data)
+        storage.save_table(city_data)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
-    attribs = {
-        "id": found_city_data["id"],
-        "country+id": found_city_data["country_id"],
-        "name": found_city_data["name"],
-        "created_at": datetime.fromtimestamp(found_city_data["created_at"]).isoformat(),
-        "updated_at": datetime.fromtimestamp(found_city_data["updated_at"]).isoformat()
-    }
+    attribs = serialize_city(found_city_data)
 
     return pretty_json(attribs), 200
 
@@ -148,21 +138,14 @@ def update_city_data(city_id):
 def delete_a_city(city_id):
     """delete a specific city"""
 
-    keys_to_delete = []
-
-    for city_key, city_value in list(city_data.items()):
-        if city_value["id"] == city_id:
-            keys_to_delete.append(city_key)
-
-    if not keys_to_delete:
+    if city_id not in city_data:
         abort(404, f"Place not found with ID: {city_id}")
 
-    # Remove the place(s) from the dictionary
-    for city_key in keys_to_delete:
-        del city_data[city_key]
+    # Remove the city from the repository
+    city_data.delete(city_id)
 
     try:
-        FileStorage.save_model_data("city_data.json", city_data)
+        storage.save_table(city_data)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
     # Return a confirmation message
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""This module defines conditional GET support for hbnb evolution
+
+Responses carry an ETag and a Last-Modified header, and a request whose
+If-None-Match (or, failing that, If-Modified-Since) shows the client's
+copy is still current gets an empty 304 Not Modified instead.
+
+The validators are never computed from the body. A row's ETag is made
+of its id and updated_at. A collection's is made of a version of each
+table it is read from: when the storage is shared between processes,
+the table's counter in the shared state (see storage.shared_version),
+which every worker holding the same data agrees on; otherwise the
+table's in-memory version (see Repository.version), tagged with a token
+of this process. Answering a repeated poll costs a few attribute reads.
+
+Last-Modified has whole seconds: it is not sent while its second is
+still running, as a later write in that second would not change it.
+"""
+
+import functools
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import Response, make_response, request
+from data import storage
+
+# in-memory table versions only mean something within this process: tag
+# them so an ETag handed out before a restart, or by another worker, never matches
+_PROCESS = uuid.uuid4().hex[:12]
+
+
+def conditional(*tables):
+    """ Decorator adding validators to a view reading tables, and answering 304 when they match """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # taken before the response is computed: a write made meanwhile
+            # gives a newer ETag, so the client's copy is never taken as current
+            etag = "-".join(_table_version(table) for table in tables)
+            modified = max(table.modified for table in tables)
+            if _is_current(etag, modified):
+                return _not_modified(etag, modified)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def _table_version(table):
+    """ Version of table for the ETag: the shared one if there is one, else this process's """
+    # read first: it loads the table, whose shared version is then known
+    version = table.version
+    shared = storage.shared_version(table.name)
+    if shared is not None:
+        return shared
+    return "{}.{}".format(_PROCESS, version)
+
+
+def row_not_modified(row):
+    """ A 304 response if the client's copy of row is current, else None """
+    etag, modified = _row_validators(row)
+    if _is_current(etag, modified):
+        return _not_modified(etag, modified)
+    return None
+
+
+def with_row_validators(response, row):
+    """ Add the ETag and Last-Modified of row to response """
+    _set_validators(response, *_row_validators(row))
+    return response
+
+
+def _row_validators(row):
+    """ (ETag, modification time) of a row; every update sets its updated_at """
+    return "{}-{!r}".format(row["id"], row["updated_at"]), row["updated_at"]
+
+
+def _is_current(etag, modified):
+    """ Whether the request's conditional headers match the validators """
+    if request.if_none_match:
+        # If-Modified-Since is ignored when If-None-Match is sent
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since is not None and _settled(modified):
+        # HTTP dates have whole seconds
+        return int(modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def _settled(modified):
+    """ Whether the second of modified is over, so that it can be sent as Last-Modified """
+    return int(modified) < int(time.time())
+
+
+def _not_modified(etag, modified):
+    """ An empty 304 response with the validators """
+    return _set_validators(Response(status=304), etag, modified)
+
+
+def _set_validators(response, etag, modified):
+    """ Set the ETag and Last-Modified headers """
+    response.set_etag(etag)
+    if _settled(modified):
+        response.last_modified = datetime.fromtimestamp(int(modified), timezone.utc)
+    return response
@@ -12,7 +12,7 @@ from models.city import City
 from models.amenity import Amenity
 
 # Import data
-from data import FileStorage
+from data import storage
 from data import (
     country_data, place_data, amenity_data,
     place_to_amenity_data, review_data, user_data, city_data
@@ -20,53 +20,59 @@ from data import (
 
 
 # Import utility functions
-from utils import pretty_json
+from utils import paginate, pretty_json, stream_json_fragments
+
+# Import the serializers, the response cache, row fragments and conditional GET support
+from api.response_cache import response_cache
+from api.fragments import FragmentCache
+from api.serializers import serializer
+from api.conditional import conditional, row_not_modified, with_row_validators
 
 # Create a blueprint
 country_api = Blueprint('country_api', __name__)
 
+# compiled once, see api.serializers
+serialize_country = serializer("Country")
+serialize_city = serializer("City")
+
 
 # Examples
 @country_api.route('/example/country_data')
 def example_country_data():
     """ Example to show that we can view data loaded in the data module's init """
-    return jsonify(country_data)
+    return jsonify(country_data.to_dict())
+
+
+country_fragments = FragmentCache(country_data, serialize_country)
+
 
 # GET - Retrieve all pre-loaded countries
 @country_api.route('/countries', methods=["GET"])
+@conditional(country_data)
+@response_cache.cached(country_data)
 def countries_get():
-    """ returns all countires data """
+    """ returns all countires data, or a page of them (see utils.paginate) """
 
-    countries_info = []
-    for country_value in country_data.values():
-        countries_info.append({
-            "id": country_value["id"],
-            "name": country_value["name"],
-            "code": country_value["code"],
-            "created_at": datetime.fromtimestamp(country_value["created_at"]).isoformat(),
-            "updated_at": datetime.fromtimestamp(country_value["updated_at"]).isoformat()
-        })
+    rows, headers = paginate(country_data)
 
-    return pretty_json(countries_info), 200
+    return stream_json_fragments(rows, country_fragments), 200, headers
 
 # GET - Retrieve details of a specific country by its code.
 @country_api.route('/countries/<country_code>', methods=["GET"])
 def countries_specific_get(country_code):
     """ returns specific country data """
 
-    for country_value in country_data.values():
-        if country_value['code'] == country_code:
-            data = country_value
+    data = country_data.find_one_by("code", country_code)
+    if data is None:
+        abort(404, f"Country: {country_code} is not found")
+
+    not_modified = row_not_modified(data)
+    if not_modified is not None:
+        return not_modified
 
-    country_info = {
-        "id": data['id'],
-        "name": data['name'],
-        "code": data['code'],
-        "created_at": datetime.fromtimestamp(data['created_at']).isoformat(),
-        "updated_at": datetime.fromtimestamp(data['updated_at']).isoformat()
-    }
+    country_info = serialize_country(data)
 
-    return pretty_json(country_info), 200
+    return with_row_validators(pretty_json(country_info), data), 200
 
 # GET - Retrieve all cities of a specific country.
 @country_api.route('/countries/<country_code>/cities', methods=["GET"])
@@ -74,25 +80,13 @@ def countries_specific_cities_get(country_code):
     """ returns all cities data of a specified country """
 
     cities_data = []
-    found_country_id = None
 
-    for country_value in country_data.values():
-        if country_value["code"] == country_code:
-            found_country_id = country_value["id"]
-            break
-
-    if not found_country_id:
+    found_country = country_data.find_one_by("code", country_code)
+    if found_country is None:
         abort(404, f"Country: {country_code} is not found")
 
-    for city_value in city_data.values():
-        if city_value["country_id"] == found_country_id:
-            cities_data.append({
-                "id": city_value["id"],
-                "country_id": city_value["country_id"],
-                "name": city_value["name"],
-                "created_at": datetime.fromtimestamp(city_value["created_at"]).isoformat(),
-                "updated_at": datetime.fromtimestamp(city_value["updated_at"]).isoformat()
-            })
+    for city_value in city_data.find_by("country_id", found_country["id"]):
+        cities_data.append(serialize_city(city_value))
 
     return pretty_json(cities_data), 200
 
@@ -121,26 +115,21 @@ def create_new_country():
     except ValueError as exc:
         abort(400, repr(exc))
 
-    country_data[new_country.id] = {
+    new_country_data = {
         "id": new_country.id,
         "name": new_country.name,
         "code": new_country.code,
         "created_at": new_country.created_at,
         "updated_at": new_country.updated_at
     }
+    country_data.insert(new_country_data)
 
     try:
-        FileStorage.save_model_data("country_data.json", country_data)
+        storage.save_table(country_data)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
-    attribs = {
-        "id": new_country.id,
-        "name": new_country.name,
-        "code": new_country.code,
-        "created_at": datetime.fromtimestamp(new_country.created_at).isoformat(),
-        "updated_at": datetime.fromtimestamp(new_country.updated_at).isoformat()
-    }
+    attribs = serialize_country(new_country_data)
 
     return pretty_json(attribs), 200
 
@@ -157,33 +146,27 @@ def update_country(country_code):
 
     new_data = request.get_json()
 
-    # Search for the country with the specified country_code
-    for country_value in country_data.values():
-        if country_value["code"] == country_code:
-            found_country_data = country_value
-            break
-    else:
+    # Look up the country with the specified country_code
+    found_country_data = country_data.find_one_by("code", country_code)
+    if found_country_data is None:
         abort(404, f"Country not found: {country_code}")
 
     # Update country attributes if new data is provided
+    changes = {}
     if "name" in new_data:
-        found_country_data["name"] = new_data["name"]
+        changes["name"] = new_data["name"]
     if "code" in new_data:
-        found_country_data["code"] = new_data["code"]
+        changes["code"] = new_data["code"]
+    changes["updated_at"] = datetime.now().timestamp()
+    found_country_data = country_data.update(found_country_data["id"], changes)
 
     try:
-        FileStorage.save_model_data("country_data.json", country_data)
+        storage.save_table(country_data)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
     # Prepare response attributes with updated timestamps as datetime objects
-    attribs = {
-        "id": found_country_data["id"],
-        "name": found_country_data["name"],
-        "code": found_country_data["code"],
-        "created_at": datetime.fromtimestamp(found_country_data["created_at"]).isoformat(),
-        "updated_at": datetime.fromtimestamp(found_country_data["updated_at"]).isoformat()
-    }
+    attribs = serialize_country(found_country_data)
 
     return pretty_json(attribs), 200
 
@@ -192,21 +175,17 @@ def update_country(country_code):
 def delete_country(country_code):
     """Deletes an existing user by user_id"""
 
-    keys_to_delete = []
-
-    for country_key, country_value in list(country_data.items()):
-        if country_value["code"] == country_code:
-            keys_to_delete.append(country_key)
+    keys_to_delete = [country_value["id"] for country_value in country_data.find_by("code", country_code)]
 
     if not keys_to_delete:
         abort(404, f"Place not found with ID: {country_code}")
 
     # Remove the place(s) from the dictionary
     for country_key in keys_to_delete:
-        del country_data[country_key]
+        country_data.delete(country_key)
 
     try:
-        FileStorage.save_model_data("country_data.json", country_data)
+        storage.save_table(country_data)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+
+from flask import Blueprint, Response, request, abort
+
+# Import data
+from data.bulk import TABLES
+from data.export import export_ndjson, parse_since
+
+# Create a blueprint
+export_api = Blueprint('export_api', __name__)
+
+
+# GET - Stream every row of a table as NDJSON, e.g.
+# /api/v1/export/places?city_id=...&since=2024-05-01T00:00:00
+# Filters must be on indexed fields; since keeps the rows updated at or after it.
+@export_api.route('/export/<entity>', methods=["GET"])
+def export_entity(entity):
+    """ streams the rows of a table as NDJSON """
+    if entity not in TABLES:
+        abort(404, f"Unknown entity: {entity}")
+
+    filters = request.args.to_dict()
+    since = None
+    if "since" in filters:
+        try:
+            since = parse_since(filters.pop("since"))
+        except ValueError:
+            abort(400, "Invalid since: must be a timestamp or an ISO date")
+
+    # the filters are checked here: once streaming, it's too late for a 400
+    try:
+        chunks = export_ndjson(entity, filters, since)
+    except ValueError as exc:
+        abort(400, str(exc))
+
+    return Response(chunks, mimetype="application/x-ndjson")
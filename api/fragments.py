@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""This module defines the per-row JSON fragment cache of the list endpoints for hbnb evolution"""
+
+import threading
+
+
+class FragmentCache():
+    """ Encoded JSON of each row's public view, reused until the row changes
+
+    Rows are never changed in place (an update stores a new dict, see
+    Repository.update), so a fragment stays valid for as long as the row
+    it was encoded from is the one in the table: each entry keeps that
+    row and is only used while it is the very same object. Snapshots and
+    forks share their unchanged rows, so they share fragments too.
+
+    Entries for rows that were deleted or replaced are dropped once there
+    are twice as many entries as rows in the table.
+    """
+
+    def __init__(self, table, render):
+        """ constructor """
+        self.table = table
+        # row -> dict of the public view (what the endpoint returns for it)
+        self.render = render
+        # row id -> (row, utf-8 encoded JSON of render(row))
+        self.__fragments = {}
+        self.__lock = threading.Lock()
+
+    def get(self, row, dumps):
+        """ The encoded JSON of render(row), with dumps used to encode it if need be """
+        entry = self.__fragments.get(row["id"])
+        if entry is not None and entry[0] is row:
+            return entry[1]
+
+        fragment = dumps(self.render(row)).encode("utf-8")
+        self.__fragments[row["id"]] = (row, fragment)
+        if len(self.__fragments) > 2 * len(self.table) + 1024:
+            self.__prune()
+        return fragment
+
+    def clear(self):
+        """ Drop every fragment """
+        with self.__lock:
+            self.__fragments = {}
+
+    def __len__(self):
+        return len(self.__fragments)
+
+    def __prune(self):
+        """ Drop the fragments of rows no longer in the table """
+        with self.__lock:
+            table = self.table
+            self.__fragments = {row_id: entry for row_id, entry in list(self.__fragments.items())
+                                if table.get(row_id) is entry[0]}
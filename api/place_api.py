@@ -12,99 +12,83 @@ from models.city import City
 from models.amenity import Amenity
 
 # Import data
-from data import FileStorage
+from data import storage
 from data import (
     country_data, place_data, amenity_data,
     place_to_amenity_data, review_data, user_data, city_data
 )
 
 # Import utility functions
-from utils import pretty_json
+from utils import paginate, pretty_json, stream_json_fragments, stream_json_object
+
+# Import the serializers, the response cache, row fragments and conditional GET support
+from api.response_cache import response_cache
+from api.fragments import FragmentCache
+from api.serializers import serializer
+from api.conditional import conditional, row_not_modified, with_row_validators
 
 # Create a blueprint
 place_api = Blueprint('place_api', __name__)
 
+# compiled once, see api.serializers
+serialize_place = serializer("Place")
+
 
 @place_api.route('/example/places_amenties_raw')
 def example_places_amenities_raw():
     """ Prints out the raw data for relationships between places and their amenities """
-    return jsonify(place_to_amenity_data)
+    return jsonify(dict(place_to_amenity_data))
 
 
 @place_api.route('/places_amenties', methods=["GET"])
+@conditional(place_to_amenity_data, place_data, amenity_data)
+@response_cache.cached(place_to_amenity_data, place_data, amenity_data)
 def places_amenties():
     """ Prints out the relationships between places and their amenities using names """
 
-    output = {}
-
+    # place name -> ids of the places with that name; the amenity names
+    # are only looked up as each place is written out
+    place_keys = {}
     for place_key in place_to_amenity_data:
         place_name = place_data[place_key]['name']
-        if place_name not in output:
-            output[place_name] = []
+        place_keys.setdefault(place_name, []).append(place_key)
+
+    def amenity_names(place_name):
+        return [amenity_data[amenity_key]['name']
+                for place_key in place_keys[place_name]
+                for amenity_key in place_to_amenity_data.get(place_key, [])]
 
-        amenities_ids = place_to_amenity_data[place_key]
-        for amenity_key in amenities_ids:
-            amenity_name = amenity_data[amenity_key]['name']
-            output[place_name].append(amenity_name)
+    return stream_json_object((place_name, amenity_names(place_name)) for place_name in sorted(place_keys))
 
-    return pretty_json(output)
+
+place_fragments = FragmentCache(place_data, serialize_place)
 
 
 @place_api.route('/places', methods=["GET"])
+@conditional(place_data)
+@response_cache.cached(place_data)
 def place_amenties():
-    """get all places data"""
-
-    places_info = []
-
-    for place_value in place_data.values():
-        places_info.append({
-            "id": place_value["id"],
-            "host_user_id": place_value["host_user_id"],
-            "city_id": place_value["city_id"],
-            "name": place_value["name"],
-            "description": place_value["description"],
-            "address": place_value["address"],
-            "latitude": place_value["latitude"],
-            "longitude": place_value["longitude"],
-            "number_of_rooms": place_value["number_of_rooms"],
-            "bathrooms": place_value["bathrooms"],
-            "price_per_night": place_value["price_per_night"],
-            "max_guests": place_value["max_guests"],
-            "created_at": datetime.fromtimestamp(place_value["created_at"]).isoformat(),
-            "updated_at": datetime.fromtimestamp(place_value["updated_at"]).isoformat()
-        })
-
-    return pretty_json(places_info), 200
+    """get all places data, or a page of them (see utils.paginate)"""
+
+    rows, headers = paginate(place_data)
+
+    return stream_json_fragments(rows, place_fragments), 200, headers
 
 
 @place_api.route('/places/<place_id>', methods=["GET"])
 def place_info(place_id):
     """get sepecific info of a place"""
-    for place_value in place_data.values():
-        if place_value["id"] == place_id:
-            found_place = place_value
-            break
-    else:
+    found_place = place_data.get(place_id)
+    if found_place is None:
         abort(404, f"Place: {place_id} not found")
 
-    place_info = {
-        "id": found_place["id"],
-        "host_user_id": found_place["host_user_id"],
-        "city_id": found_place["city_id"],
-        "name": found_place["name"],
-        "description": found_place["description"],
-        "address": found_place["address"],
-        "latitude": found_place["latitude"],
-        "longitude": found_place["longitude"],
-        "number_of_rooms": found_place["number_of_rooms"],
-        "bathrooms": found_place["bathrooms"],
-        "price_per_night": found_place["price_per_night"],
-        "max_guests": found_place["max_guests"],
-        "created_at": datetime.fromtimestamp(found_place["created_at"]).isoformat(),
-        "updated_at": datetime.fromtimestamp(found_place["updated_at"]).isoformat()
-    }
+    not_modified = row_not_modified(found_place)
+    if not_modified is not None:
+        return not_modified
+
+    place_info = serialize_place(found_place)
 
-    return pretty_json(place_info), 200
+    return with_row_validators(pretty_json(place_info), found_place), 200
 
 
 @place_api.route('/places', methods=["POST"])
@@ -138,7 +122,13 @@ def create_place_info():
     except ValueError as exc:
         abort(400, repr(exc))
 
-    place_data[new_place.id] = {
+    # optional list of the place's amenities, saved together with the place
+    amenity_ids = data.get("amenity_ids", [])
+    for amenity_id in amenity_ids:
+        if amenity_id not in amenity_data:
+            abort(400, f"Amenity not found: {amenity_id}")
+
+    new_place_data = {
         "id": new_place.id,
         "host_user_id": new_place.host_user_id,
         "city_id": new_place.city_id,
@@ -156,26 +146,14 @@ def create_place_info():
     }
 
     try:
-        FileStorage.save_model_data("place_data.json", place_data)
+        with storage.transaction() as transaction:
+            transaction.insert(place_data, new_place_data)
+            for amenity_id in amenity_ids:
+                transaction.link(place_to_amenity_data, new_place.id, amenity_id)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
-    attribs = {
-        "id": new_place.id,
-        "host_user_id": new_place.host_user_id,
-        "city_id": new_place.city_id,
-        "name": new_place.name,
-        "description": new_place.description,
-        "address": new_place.address,
-        "latitude": new_place.latitude,
-        "longitude": new_place.longitude,
-        "number_of_rooms": new_place.number_of_rooms,
-        "bathrooms": new_place.bathrooms,
-        "price_per_night": new_place.price_per_night,
-        "max_guests": new_place.max_guests,
-        "created_at": datetime.fromtimestamp(new_place.created_at).isoformat(),
-        "updated_at": datetime.fromtimestamp(new_place.updated_at).isoformat()
-    }
+    attribs = serialize_place(new_place_data)
 
     return pretty_json(attribs), 200
 
@@ -188,43 +166,24 @@ def update_place_info(place_id):
 
     new_data = request.get_json()
 
-    for place_value in place_data.values():
-        if place_value["id"] == place_id:
-            found_place_data = place_value
-            break
-    else:
+    if place_id not in place_data:
         abort(404, f"Place ID not found: {place_id}")
 
     # List of fields that can be updated
     updated_fields = ["name", "description", "address", "latitude", "longitude",
                       "number_of_rooms", "bathrooms", "price_per_night", "max_guests"]
 
-    # use for loop for updateing fields
-    for field in updated_fields:
-        if field in new_data:
-            found_place_data[field] = new_data[field]
+    # only pass through the fields that can be updated
+    changes = {field: new_data[field] for field in updated_fields if field in new_data}
+    changes["updated_at"] = datetime.now().timestamp()
+    found_place_data = place_data.update(place_id, changes)
 
     try:
-        FileStorage.save_model_data("place_data.json", place_data)
+        storage.save_table(place_data)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
-    attribs = {
-        "id": found_place_data["id"],
-        "host_user_id": found_place_data["host_user_id"],
-        "city_id": found_place_data["city_id"],
-        "name": found_place_data["name"],
-        "description": found_place_data["description"],
-        "address": found_place_data["address"],
-        "latitude": found_place_data["latitude"],
-        "longitude": found_place_data["longitude"],
-        "number_of_rooms": found_place_data["number_of_rooms"],
-        "bathrooms": found_place_data["bathrooms"],
-        "price_per_night": found_place_data["price_per_night"],
-        "max_guests": found_place_data["max_guests"],
-        "created_at": datetime.fromtimestamp(found_place_data["created_at"]).isoformat(),
-        "updated_at": datetime.fromtimestamp(found_place_data["updated_at"]).isoformat()
-    }
+    attribs = serialize_place(found_place_data)
 
     return pretty_json(attribs), 200
 
@@ -233,22 +192,15 @@ def update_place_info(place_id):
 def delete_place_info(place_id):
     """delete a place"""
 
-    # Create a list of keys in place_data
-    keys_to_delete = []
-
-    for place_key, place_value in list(place_data.items()):
-        if place_value["id"] == place_id:
-            keys_to_delete.append(place_key)
-
-    if not keys_to_delete:
+    if place_id not in place_data:
         abort(404, f"Place not found with ID: {place_id}")
 
-    # Remove the place(s) from the dictionary
-    for place_key in keys_to_delete:
-        del place_data[place_key]
-
     try:
-        FileStorage.save_model_data("place_data.json", place_data)
+        # Remove the place from the repository, along with its amenity links
+        with storage.transaction() as transaction:
+            transaction.delete(place_data, place_id)
+            for amenity_id in place_to_amenity_data.get(place_id, []):
+                transaction.unlink(place_to_amenity_data, place_id, amenity_id)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+"""This module defines the response cache of the GET endpoints for hbnb evolution"""
+
+import functools
+import threading
+from collections import OrderedDict
+from flask import Response, make_response, request
+
+# Import data
+from data import response_cache_bytes
+
+
+class ResponseCache():
+    """ LRU cache of GET responses, keyed by path and query string
+
+    Each entry remembers the versions of the tables the response was
+    computed from (see Repository.version). Every write to a table moves
+    its version, so an entry is only served while none of its tables has
+    changed since, however the change was made.
+
+    The bodies held are capped at max_bytes in total; the least recently
+    used entries are evicted to make room, and a response bigger than an
+    eighth of the cap is not cached at all.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        """ constructor """
+        self.max_bytes = max_bytes
+        # key -> (versions, status, headers, body)
+        self.__entries = OrderedDict()
+        self.__size = 0
+        self.__lock = threading.Lock()
+        self.__stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    def cached(self, *tables):
+        """ Decorator caching a view's successful responses until one of tables changes """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.max_bytes <= 0:
+                    return view(*args, **kwargs)
+
+                key = request.full_path
+                # taken before the response is computed: a write made
+                # meanwhile makes the entry stale straight away
+                versions = tuple(table.version for table in tables)
+
+                entry = self.__get(key, versions)
+                if entry is not None:
+                    _, status, headers, body = entry
+                    return Response(body, status=status, headers=headers)
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    self.__capture(key, versions, response)
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """ Return the hit, miss, stale hit and eviction counters and the memory used """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["entries"] = len(self.__entries)
+            stats["bytes"] = self.__size
+            stats["max_bytes"] = self.max_bytes
+
+        return stats
+
+    def clear(self):
+        """ Drop every entry """
+        with self.__lock:
+            self.__entries.clear()
+            self.__size = 0
+
+    def __get(self, key, versions):
+        """ The entry for key if it is still current, else None """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__stats["misses"] += 1
+                return None
+            if entry[0] != versions:
+                self.__stats["stale"] += 1
+                self.__remove(key)
+                return None
+
+            self.__stats["hits"] += 1
+            self.__entries.move_to_end(key)
+            return entry
+
+    def __capture(self, key, versions, response):
+        """ Cache a response once its body is complete """
+        headers = [(name, value) for name, value in response.headers
+                   if name.lower() != "content-length"]
+
+        if not response.is_streamed:
+            self.__put(key, (versions, response.status_code, headers, response.get_data()))
+            return
+
+        # keep streaming: copy the chunks as they go out, and give up on
+        # caching as soon as the body gets too big
+        chunks = response.response
+        limit = self.max_bytes // 8
+
+        def tee():
+            body = []
+            size = 0
+            for chunk in chunks:
+                if body is not None:
+                    data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                    size += len(data)
+                    if size <= limit:
+                        body.append(data)
+                    else:
+                        body = None
+                yield chunk
+            if body is not None:
+                self.__put(key, (versions, response.status_code, headers, b"".join(body)))
+
+        response.response = tee()
+
+    def __put(self, key, entry):
+        """ Add an entry, evicting the least recently used ones to stay under max_bytes """
+        size = len(key) + len(entry[3])
+        if size > self.max_bytes // 8:
+            return
+
+        with self.__lock:
+            self.__remove(key)
+            self.__entries[key] = entry
+            self.__size += size
+            while self.__size > self.max_bytes:
+                oldest = next(iter(self.__entries))
+                self.__remove(oldest)
+                self.__stats["evictions"] += 1
+
+    def __remove(self, key):
+        """ Drop an entry, if there is one (callers hold the lock) """
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.__size -= len(key) + len(entry[3])
+
+
+response_cache = ResponseCache(max_bytes=response_cache_bytes)
@@ -12,7 +12,7 @@ from models.city import City
 from models.amenity import Amenity
 
 # Import data
-from data import FileStorage
+from data import storage
 from data import (
     country_data, place_data, amenity_data,
     place_to_amenity_data, review_data, user_data, city_data
@@ -20,67 +20,89 @@ from data import (
 
 
 # Import utility functions
-from utils import pretty_json
+from utils import PAGE_ARGS, paginate, pretty_json, stream_json_object
+
+# Import the serializers, the response cache and conditional GET support
+from api.response_cache import response_cache
+from api.serializers import serializer
+from api.conditional import conditional
 
 # Create a blueprint
 review_api = Blueprint('review_api', __name__)
 
+# compiled once, see api.serializers
+serialize_review = serializer("Review")
+serialize_review_summary = serializer("ReviewSummary")
 
 
 @review_api.route('/reviews', methods=["GET"])
+@conditional(review_data, place_data, user_data)
+@response_cache.cached(review_data, place_data, user_data)
 def reviews_get():
-    """return all reviews"""
-    reviewer_data = {}
-
-    for review_value in review_data.values():
-        review_place_id = review_value["place_id"]
-        place_name = place_data[review_place_id]["name"]
-        commentor_id = review_value["commentor_user_id"]
-        reviewer_first_name = user_data[commentor_id]["first_name"]
-        reviewer_last_name = user_data[commentor_id]["last_name"]
+    """return all reviews, or a page of them (see utils.paginate), grouped by place name"""
+    # read all three tables as of the same moment, whatever gets written meanwhile
+    reviews, places, users = storage.snapshot(review_data, place_data, user_data)
 
-        if place_name not in reviewer_data:
-            reviewer_data[place_name] = []
+    if not reviews:
+        abort(404, "No Reviews available")
 
-        reviewer_data[place_name].append({
-            "review": review_value["feedback"],
-            "rating": f"{review_value['rating']} / 5",
-            "reviewer": f"{reviewer_first_name} {reviewer_last_name}",
-            "created_at": datetime.fromtimestamp(review_value['created_at']).isoformat(),
-            "updated_at": datetime.fromtimestamp(review_value['updated_at']).isoformat()
-        })
+    def review_info(review_value):
+        commentor_id = review_value["commentor_user_id"]
+        reviewer_first_name = users[commentor_id]["first_name"]
+        reviewer_last_name = users[commentor_id]["last_name"]
+
+        summary = serialize_review_summary(review_value)
+        summary["reviewer"] = f"{reviewer_first_name} {reviewer_last_name}"
+        return summary
+
+    if any(arg in request.args for arg in PAGE_ARGS):
+        # a page is small enough to be grouped up front
+        rows, headers = paginate(reviews)
+        reviewer_data = {}
+        for review_value in rows:
+            place_name = places[review_value["place_id"]]["name"]
+            reviewer_data.setdefault(place_name, []).append(review_info(review_value))
+
+        return pretty_json(reviewer_data), 200, headers
+
+    # place name -> ids of the places with that name (as an ordered set);
+    # the reviews themselves are only formatted as they are written out
+    place_ids = {}
+    for review_value in reviews.iter_rows():
+        review_place_id = review_value["place_id"]
+        place_name = places[review_place_id]["name"]
+        place_ids.setdefault(place_name, {})[review_place_id] = None
 
-    if not review_data:
-        abort(404, "No Reviews available")
+    def reviewer_data(place_name):
+        return [review_info(review_value)
+                for review_place_id in place_ids[place_name]
+                for review_value in reviews.iter_rows("place_id", review_place_id)]
 
-    return pretty_json(reviewer_data), 200
+    return stream_json_object((place_name, reviewer_data(place_name)) for place_name in sorted(place_ids)), 200
 
 
 @review_api.route('/places/<place_id>/reviews', methods=['GET'])
+@conditional(review_data, place_data, user_data)
+@response_cache.cached(review_data, place_data, user_data)
 def reviews_specific_get(place_id):
     """returns specufued review of a place"""
 
     reviewer_data = {}
 
-    # Iterate through review_data to find reviews matching place_id
-    for review_value in review_data.values():
-        if review_value["place_id"] == place_id:
-            review_place_id = review_value["place_id"]
-            place_name = place_data[review_place_id]["name"]
-            commentor_id = review_value["commentor_user_id"]
-            reviewer_first_name = user_data[commentor_id]["first_name"]
-            reviewer_last_name = user_data[commentor_id]["last_name"]
-
-            if place_name not in reviewer_data:
-                reviewer_data[place_name] = []
-
-            reviewer_data[place_name].append({
-                "review": review_value["feedback"],
-                "rating": f"{review_value['rating']} / 5",
-                "reviewer": f"{reviewer_first_name} {reviewer_last_name}",
-                "created_at": datetime.fromtimestamp(review_value['created_at']).isoformat(),
-                "updated_at": datetime.fromtimestamp(review_value['updated_at']).isoformat()
-            })
+    # Use the place_id index to find the reviews of this place only
+    for review_value in review_data.find_by("place_id", place_id):
+        review_place_id = review_value["place_id"]
+        place_name = place_data[review_place_id]["name"]
+        commentor_id = review_value["commentor_user_id"]
+        reviewer_first_name = user_data[commentor_id]["first_name"]
+        reviewer_last_name = user_data[commentor_id]["last_name"]
+
+        if place_name not in reviewer_data:
+            reviewer_data[place_name] = []
+
+        summary = serialize_review_summary(review_value)
+        summary["reviewer"] = f"{reviewer_first_name} {reviewer_last_name}"
+        reviewer_data[place_name].append(summary)
 
     if not reviewer_data:
         abort(404, f"No reviews found for place with ID: {place_id}")
@@ -94,10 +116,7 @@ def get_specific_review_from_user(user_id):
 
     reviewer_data = {}
 
-    for review_value in review_data.values():
-        if review_value["commentor_user_id"] != user_id:
-            continue
-
+    for review_value in review_data.find_by("commentor_user_id", user_id):
         try:
             place_id = review_value["place_id"]
             place_name = place_data[place_id]["name"]
@@ -111,16 +130,12 @@ def get_specific_review_from_user(user_id):
         if place_name not in reviewer_data:
             reviewer_data[place_name] = []
 
-        reviewer_data[place_name].append({
-            "review_id": review_value["id"],
-            "place_id": place_id,
-            "place_name": place_name,
-            "review": review_value["feedback"],
-            "rating": f"{review_value['rating']} / 5",
-            "reviewer": f"{reviewer_first_name} {reviewer_last_name}",
-            "created_at": datetime.fromtimestamp(review_value['created_at']).isoformat(),
-            "updated_at": datetime.fromtimestamp(review_value['updated_at']).isoformat()
-        })
+        summary = serialize_review_summary(review_value)
+        summary["review_id"] = review_value["id"]
+        summary["place_id"] = place_id
+        summary["place_name"] = place_name
+        summary["reviewer"] = f"{reviewer_first_name} {reviewer_last_name}"
+        reviewer_data[place_name].append(summary)
 
     if not reviewer_data:
         abort(404, f"No reviews found for user with ID: {user_id}")
@@ -134,22 +149,11 @@ def get_specific_review(review_id):
 
     review_info = []
 
-    for review_value in review_data.values():
-        if review_value["id"] == review_id:
-            data = review_value
-
-    if data["id"] != review_id:
+    data = review_data.get(review_id)
+    if data is None:
         abort(400, f"Review: {review_id} not found")
 
-    review_infos = {
-        "id": data["id"],
-        "commentor_user_id": data["commentor_user_id"],
-        "place_id": data["place_id"],
-        "feedback": data["feedback"],
-        "rating": data["rating"],
-        "created_at": datetime.fromtimestamp(data['created_at']).isoformat(),
-        "updated_at": datetime.fromtimestamp(data['updated_at']).isoformat()
-    }
+    review_infos = serialize_review(data)
     review_info.append(review_infos)
 
     return pretty_json(review_info), 200
@@ -182,7 +186,7 @@ def create_new_review(place_id):
     except ValueError as exc:
         abort(400, repr(exc))
 
-    review_data[new_review.id] = {
+    new_review_data = {
         "id": new_review.id,
         "commentor_user_id": new_review.commentor_user_id,
         "place_id": new_review.place_id,
@@ -191,21 +195,14 @@ def create_new_review(place_id):
         "created_at": new_review.created_at,
         "updated_at": new_review.updated_at
     }
+    review_data.insert(new_review_data)
 
     try:
-        FileStorage.save_model_data("review_data.json", review_data)
+        storage.save_table(review_data)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
-    attribs = {
-        "id": new_review.id,
-        "commentor_user_id": new_review.commentor_user_id,
-        "place_id": new_review.place_id,
-        "feedback": new_review.feedback,
-        "rating": new_review.rating,
-        "created_at": datetime.fromtimestamp(new_review.created_at).isoformat(),
-        "updated_at": datetime.fromtimestamp(new_review.updated_at).isoformat()
-    }
+    attribs = serialize_review(new_review_data)
 
     return pretty_json(attribs), 201
 
@@ -219,33 +216,25 @@ def update_review(place_id):
 
     new_data = request.get_json()
 
-    for review_value in review_data.values():
-        if review_value["place_id"] == place_id:
-            found_review_data = review_value
-            break
-    else:
+    found_review_data = review_data.find_one_by("place_id", place_id)
+    if found_review_data is None:
         abort(404, f"Review for the place: {place_id} is not found")
 
     # only feedback and rating are allowed to be modified
+    changes = {}
     if "feedback" in new_data:
-        found_review_data["feedback"] = new_data["feedback"]
+        changes["feedback"] = new_data["feedback"]
     if "rating" in new_data:
-        found_review_data["rating"] = new_data["rating"]
+        changes["rating"] = new_data["rating"]
+    changes["updated_at"] = datetime.now().timestamp()
+    found_review_data = review_data.update(found_review_data["id"], changes)
 
     try:
-        FileStorage.save_model_data("review_data.json", review_data)
+        storage.save_table(review_data)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
-    attribs = {
-        "id": found_review_data["id"],
-        "commentor_user_id": found_review_data["commentor_user_id"],
-        "place_id": found_review_data["place_id"],
-        "feedback": found_review_data["feedback"],
-        "rating": found_review_data["rating"],
-        "created_at": datetime.fromtimestamp(found_review_data["created_at"]).isoformat(),
-        "updated_at": datetime.fromtimestamp(found_review_data["updated_at"]).isoformat()
-    }
+    attribs = serialize_review(found_review_data)
 
     return pretty_json(attribs), 200
 
@@ -254,21 +243,14 @@ def update_review(place_id):
 def delete_review(review_id):
     """delete a review of a place"""
 
-    keys_to_delete = []
-
-    for review_key, review_value in list(review_data.items()):
-        if review_value["id"] == review_id:
-            keys_to_delete.append(review_key)
-
-    if not keys_to_delete:
+    if review_id not in review_data:
         abort(404, f"Place not found with ID: {review_id}")
 
-    # Remove the place(s) from the dictionary
-    for review_key in keys_to_delete:
-        del review_data[review_key]
+    # Remove the review from the repository
+    review_data.delete(review_id)
 
     try:
-        FileStorage.save_model_data("review_data.json", review_data)
+        storage.save_table(review_data)
     except Exception as e:
         abort(500, f"Failed to save data: {str(e)}")
 
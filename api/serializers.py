@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+"""This module defines the serializers turning stored rows into their API representation
+
+Each model's representation is declared once, as a list of fields, and
+compiled into a function whose body is a single dict literal, just like
+the ones the routes used to write out by hand:
+
+    register("Country", ["id", "name", "code", ("created_at", "isoformat"), ...])
+
+generates
+
+    def serialize_country(row):
+        return {'id': row['id'], 'name': row['name'], 'code': row['code'],
+                'created_at': _fromtimestamp(row['created_at']).isoformat(), ...}
+
+so looking the fields up in the spec costs nothing per row. A field is
+either the name of a column, copied as is, or (key, converter) or
+(key, converter, column) with one of the CONVERTERS below.
+"""
+
+from datetime import datetime
+
+# converter name -> function applied to the column's value ('isoformat'
+# and 'datetime' are written inline in the generated code)
+CONVERTERS = {
+    "isoformat": lambda value: datetime.fromtimestamp(value).isoformat(),
+    "datetime": datetime.fromtimestamp,
+    "rating": lambda value: f"{value} / 5"
+}
+
+# model name -> compiled serializer
+_serializers = {}
+
+
+def compile_serializer(name, fields):
+    """ Generate the function turning a row into a dict of the given fields """
+    items = []
+    for field in fields:
+        if isinstance(field, str):
+            key, converter, column = field, None, field
+        elif len(field) == 2:
+            (key, converter), column = field, field[0]
+        else:
+            key, converter, column = field
+
+        value = "row[{!r}]".format(column)
+        if converter == "isoformat":
+            value = "_fromtimestamp({}).isoformat()".format(value)
+        elif converter == "datetime":
+            value = "_fromtimestamp({})".format(value)
+        elif converter is not None:
+            if converter not in CONVERTERS:
+                raise ValueError("Unknown converter for field '{}': {}".format(key, converter))
+            value = "_convert_{}({})".format(converter, value)
+        items.append("{!r}: {}".format(key, value))
+
+    function_name = "serialize_{}".format("".join(c if c.isalnum() else "_" for c in name.lower()))
+    source = "def {}(row):\n    return {{{}}}\n".format(function_name, ", ".join(items))
+
+    namespace = {"_convert_" + converter: function for converter, function in CONVERTERS.items()}
+    namespace["_fromtimestamp"] = datetime.fromtimestamp
+    exec(compile(source, "<serializer {}>".format(name), "exec"), namespace)
+    serializer = namespace[function_name]
+    serializer.source = source
+    return serializer
+
+
+def register(name, fields):
+    """ Compile and register the serializer of a model (or of one of its views) """
+    _serializers[name] = compile_serializer(name, fields)
+    return _serializers[name]
+
+
+def serializer(name):
+    """ The serializer registered for name """
+    try:
+        return _serializers[name]
+    except KeyError:
+        raise KeyError("No serializer registered for: {}".format(name)) from None
+
+
+TIMESTAMPS = [("created_at", "isoformat"), ("updated_at", "isoformat")]
+
+register("Amenity", ["id", "name"] + TIMESTAMPS)
+register("City", ["id", "country_id", "name"] + TIMESTAMPS)
+register("Country", ["id", "name", "code"] + TIMESTAMPS)
+register("Place", ["id", "host_user_id", "city_id", "name", "description", "address",
+                   "latitude", "longitude", "number_of_rooms", "bathrooms",
+                   "price_per_night", "max_guests"] + TIMESTAMPS)
+register("Review", ["id", "commentor_user_id", "place_id", "feedback", "rating"] + TIMESTAMPS)
+# a review as listed under its place name; the routes add the reviewer
+register("ReviewSummary", [("review", None, "feedback"), ("rating", "rating")] + TIMESTAMPS)
+# users' timestamps are returned as datetimes (sent as HTTP dates)
+register("User", ["id", "first_name", "last_name", "email", "password",
+                  ("created_at", "datetime"), ("updated_at", "datetime")])
+# a user as returned after a create or an update, without the password
+register("UserSummary", ["id", "first_name", "last_name", "email",
+                         ("created_at", "datetime"), ("updated_at", "datetime")])
@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+
+from flask import Blueprint
+
+# Import data
+from data import storage
+
+# Import utility functions
+from utils import pretty_json
+
+# Import the response cache
+from api.response_cache import response_cache
+
+# Create a blueprint
+stats_api = Blueprint('stats_api', __name__)
+
+
+# GET - Storage counters: bytes written and fsync time per data file, or
+# connection pool saturation and wait times when backed by SQLite
+@stats_api.route('/stats/storage', methods=["GET"])
+def storage_stats():
+    """ returns the storage usage counters """
+    return pretty_json(storage.stats()), 200
+
+
+# GET - Response cache counters: hits, misses, stale entries, evictions
+# and the memory held against its cap
+@stats_api.route('/stats/cache', methods=["GET"])
+def cache_stats():
+    """ returns the response cache counters """
+    return pretty_json(response_cache.stats()), 200
@@ -13,57 +13,59 @@ from models.city import City
 from models.amenity import Amenity
 
 # Import data
-from data import FileStorage
+from data import storage
 from data import (
     country_data, place_data, amenity_data,
     place_to_amenity_data, review_data, user_data, city_data
 )
 
+# Import utility functions
+from utils import paginate, stream_json_fragments
+
+# Import the serializers, the response cache, row fragments and conditional GET support
+from api.response_cache import response_cache
+from api.fragments import FragmentCache
+from api.serializers import serializer
+from api.conditional import conditional, row_not_modified, with_row_validators
+
 # Define the blueprint for user_api
 user_api = Blueprint('user api', __name__ )
 
+# compiled once, see api.serializers
+serialize_user = serializer("User")
+serialize_user_summary = serializer("UserSummary")
+
+
+user_fragments = FragmentCache(user_data, serialize_user)
+
+
 #GET /users: Retrieve a list of all users.
 @user_api.route('/users', methods=["GET"])
+@conditional(user_data)
+@response_cache.cached(user_data)
 def users_get():
-    """ Get/return all users """
-
-    users_info = []
-    for user_value in user_data.values():
-        users_info.append({
-            "id": user_value['id'],
-            "first_name": user_value['first_name'],
-            "last_name": user_value['last_name'],
-            "email": user_value['email'],
-            "password": user_value['password'],
-            "created_at": datetime.fromtimestamp(user_value['created_at']),
-            "updated_at": datetime.fromtimestamp(user_value['updated_at'])
-        })
-
-    return jsonify(users_info)
+    """ Get/return all users, or a page of them (see utils.paginate) """
+
+    rows, headers = paginate(user_data)
+
+    return stream_json_fragments(rows, user_fragments), 200, headers
 
 #GET /users/{user_id}: Retrieve details of a specific user.
 @user_api.route('/users/<user_id>', methods=["GET"])
 def users_specific_get(user_id):
     """ Get/return a specific user """
 
-    for user_value in user_data.values():
-        if user_value["id"] == user_id:
-            data = user_value
-            break
-    else:
+    data = user_data.get(user_id)
+    if data is None:
         abort(404, description="User not found")
-    
-    user_info = {
-        "id": data['id'],
-        "first_name": data['first_name'],
-        "last_name": data['last_name'],
-        "email": data['email'],
-        "password": data['password'],
-        "created_at": datetime.fromtimestamp(data['created_at']),
-        "updated_at": datetime.fromtimestamp(data['updated_at'])
-    }
-
-    return jsonify(user_info)
+
+    not_modified = row_not_modified(data)
+    if not_modified is not None:
+        return not_modified
+
+    user_info = serialize_user(data)
+
+    return with_row_validators(jsonify(user_info), data)
 
 #POST /users: Create a new user.
 @user_api.route('/users', methods=["POST"])
@@ -99,31 +101,23 @@ def create_new_user():
         except ValueError as exc:
             abort(400, repr(exc))
 
-        # setdefault ("User", []) provides a safety net
-        # by initializing "User" if absent
-        user_data.setdefault("User", [])
         # add new user data to user_data
         # note that the created_at  and updated_at are usig timestamps
         # data stores -> serve side
-        user_data["User"].append({
+        new_user_data = {
             "id": new_user.id,
             "first_name": new_user.first_name,
             "last_name": new_user.last_name,
             "email": new_user.email,
-            "created_at": new_user.created_at.timestamp(),
-            "updated_at": new_user.updated_at.timestamp()
-        })
+            "password": new_user.password,
+            "created_at": new_user.created_at,
+            "updated_at": new_user.updated_at
+        }
+        user_data.insert(new_user_data)
 
         # Prepare attributes to return, response to API request -> client side
-        attribs = {
-            "id": new_user.id,
-            "first_name": new_user.first_name,
-            "last_name": new_user.last_name,
-            "email": new_user.email,
-            "created_at": datetime.fromtimestamp(new_user.created_at),
-            "updated_at": datetime.fromtimestamp(new_user.updated_at)
-        }
-        FileStorage.save_model_data("new_user_test.json", new_user)
+        attribs = serialize_user_summary(new_user_data)
+        storage.save_table(user_data)
     
     return jsonify(attribs), 201
 
@@ -143,33 +137,24 @@ def update_user(user_id):
     # Get JSON data from request
     new_data = request.get_json()
 
-    for user_value in user_data.values():
-        if user_value["id"] == user_id:
-            found_user_data = user_value
-            break
-    else:
+    if user_id not in user_data:
         abort(404, f"User ID not found: {user_id}")
     
     # Update user's first_name and last_name if provided in JSON data
+    changes = {}
     if "first_name" in new_data:
-        found_user_data["first_name"] = new_data["first_name"]
+        changes["first_name"] = new_data["first_name"]
     if "last_name" in new_data:
-        found_user_data["last_name"] = new_data["last_name"]
+        changes["last_name"] = new_data["last_name"]
     
-    # Update user_data with the modified found_user_data
-    user_data[user_id] = found_user_data
+    # Update user_data with the changes
+    changes["updated_at"] = datetime.now().timestamp()
+    found_user_data = user_data.update(user_id, changes)
 
     # Prepare response attributes with updated timestamps as datetime objects
-    attribs = {
-        "id": found_user_data["id"],
-        "first_name": found_user_data["first_name"],
-        "last_name": found_user_data["last_name"],
-        "email": found_user_data["email"],
-        "created_at": datetime.fromtimestamp(found_user_data["created_at"]),
-        "updated_at": datetime.fromtimestamp(found_user_data["updated_at"])
-    }
-    #Call static method to persist changes (assuming user_data is a dictionary)
-    FileStorage.save_model_data("testing.json", found_user_data)
+    attribs = serialize_user_summary(found_user_data)
+    # persist changes (deferred when write-behind is enabled)
+    storage.save_table(user_data)
      
     # Return JSON response with updated user attributes
     return jsonify(attribs), 200
@@ -180,21 +165,12 @@ def delete_user(user_id):
     """ Delete a user using the specified id """
     
     # Check if user_id exists in user_data
-    for user_value in user_data.values():
-        if user_value["id"] == user_id:
-            del user_data[user_id]
-            break
-    else:
+    if user_id not in user_data:
         abort(404, f"User ID not found: {user_id}")
 
-    user_info = {
-        "id": delete_data['id'],
-        "first_name": delete_data['first_name'],
-        "last_name": delete_data['last_name'],
-        "email": delete_data['email'],
-        "password": delete_data['password'],
-        "created_at": datetime.fromtimestamp(delete_data['created_at']),
-        "updated_at": datetime.fromtimestamp(delete_data['updated_at'])
-    }
+    delete_data = user_data.delete(user_id)
+    storage.save_table(user_data)
+
+    user_info = serialize_user(delete_data)
 
     return jsonify(user_info), 200
\ No newline at end of file
@@ -11,6 +11,12 @@ from api.city_api import city_api
 from api.amenity_api import amenity_api
 from api.place_api import place_api
 from api.review_api import review_api
+from api.stats_api import stats_api
+from api.bulk_api import bulk_api
+from api.export_api import export_api
+
+# Import per-request database sessions
+from data import session, storage
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -22,6 +28,19 @@ app.register_blueprint(city_api, url_prefix='/api/v1')
 app.register_blueprint(amenity_api, url_prefix='/api/v1')
 app.register_blueprint(place_api, url_prefix='/api/v1')
 app.register_blueprint(review_api, url_prefix='/api/v1')
+app.register_blueprint(stats_api, url_prefix='/api/v1')
+app.register_blueprint(bulk_api, url_prefix='/api/v1')
+app.register_blueprint(export_api, url_prefix='/api/v1')
+
+# Give each request's database connection back to the pool when it ends
+session.init_app(app)
+
+
+@app.before_request
+def refresh_storage():
+    """ Pick up the tables other worker processes have saved (SHARED=1) """
+    storage.refresh()
+
 
 # Set debug=True for the server to auto-reload when there are changes
 if __name__ == '__main__':
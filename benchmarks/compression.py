@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+""" Load/save time and file size of a place table: plain JSON vs gzip vs lzma
+
+usage: python3 -m benchmarks.compression [row counts...]
+(defaults to 10000 100000)
+"""
+
+import os
+import sys
+import tempfile
+import time
+from benchmarks.fixtures import make_places
+from data.file_storage import FileStorage
+
+
+def timed(function):
+    """ Run function once, return (result, seconds) """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main(counts):
+    storage = FileStorage(fsync="none")
+    print("{:>9}  {:>6}  {:>9}  {:>9}  {:>9}".format("rows", "codec", "save", "load", "MB"))
+
+    for count in counts:
+        places = make_places(count)
+        data = {"Place": list(places.values())}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for codec, suffix in (("none", ""), ("gzip", ".gz"), ("lzma", ".xz")):
+                filename = os.path.join(tmp_dir, "place.json" + suffix)
+                _, save_time = timed(lambda: storage.save_model_data(filename, data))
+                rows, load_time = timed(lambda: storage.load_model_data(filename))
+                assert len(rows) == count
+
+                print("{:>9}  {:>6}  {:>8.3f}s  {:>8.3f}s  {:>9.1f}".format(
+                    count, codec, save_time, load_time, os.path.getsize(filename) / 2 ** 20))
+                os.remove(filename)
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+""" Fake data shared by the benchmarks """
+
+import json
+import random
+import uuid
+from datetime import datetime
+
+
+def make_places(count, seed=0):
+    """ Return count fake place rows keyed by id, shaped like data/place.json """
+    rng = random.Random(seed)
+    now = datetime.now().timestamp()
+    city_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(50)]
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(1000)]
+
+    places = {}
+    for number in range(count):
+        place_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        places[place_id] = {
+            "id": place_id,
+            "host_user_id": rng.choice(user_ids),
+            "city_id": rng.choice(city_ids),
+            "name": "Place {}".format(number),
+            "description": "A decent place",
+            "address": "{} Main Street".format(number),
+            "latitude": rng.uniform(-90, 90),
+            "longitude": rng.uniform(-180, 180),
+            "number_of_rooms": rng.randint(1, 10),
+            "bathrooms": rng.randint(1, 4),
+            "price_per_night": float(rng.randint(50, 500)),
+            "max_guests": rng.randint(1, 12),
+            "created_at": now,
+            "updated_at": now
+        }
+
+    return places
+
+
+def write_places_json(filename, places):
+    """ Write places in the same layout as data/place.json """
+    with open(filename, 'w') as f:
+        json.dump({"Place": list(places.values())}, f)
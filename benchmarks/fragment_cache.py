@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+""" Time to build the whole GET /places body: per-row dicts vs cached row fragments
+
+usage: TESTING=1 python3 -m benchmarks.fragment_cache [row counts...]
+(defaults to 10000 100000)
+
+"rebuilt" builds and encodes a dict per row on every request, as the
+list endpoints used to. "cold" is the first request with the fragment
+cache, "warm" the following ones, and "1% changed" a request after an
+update to one row in a hundred.
+"""
+
+import inspect
+import sys
+import time
+from flask import Response
+from app import app
+from api.place_api import place_amenties, place_fragments, serialize_place
+from data import storage, place_data
+from benchmarks.fixtures import make_places
+
+# the view itself, without the response cache and conditional GET wrappers
+view = inspect.unwrap(place_amenties)
+
+
+def rebuilt():
+    """ The previous GET /places: a dict per row, encoded on every request """
+    dumps = app.json.dumps
+
+    def parts():
+        yield "["
+        for number, place_value in enumerate(place_data.values()):
+            yield ("," if number else "") + dumps(serialize_place(place_value), separators=(",", ":"))
+        yield "]\n"
+
+    return Response(parts(), mimetype="application/json")
+
+
+def fragments():
+    """ GET /places as it is now """
+    response, _, _ = view()
+    return response
+
+
+def measure(build, repeat=3):
+    """ Best time (in seconds) to build and consume the body """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = sum(len(chunk) for chunk in build().response)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def main(counts):
+    print("{:>9}  {:>10}  {:>10}  {:>10}  {:>10}".format("rows", "rebuilt", "cold", "warm", "1% changed"))
+
+    with storage.isolated(), app.test_request_context('/api/v1/places'):
+        for count in counts:
+            place_data.load().load(make_places(count))
+            place_fragments.clear()
+
+            rebuilt_time, _ = measure(rebuilt)
+            cold_time, _ = measure(fragments, repeat=1)
+            warm_time, _ = measure(fragments)
+
+            for place_id in list(place_data)[::100]:
+                place_data.update(place_id, {"name": "Renamed"})
+            changed_time, _ = measure(fragments, repeat=1)
+
+            print("{:>9}  {:>9.3f}s  {:>9.3f}s  {:>9.3f}s  {:>9.3f}s".format(
+                count, rebuilt_time, cold_time, warm_time, changed_time))
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+""" Peak memory and time of loading a place data file: json.load vs streaming
+
+usage: python3 -m benchmarks.load_memory [row counts...]
+(defaults to 10000 100000)
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from benchmarks.fixtures import make_places, write_places_json
+from data.file_storage import FileStorage
+
+
+def load_whole_document(storage, filename):
+    """ The previous load_model_data: parse everything, then reorganise """
+    data = {}
+    with open(filename, 'r') as f:
+        rows = json.load(f)
+    for key in rows:
+        data[key] = rows[key]
+
+    return storage.reorganise_model_data(data)
+
+
+def timed(function):
+    """ Run function once, return seconds """
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def peak_memory(function):
+    """ Run function once under tracemalloc, return (result, peak MB) """
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 2 ** 20
+
+
+def main(counts):
+    storage = FileStorage()
+    print("{:>9}  {:>10}  {:>12}  {:>10}  {:>12}  {:>12}".format(
+        "rows", "json.load", "peak MB", "stream", "peak MB", "row dicts MB"))
+
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "place.json")
+            write_places_json(filename, make_places(count))
+
+            # timings without tracemalloc, which slows allocations down
+            old_time = timed(lambda: load_whole_document(storage, filename))
+            new_time = timed(lambda: storage.load_model_data(filename))
+
+            old, old_peak = peak_memory(lambda: load_whole_document(storage, filename))
+            del old
+            new, new_peak = peak_memory(lambda: storage.load_model_data(filename))
+            # what the caller keeps either way: the id-keyed rows
+            _, kept = peak_memory(lambda: {key: dict(row) for key, row in new.items()})
+
+            print("{:>9}  {:>9.3f}s  {:>12.1f}  {:>9.3f}s  {:>12.1f}  {:>12.1f}".format(
+                count, old_time, old_peak, new_time, new_peak, kept))
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or [10000, 100000])
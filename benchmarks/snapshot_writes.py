@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+""" Latency of a write to a table while a snapshot of it is held
+
+usage: python3 -m benchmarks.snapshot_writes [row counts...]
+(defaults to 10000 100000)
+
+Snapshots share the table's dicts, so the first write made while one is
+alive copies the rows and the indexes (see Repository). An unpaginated
+list GET holds one until its body has been sent (see
+Repository.iter_rows), so this is what a write landing during such a
+request costs.
+
+"no snapshot" is an update with no snapshot alive. "first write" is the
+first update after a snapshot was taken, and "later writes" the ones
+that follow while the same snapshot is still held. Times are medians,
+in milliseconds.
+"""
+
+import statistics
+import sys
+import time
+from data.repository import Repository
+from benchmarks.fixtures import make_places
+
+
+def median_ms(times):
+    """ Median of times (in seconds), in milliseconds """
+    return statistics.median(times) * 1000
+
+
+def timed_update(table, place_id, number):
+    """ Time (in seconds) of one update of the row place_id """
+    start = time.perf_counter()
+    table.update(place_id, {"name": "Renamed {}".format(number)})
+    return time.perf_counter() - start
+
+
+def main(counts, repeat=20):
+    print("{:>9}  {:>12}  {:>12}  {:>12}".format("rows", "no snapshot", "first write", "later writes"))
+
+    for count in counts:
+        table = Repository(make_places(count), indexes=["city_id", "host_user_id"], name="Place",
+                           sorted_indexes=["created_at", "updated_at", "name"])
+        place_ids = list(table)[:repeat]
+
+        alone = [timed_update(table, place_id, number) for number, place_id in enumerate(place_ids)]
+
+        first, later = [], []
+        for number, place_id in enumerate(place_ids):
+            # as a streamed list GET does
+            rows = table.iter_rows()
+            next(rows)
+            first.append(timed_update(table, place_id, number))
+            later.extend(timed_update(table, other_id, number) for other_id in place_ids[:5])
+            del rows
+
+        print("{:>9}  {:>10.3f}ms  {:>10.3f}ms  {:>10.3f}ms".format(
+            count, median_ms(alone), median_ms(first), median_ms(later)))
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+""" Startup time of a place table: JSON data file vs mmap'ed binary snapshot
+
+usage: python3 -m benchmarks.startup_binary_snapshot [row counts...]
+(defaults to 10000 100000 1000000)
+"""
+
+import os
+import sys
+import tempfile
+import time
+from benchmarks.fixtures import make_places, write_places_json
+from data.binary_snapshot import BinarySnapshot, write_snapshot
+from data.file_storage import FileStorage
+from data.repository import Repository
+
+
+def timed(function):
+    """ Run function once, return (result, seconds) """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main(counts):
+    storage = FileStorage()
+    print("{:>9}  {:>11}  {:>13}  {:>13}  {:>10}  {:>10}".format(
+        "rows", "json start", "binary start", "binary full", "json MB", "binary MB"))
+
+    for count in counts:
+        places = make_places(count)
+        some_id = next(reversed(places))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_filename = os.path.join(tmp_dir, "place.json")
+            # not place.hbs, or load_model_data would pick the snapshot up for the JSON run
+            binary_filename = os.path.join(tmp_dir, "snapshot.hbs")
+            write_places_json(json_filename, places)
+            write_snapshot(binary_filename, "Place", places)
+            del places
+
+            # startup = table ready to serve GET /places/<id>
+            _, json_time = timed(lambda: Repository(storage.load_model_data(json_filename),
+                                                    indexes=["city_id", "host_user_id"]).get(some_id))
+            snapshot, binary_time = timed(lambda: BinarySnapshot(binary_filename))
+            repo = Repository(snapshot, indexes=["city_id", "host_user_id"])
+            _, lookup_time = timed(lambda: repo.get(some_id))
+            # first request that needs the whole table (list or index lookup)
+            _, full_time = timed(lambda: repo.find_by("city_id", "missing"))
+            snapshot.close()
+
+            print("{:>9}  {:>10.3f}s  {:>12.4f}s  {:>12.3f}s  {:>10.1f}  {:>10.1f}".format(
+                count, json_time, binary_time + lookup_time, full_time,
+                os.path.getsize(json_filename) / 2 ** 20, os.path.getsize(binary_filename) / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+""" Peak RSS and time to first byte of GET /places: full list vs streamed array
+
+usage: TESTING=1 python3 -m benchmarks.streaming_responses [row counts...]
+(defaults to 10000 100000; Linux only, RSS is read from /proc)
+
+Each measurement runs in a forked process, so its peak RSS is not hidden
+by the peaks of the measurements before it.
+"""
+
+import inspect
+import multiprocessing
+import resource
+import sys
+import time
+from datetime import datetime
+from benchmarks.fixtures import make_places
+from app import app
+from api.place_api import place_amenties
+from data import storage, place_data
+from utils import pretty_json
+
+
+def list_places():
+    """ The previous GET /places: build the whole list, then serialise it """
+    places_info = []
+
+    for place_value in place_data.values():
+        places_info.append({
+            "id": place_value["id"],
+            "host_user_id": place_value["host_user_id"],
+            "city_id": place_value["city_id"],
+            "name": place_value["name"],
+            "description": place_value["description"],
+            "address": place_value["address"],
+            "latitude": place_value["latitude"],
+            "longitude": place_value["longitude"],
+            "number_of_rooms": place_value["number_of_rooms"],
+            "bathrooms": place_value["bathrooms"],
+            "price_per_night": place_value["price_per_night"],
+            "max_guests": place_value["max_guests"],
+            "created_at": datetime.fromtimestamp(place_value["created_at"]).isoformat(),
+            "updated_at": datetime.fromtimestamp(place_value["updated_at"]).isoformat()
+        })
+
+    return pretty_json(places_info), 200
+
+
+def stream_places():
+    """ GET /places, without the response cache and conditional GET wrappers """
+    return inspect.unwrap(place_amenties)()
+
+
+def current_rss():
+    """ Resident set size of this process, in bytes """
+    with open("/proc/self/statm", 'r') as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def measure(view):
+    """ Child process body: (time to first byte, total time, peak RSS growth in MB) """
+    with app.test_request_context('/api/v1/places'):
+        before = current_rss()
+        start = time.perf_counter()
+
+        response = view()[0]
+        chunks = iter(response.response)
+        next(chunks)
+        first_byte = time.perf_counter() - start
+        for _ in chunks:
+            pass
+        total = time.perf_counter() - start
+
+    # ru_maxrss is in KB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return first_byte, total, (peak - before) / 2 ** 20
+
+
+def main(counts):
+    context = multiprocessing.get_context("fork")
+    print("{:>9}  {:>10}  {:>10}  {:>9}  {:>10}  {:>10}  {:>9}".format(
+        "rows", "list TTFB", "total", "peak MB", "stream TTFB", "total", "peak MB"))
+
+    with storage.isolated():
+        for count in counts:
+            place_data.load().load(make_places(count))
+
+            results = []
+            for view in (list_places, stream_places):
+                with context.Pool(1) as pool:
+                    results.extend(pool.apply(measure, (view,)))
+
+            print("{:>9}  {:>9.3f}s  {:>9.3f}s  {:>9.1f}  {:>10.4f}s  {:>9.3f}s  {:>9.1f}".format(
+                count, *results))
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or [10000, 100000])
@@ -1,21 +1,108 @@
 #!/usr/bin/python3
 """ initialize the storage used by models """
 
+import atexit
+import multiprocessing
 import os
 from data.file_storage import FileStorage
-
-storage = FileStorage()
+from data.lazy_table import LazyTable
+from data.repository import Repository
+from data.sqlite_storage import SQLiteStorage
 
 # check for TESTING=1 from command line
 # command to use: TESTING=1 python3 -m unittest discover (Crawls through the current directory and runs all the test files FROM "tests" folder; recursive function, only runs files in first level)
 is_testing = "TESTING" in os.environ and os.environ['TESTING'] == "1"
 
-country_data = storage.load_model_data('data/country_testing.json') if is_testing \
-    else storage.load_model_data('data/country.json')
+# with WRITE_BEHIND=1, writes are deferred to a background flusher (group
+# commit): a write is acknowledged before it is saved, so up to
+# FLUSH_INTERVAL seconds of writes can be lost in a crash. Off by default;
+# tests always save synchronously
+write_behind = not is_testing and os.environ.get('WRITE_BEHIND', "0") == "1"
+flush_interval = float(os.environ.get('FLUSH_INTERVAL', "1.0"))
+
+# with SHARED=1 several processes (gunicorn workers) can use the same data
+# files: saves are serialised with a file lock, and each request reloads the
+# tables other workers have saved (see VERSION_FILE). The journal is per
+# process, so it is off in that mode. With STORAGE=sqlite the database is
+# always shared this way (see SQLiteStorage.refresh), whatever SHARED says.
+shared = os.environ.get('SHARED', "0") == "1"
+version_file = os.environ.get('VERSION_FILE', 'data/versions.json') if shared else None
+
+# changes are appended to a journal and folded into the data files once it
+# grows past JOURNAL_COMPACT_BYTES, unless JOURNAL=0 is set; tests never journal
+use_journal = not is_testing and not shared and os.environ.get('JOURNAL', "1") == "1"
+journal_file = os.environ.get('JOURNAL_FILE', 'data/journal.ndjson') if use_journal else None
+compact_threshold = int(os.environ.get('JOURNAL_COMPACT_BYTES', str(1024 * 1024)))
+
+# fsync policy for data files and the journal: none, per-write or interval
+# (at most once every FSYNC_INTERVAL seconds per file); tests never fsync
+fsync = "none" if is_testing else os.environ.get('FSYNC', "per-write")
+fsync_interval = float(os.environ.get('FSYNC_INTERVAL', "1.0"))
+
+# changes made together by a transaction (e.g. a place and its amenities)
+# are written to BATCH_FILE before the tables are rewritten, so that a crash
+# in between can be recovered from; not used when journaling
+batch_file = os.environ.get('BATCH_FILE', 'data/batch.json')
+
+# number of files each table is split into (by id) once it is saved; an
+# existing layout is kept, see: python3 -m data.reshard count
+shards = int(os.environ.get('SHARDS', "1"))
+
+# processes started by multiprocessing (the validators of a bulk import, see
+# data/bulk.py) only read the tables. When they are spawned rather than
+# forked they import this module again, and must leave the data files alone:
+# no batch recovery or journal replay, no watcher, nothing saved on exit
+is_child_process = multiprocessing.parent_process() is not None
+
+# memory cap (in bytes) of the cache of GET responses, see api/response_cache.py;
+# RESPONSE_CACHE_BYTES=0 turns it off
+response_cache_bytes = int(os.environ.get('RESPONSE_CACHE_BYTES', str(32 * 1024 * 1024)))
+
+# check for STORAGE=sqlite to keep the data in SQLITE_FILE instead of the JSON files
+# (import the JSON files first with: python3 -m data.migrate_to_sqlite data/hbnb.db)
+use_sqlite = "STORAGE" in os.environ and os.environ['STORAGE'] == "sqlite"
+
+if use_sqlite:
+    storage = SQLiteStorage(os.environ.get('SQLITE_FILE', 'data/hbnb.db'), fsync=fsync,
+                            pool_size=int(os.environ.get('SQLITE_POOL_SIZE', "5")),
+                            pool_timeout=float(os.environ.get('SQLITE_POOL_TIMEOUT', "10.0")))
+else:
+    storage = FileStorage(write_behind=write_behind, flush_interval=flush_interval,
+                          journal_file=journal_file, compact_threshold=compact_threshold,
+                          fsync=fsync, fsync_interval=fsync_interval, shards=shards,
+                          version_file=version_file, batch_file=batch_file)
+
+# The tables are lazy: each data file is only loaded (and its journaled
+# changes replayed) the first time the table is used, so importing a model
+# or the app doesn't load every table.
+# secondary indexes maintained by each repository, for lookups by
+# natural key (country code, user email) and by foreign key, and sorted
+# indexes for the sort orders the collection endpoints can page through
+by_date = ["created_at", "updated_at"]
+by_date_and_name = by_date + ["name"]
+
+country_data = storage.lazy_table('data/country_testing.json', "Country", indexes=["code"],
+                                  sorted_indexes=by_date_and_name) if is_testing \
+    else storage.lazy_table('data/country.json', "Country", indexes=["code"], sorted_indexes=by_date_and_name)
+
+city_data = storage.lazy_table('data/city.json', "City", indexes=["country_id"], sorted_indexes=by_date_and_name)
+amenity_data = storage.lazy_table('data/amenity.json', "Amenity", sorted_indexes=by_date_and_name)
+place_data = storage.lazy_table('data/place.json', "Place", indexes=["city_id", "host_user_id"],
+                                sorted_indexes=by_date_and_name)
+user_data = storage.lazy_table('data/user.json', "User", indexes=["email"], sorted_indexes=by_date)
+review_data = storage.lazy_table('data/review.json', "Review", indexes=["place_id", "commentor_user_id"],
+                                 sorted_indexes=by_date)
+place_to_amenity_data = storage.lazy_many_to_many_data('data/place_to_amenity.json', "Place_to_Amenity")
+
+if not is_child_process:
+    # journal the changes made to the tables from now on
+    storage.open_journal()
+
+    # with RELOAD_INTERVAL=<seconds>, data files changed outside of the app are
+    # reloaded without a restart; tests never reload
+    reload_interval = 0.0 if is_testing else float(os.environ.get('RELOAD_INTERVAL', "0"))
+    if reload_interval > 0 and not use_sqlite:
+        storage.watch(reload_interval)
 
-city_data = storage.load_model_data('data/city.json')
-amenity_data = storage.load_model_data('data/amenity.json')
-place_data = storage.load_model_data('data/place.json')
-user_data = storage.load_model_data('data/user.json')
-review_data = storage.load_model_data('data/review.json')
-place_to_amenity_data = storage.load_many_to_many_data('data/place_to_amenity.json')
+    # make sure deferred writes reach the disk on shutdown
+    atexit.register(storage.close)
@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+"""This module defines a compact binary snapshot format for hbnb evolution
+
+Layout of a snapshot file (all integers little-endian):
+
+    header      magic 'HBS1', version, model name, row count, string count
+                and the offsets of the sections below
+    strings     utf-8 bytes of every distinct string (field names and string
+                values are interned, so repeated ids and names are stored once)
+    string table  (offset, length) of each string in the strings section
+    rows        per row: field count, then per field the field name's string
+                number, a type tag and the value
+    order table   (id string number, row offset) in the original row order
+    id index      the same entries sorted by id, for binary search by id
+
+The file is mmap'ed and only the header is read when it is opened. A row is
+decoded the first time it is looked up.
+"""
+
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+MAGIC = b"HBS1"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIIIQQQQ")
+STRING_ENTRY = struct.Struct("<QI")
+ROW_ENTRY = struct.Struct("<IQ")
+FIELD_COUNT = struct.Struct("<H")
+FIELD = struct.Struct("<IB")
+STRING_VALUE = struct.Struct("<I")
+INT_VALUE = struct.Struct("<q")
+FLOAT_VALUE = struct.Struct("<d")
+
+# type tags
+NULL, STRING, INT, FLOAT, TRUE, FALSE = range(6)
+
+
+def write_snapshot(filename, name, rows):
+    """ Write rows (a dict keyed by id) of the model `name` as a binary snapshot """
+    strings = {}
+
+    def intern(value):
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    name_number = intern(name)
+
+    # encode the rows first, interning the strings as we go
+    row_chunks = []
+    entries = []
+    position = 0
+    for row_id, row in rows.items():
+        chunk = [FIELD_COUNT.pack(len(row))]
+        for field, value in row.items():
+            key = intern(field)
+            if value is None:
+                chunk.append(FIELD.pack(key, NULL))
+            elif value is True:
+                chunk.append(FIELD.pack(key, TRUE))
+            elif value is False:
+                chunk.append(FIELD.pack(key, FALSE))
+            elif isinstance(value, str):
+                chunk.append(FIELD.pack(key, STRING) + STRING_VALUE.pack(intern(value)))
+            elif isinstance(value, int):
+                chunk.append(FIELD.pack(key, INT) + INT_VALUE.pack(value))
+            elif isinstance(value, float):
+                chunk.append(FIELD.pack(key, FLOAT) + FLOAT_VALUE.pack(value))
+            else:
+                raise ValueError("Unsupported value for field '{}': {!r}".format(field, value))
+        chunk = b"".join(chunk)
+
+        entries.append((intern(row_id), position))
+        row_chunks.append(chunk)
+        position += len(chunk)
+
+    encoded = [value.encode("utf-8") for value in strings]
+
+    strings_offset = HEADER.size
+    string_table_offset = strings_offset + sum(len(value) for value in encoded)
+    rows_offset = string_table_offset + STRING_ENTRY.size * len(encoded)
+    order_offset = rows_offset + position
+    index_offset = order_offset + ROW_ENTRY.size * len(entries)
+
+    by_id = sorted(entries, key=lambda entry: encoded[entry[0]])
+
+    # write next to the target and rename, so readers never see half a file
+    tmp_filename = "{}.tmp".format(filename)
+    with open(tmp_filename, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, name_number, len(entries), len(encoded),
+                            string_table_offset, rows_offset, order_offset, index_offset))
+        for value in encoded:
+            f.write(value)
+
+        offset = strings_offset
+        for value in encoded:
+            f.write(STRING_ENTRY.pack(offset, len(value)))
+            offset += len(value)
+
+        for chunk in row_chunks:
+            f.write(chunk)
+
+        for table in (entries, by_id):
+            for string_number, row_position in table:
+                f.write(ROW_ENTRY.pack(string_number, rows_offset + row_position))
+
+    os.replace(tmp_filename, filename)
+
+
+class BinarySnapshot(Mapping):
+    """ Read-only, lazily decoded view of a binary snapshot, keyed by id """
+
+    def __init__(self, filename):
+        """ constructor """
+        with open(filename, "rb") as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, _, name_number, self.__row_count, self.__string_count,
+         self.__string_table, self.__rows, self.__order, self.__index) = HEADER.unpack_from(self.__map, 0)
+
+        if magic != MAGIC or version != VERSION:
+            self.__map.close()
+            raise ValueError("Not a binary snapshot: '{}'".format(filename))
+
+        # string number -> decoded str, filled in as strings are needed
+        self.__strings = {}
+        # model name ('Place', 'Country', etc.)
+        self.name = self.__string(name_number)
+
+    def __string(self, number):
+        """ Decode (once) the string with the given number """
+        value = self.__strings.get(number)
+        if value is None:
+            offset, length = STRING_ENTRY.unpack_from(self.__map, self.__string_table + number * STRING_ENTRY.size)
+            value = self.__strings[number] = self.__map[offset:offset + length].decode("utf-8")
+        return value
+
+    def __string_bytes(self, number):
+        """ Raw bytes of a string, for comparisons during the binary search """
+        offset, length = STRING_ENTRY.unpack_from(self.__map, self.__string_table + number * STRING_ENTRY.size)
+        return self.__map[offset:offset + length]
+
+    def __find(self, row_id):
+        """ Binary search of the id index; returns the row offset or None """
+        if not isinstance(row_id, str):
+            return None
+
+        key = row_id.encode("utf-8")
+        low, high = 0, self.__row_count
+        while low < high:
+            middle = (low + high) // 2
+            number, offset = ROW_ENTRY.unpack_from(self.__map, self.__index + middle * ROW_ENTRY.size)
+            current = self.__string_bytes(number)
+            if current == key:
+                return offset
+            if current < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return None
+
+    def __decode_row(self, offset):
+        """ Decode the row stored at offset """
+        row = {}
+        (count,) = FIELD_COUNT.unpack_from(self.__map, offset)
+        offset += FIELD_COUNT.size
+
+        for _ in range(count):
+            key, tag = FIELD.unpack_from(self.__map, offset)
+            offset += FIELD.size
+            if tag == STRING:
+                (number,) = STRING_VALUE.unpack_from(self.__map, offset)
+                value = self.__string(number)
+                offset += STRING_VALUE.size
+            elif tag == FLOAT:
+                (value,) = FLOAT_VALUE.unpack_from(self.__map, offset)
+                offset += FLOAT_VALUE.size
+            elif tag == INT:
+                (value,) = INT_VALUE.unpack_from(self.__map, offset)
+                offset += INT_VALUE.size
+            else:
+                value = {NULL: None, TRUE: True, FALSE: False}[tag]
+            row[self.__string(key)] = value
+
+        return row
+
+    # --- Mapping interface ---
+
+    def __getitem__(self, row_id):
+        offset = self.__find(row_id)
+        if offset is None:
+            raise KeyError(row_id)
+        return self.__decode_row(offset)
+
+    def __contains__(self, row_id):
+        return self.__find(row_id) is not None
+
+    def __len__(self):
+        return self.__row_count
+
+    def __iter__(self):
+        for position in range(self.__row_count):
+            number, _ = ROW_ENTRY.unpack_from(self.__map, self.__order + position * ROW_ENTRY.size)
+            yield self.__string(number)
+
+    def items(self):
+        """ Decode every row, in the original order """
+        for position in range(self.__row_count):
+            number, offset = ROW_ENTRY.unpack_from(self.__map, self.__order + position * ROW_ENTRY.size)
+            yield self.__string(number), self.__decode_row(offset)
+
+    def values(self):
+        """ Decode every row, in the original order """
+        for _, row in self.items():
+            yield row
+
+    def close(self):
+        """ Unmap the file """
+        self.__map.close()
@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+"""This module defines the bulk import pipeline for hbnb evolution
+
+Rows are read one per line (NDJSON), validated in chunks using the model
+classes (by a pool of worker processes, for the command line import, see
+data/bulk_import.py), and inserted in batches: each
+batch is a single transaction, so it costs one persist (see
+storage.transaction). A row that fails validation, or whose id is taken
+(by a row of the table or an earlier row of the load), is reported with
+its line number and skipped; the rest of the load goes on.
+"""
+
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from data import storage
+from data import country_data, city_data, amenity_data, place_data, user_data, review_data
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.user import User
+
+# entity (as in the API urls) -> (model class, fields required by the API)
+ENTITIES = {
+    "countries": (Country, ["name", "code"]),
+    "cities": (City, ["name", "country_id"]),
+    "amenities": (Amenity, ["name"]),
+    "places": (Place, ["host_user_id", "city_id", "name", "description", "address", "latitude",
+                       "longitude", "number_of_rooms", "bathrooms", "price_per_night", "max_guests"]),
+    "users": (User, ["first_name", "last_name", "email", "password"]),
+    "reviews": (Review, ["commentor_user_id", "place_id", "feedback", "rating"])
+}
+
+# entity -> table the rows go to
+TABLES = {
+    "countries": country_data,
+    "cities": city_data,
+    "amenities": amenity_data,
+    "places": place_data,
+    "users": user_data,
+    "reviews": review_data
+}
+
+# at most this many errors are listed in the report (all of them are counted)
+MAX_ERRORS = 1000
+
+
+def read_ndjson(f):
+    """ Yield (line number, row) for every non-blank line of an NDJSON file
+
+    A line that is not a JSON object is yielded as (line number, error message).
+    """
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, "Invalid JSON: {}".format(exc)
+            continue
+        if not isinstance(row, dict):
+            yield number, "Not a JSON object"
+            continue
+        yield number, row
+
+
+def validate_row(entity, row):
+    """ Validate a row with its model class and return the row to store
+
+    Raises ValueError if the row is not valid. Whether its id is free is
+    checked when the row is committed, see bulk_import.
+    """
+    model_class, fields = ENTITIES[entity]
+    for field in fields:
+        if field not in row:
+            raise ValueError("Missing data: {}".format(field))
+    if "id" in row and (not isinstance(row["id"], str) or not row["id"]):
+        raise ValueError("Invalid id: must be a non-empty string")
+
+    model = model_class(**{field: row[field] for field in fields})
+
+    # values as the model cleaned them up, where it keeps them
+    stored = {"id": row.get("id", model.id)}
+    for field in fields:
+        try:
+            stored[field] = getattr(model, field)
+        except AttributeError:
+            stored[field] = row[field]
+    for field in ("created_at", "updated_at"):
+        value = getattr(model, field)
+        stored[field] = value.timestamp() if isinstance(value, datetime) else value
+
+    return stored
+
+
+def validate_chunk(entity, chunk):
+    """ Validate a chunk of (line number, row); returns (line number, row, error) for each """
+    results = []
+    for number, row in chunk:
+        if isinstance(row, str):
+            # the line could not be parsed
+            results.append((number, None, row))
+            continue
+        try:
+            results.append((number, validate_row(entity, row), None))
+        except (ValueError, TypeError, AttributeError) as exc:
+            results.append((number, None, str(exc)))
+
+    return results
+
+
+def bulk_import(entity, f, workers=None, chunk_size=1000, batch_size=10000):
+    """ Import the NDJSON rows read from f into the entity's table
+
+    Chunks are validated by `workers` processes (in this process when 0,
+    as many as there are CPUs when None) and committed in input order,
+    batch_size rows per transaction. Only a few chunks per worker are
+    read ahead, so the input is never held in memory as a whole.
+
+    The workers are forked where possible, so that they validate against
+    the tables as they are in this process. Forking a process running
+    other threads (e.g. the app's) can leave the children with locks held
+    forever: only use workers from a single threaded process, such as the
+    command line import.
+
+    Returns {"imported": count, "failed": count, "errors": [{"line", "error"}]}.
+    """
+    if entity not in ENTITIES:
+        raise ValueError("Unknown entity: {}".format(entity))
+
+    table = TABLES[entity]
+    report = {"imported": 0, "failed": 0, "errors": []}
+    batch = []
+    # ids of the rows in batch
+    batch_ids = set()
+
+    def collect(results):
+        for number, row, error in results:
+            if error is None and (row["id"] in batch_ids or row["id"] in table):
+                row, error = None, "Duplicate id: {}".format(row["id"])
+            if error is not None:
+                report["failed"] += 1
+                if len(report["errors"]) < MAX_ERRORS:
+                    report["errors"].append({"line": number, "error": error})
+                continue
+
+            batch.append(row)
+            batch_ids.add(row["id"])
+            if len(batch) >= batch_size:
+                commit()
+
+    def commit():
+        with storage.transaction() as transaction:
+            for row in batch:
+                transaction.insert(table, row)
+        report["imported"] += len(batch)
+        batch.clear()
+        batch_ids.clear()
+
+    if workers == 0:
+        for chunk in chunks(read_ndjson(f), chunk_size):
+            collect(validate_chunk(entity, chunk))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as executor:
+            in_flight = deque()
+            for chunk in chunks(read_ndjson(f), chunk_size):
+                in_flight.append(executor.submit(validate_chunk, entity, chunk))
+                if len(in_flight) >= 2 * workers:
+                    collect(in_flight.popleft().result())
+            while in_flight:
+                collect(in_flight.popleft().result())
+
+    if batch:
+        commit()
+
+    return report
+
+
+def pool_context():
+    """ multiprocessing context of the validators: fork if the platform has it, else spawn """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def chunks(rows, size):
+    """ Group an iterable into lists of at most size items """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,26 @@
+#!/usr/bin/python3
+""" Bulk import rows from an NDJSON file (one JSON object per line)
+
+usage: python3 -m data.bulk_import countries|cities|amenities|places|users|reviews file.ndjson [workers]
+
+Rows that fail validation are listed on stderr and skipped.
+"""
+
+import sys
+from data import storage
+from data.bulk import ENTITIES, bulk_import
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in ENTITIES:
+        sys.exit(__doc__.strip())
+
+    entity = sys.argv[1]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    with open(sys.argv[2], 'r') as f:
+        report = bulk_import(entity, f, workers=workers)
+    storage.close()
+
+    for error in report["errors"]:
+        print("line {}: {}".format(error["line"], error["error"]), file=sys.stderr)
+    print("Imported {} {}, {} failed".format(report["imported"], entity, report["failed"]))
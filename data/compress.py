@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+""" Compress the JSON data files (or decompress them back to plain JSON)
+
+usage: python3 -m data.compress none|gzip|lzma [data_dir]
+
+Stop the app first: it would keep writing the files it has loaded.
+"""
+
+import sys
+from pathlib import Path
+from data import compression
+from data.file_storage import DATA_FILES, FileStorage
+
+
+def data_filenames(data_dir):
+    """ The data files (or their shards) of the tables, in whatever format they are now
+
+    Only the tables' files: the storage's own JSON files (versions.json,
+    batch.json) are left as they are.
+    """
+    filenames = []
+    for stem in DATA_FILES:
+        filename = str(Path(data_dir) / "{}.json".format(stem))
+        shards = FileStorage.shard_filenames(filename)
+        if shards is not None:
+            filenames.extend(shards)
+        elif FileStorage.data_filename(filename) is not None:
+            filenames.append(FileStorage.data_filename(filename))
+
+    return filenames
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in compression.CODECS:
+        sys.exit(__doc__.strip())
+
+    codec_name = sys.argv[1]
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else 'data'
+
+    for filename in data_filenames(data_dir):
+        new_filename = compression.recompress(filename, codec_name)
+        if new_filename != filename:
+            print("Rewrote {} as {}".format(filename, new_filename))
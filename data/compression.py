@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+"""This module reads and writes compressed data files for hbnb evolution
+
+A data file can be stored as plain JSON (place.json) or compressed with gzip
+(place.json.gz) or lzma (place.json.xz). When reading, the format is told
+from the first bytes of the file; when writing, from the file extension.
+The codecs stream, so neither side ever holds the whole compressed file in
+memory.
+"""
+
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# extension -> codec module
+SUFFIXES = {".gz": gzip, ".xz": lzma, ".lzma": lzma}
+
+# settings used when writing: the codecs' defaults (gzip level 9, xz preset
+# 6) cost a lot of time for a few percent of size on this kind of data
+WRITE_OPTIONS = {gzip: {"compresslevel": 6}, lzma: {"preset": 2}}
+
+# codec name (as used in the COMPRESSION setting) -> extension
+CODECS = {"none": "", "gzip": ".gz", "lzma": ".xz"}
+
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+# legacy .lzma files have no magic number, but start with these properties
+LZMA_ALONE_MAGIC = b"\x5d\x00\x00"
+
+
+def codec_for(filename):
+    """ Codec module of a compressed file (from its first bytes), or None """
+    with open(filename, 'rb') as f:
+        magic = f.read(len(XZ_MAGIC))
+
+    if magic.startswith(GZIP_MAGIC):
+        return gzip
+    if magic.startswith(XZ_MAGIC) or magic.startswith(LZMA_ALONE_MAGIC):
+        return lzma
+
+    return None
+
+
+def strip_suffix(filename):
+    """ Name of a data file without its compression extension """
+    path = Path(filename)
+    if path.suffix in SUFFIXES:
+        return str(path.with_suffix(""))
+
+    return str(filename)
+
+
+def suffix_of(filename):
+    """ Compression extension of a data file ('.gz', '.xz'...), or '' """
+    suffix = Path(filename).suffix
+    return suffix if suffix in SUFFIXES else ""
+
+
+def open_text(filename):
+    """ Open a data file (compressed or not) for reading text """
+    codec = codec_for(filename)
+    if codec is None:
+        return open(filename, 'r', encoding='utf-8')
+
+    return codec.open(filename, 'rt', encoding='utf-8')
+
+
+@contextmanager
+def text_writer(raw, filename):
+    """ Text stream writing into the binary file raw, compressed according to filename
+
+    raw is left open, so the caller can still flush and fsync it.
+    """
+    codec = SUFFIXES.get(Path(filename).suffix)
+    stream = raw if codec is None else codec.open(raw, 'wb', **WRITE_OPTIONS[codec])
+    text = io.TextIOWrapper(stream, encoding='utf-8')
+
+    yield text
+
+    text.flush()
+    text.detach()
+    if stream is not raw:
+        # writes the end of the compressed stream
+        stream.close()
+
+
+def recompress(filename, codec_name):
+    """ Rewrite a data file with another codec ('none', 'gzip' or 'lzma')
+
+    Returns the new file name. The data is streamed from one codec to the
+    other, and the old file is only removed once the new one is in place.
+    """
+    new_filename = strip_suffix(filename) + CODECS[codec_name]
+    if new_filename == filename:
+        return filename
+
+    codec = codec_for(filename)
+    directory = os.path.dirname(os.path.abspath(new_filename))
+    fd, tmp_filename = tempfile.mkstemp(dir=directory, prefix=Path(new_filename).name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            with (open(filename, 'rb') if codec is None else codec.open(filename, 'rb')) as src:
+                new_codec = SUFFIXES.get(Path(new_filename).suffix)
+                if new_codec is None:
+                    shutil.copyfileobj(src, raw)
+                else:
+                    with new_codec.open(raw, 'wb', **WRITE_OPTIONS[new_codec]) as dst:
+                        shutil.copyfileobj(src, dst)
+        os.replace(tmp_filename, new_filename)
+    except BaseException:
+        if Path(tmp_filename).is_file():
+            os.remove(tmp_filename)
+        raise
+
+    os.remove(filename)
+    return new_filename
@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+"""This module defines a bounded connection pool for hbnb evolution"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ConnectionPool():
+    """ Thread-safe pool of at most `size` database connections
+
+    Connections are opened lazily by calling `connect`. When every connection
+    is checked out, acquire() waits up to `timeout` seconds for one to be
+    released and then raises TimeoutError.
+    """
+
+    def __init__(self, connect, size=5, timeout=10.0):
+        """ constructor """
+        if size < 1:
+            raise ValueError("Invalid pool size: {}".format(size))
+
+        self.size = size
+        self.timeout = timeout
+        self.__connect = connect
+        self.__idle = []
+        self.__opened = 0
+        self.__in_use = 0
+        self.__condition = threading.Condition()
+        self.__stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_time": 0.0,
+            "max_wait_time": 0.0,
+            "peak_in_use": 0
+        }
+
+    def acquire(self):
+        """ Check a connection out of the pool """
+        start = time.monotonic()
+
+        with self.__condition:
+            waited = False
+            while not self.__idle and self.__opened >= self.size:
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self.__stats["timeouts"] += 1
+                    raise TimeoutError("No connection available after {} seconds".format(self.timeout))
+                waited = True
+                self.__condition.wait(remaining)
+
+            connection = self.__idle.pop() if self.__idle else None
+            if connection is None:
+                # reserve the slot now, the connection is opened below
+                self.__opened += 1
+            self.__in_use += 1
+
+            wait_time = time.monotonic() - start
+            self.__stats["checkouts"] += 1
+            if waited:
+                self.__stats["waits"] += 1
+            self.__stats["wait_time"] += wait_time
+            self.__stats["max_wait_time"] = max(self.__stats["max_wait_time"], wait_time)
+            self.__stats["peak_in_use"] = max(self.__stats["peak_in_use"], self.__in_use)
+
+        if connection is None:
+            try:
+                connection = self.__connect()
+            except Exception:
+                with self.__condition:
+                    self.__opened -= 1
+                    self.__in_use -= 1
+                    self.__condition.notify()
+                raise
+
+        return connection
+
+    def release(self, connection):
+        """ Return a connection to the pool, discarding any open transaction """
+        connection.rollback()
+
+        with self.__condition:
+            self.__idle.append(connection)
+            self.__in_use -= 1
+            self.__condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """ Check a connection out for the duration of a with block """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        """ Close the idle connections """
+        with self.__condition:
+            idle = self.__idle
+            self.__idle = []
+            self.__opened -= len(idle)
+
+        for connection in idle:
+            connection.close()
+
+    def stats(self):
+        """ Return the pool usage counters
+
+        saturation is the share of the pool currently checked out, and
+        wait_time / max_wait_time are in seconds.
+        """
+        with self.__condition:
+            stats = dict(self.__stats)
+            stats["size"] = self.size
+            stats["opened"] = self.__opened
+            stats["in_use"] = self.__in_use
+            stats["idle"] = len(self.__idle)
+            stats["saturation"] = self.__in_use / self.size
+
+        return stats
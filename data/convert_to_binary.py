@@ -0,0 +1,33 @@
+#!/usr/bin/python3
+""" Convert the JSON data files into binary snapshots (.hbs) for fast startup
+
+usage: python3 -m data.convert_to_binary [data_dir]
+"""
+
+import json
+import sys
+from pathlib import Path
+from data import compression
+from data.binary_snapshot import write_snapshot
+from data.file_storage import FileStorage
+
+# many to many data is not keyed by id, so it stays in JSON
+DATA_FILES = ["country", "country_testing", "city", "amenity", "place", "user", "review"]
+
+if __name__ == '__main__':
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else 'data'
+    storage = FileStorage()
+
+    for stem in DATA_FILES:
+        filename = storage.data_filename(Path(data_dir) / "{}.json".format(stem))
+        if filename is None:
+            continue
+
+        with compression.open_text(filename) as f:
+            data = json.load(f)
+        # the JSON's key is the model name: 'Place', 'Country', etc.
+        for name in data:
+            rows = storage.reorganise_model_data({name: data[name]})
+            binary_filename = storage.binary_snapshot_name(filename)
+            write_snapshot(binary_filename, name, rows)
+            print("Converted {} rows from {} into {}".format(len(rows), filename, binary_filename))
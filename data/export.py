@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+""" Export a table as NDJSON (one JSON object per line) on stdout
+
+usage: python3 -m data.export countries|cities|amenities|places|users|reviews [field=value ...] [since=updated_at]
+
+field=value filters use the table's indexes (e.g. city_id=... for places).
+since= keeps the rows updated at or after a timestamp or ISO date, for
+incremental exports. The rows are the stored rows, as bulk_import reads them.
+"""
+
+import json
+import sys
+from datetime import datetime
+from data.bulk import TABLES
+
+
+def parse_since(value):
+    """ Timestamp from a since= value: a number or an ISO date; raises ValueError """
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def export_rows(entity, filters=None, since=None):
+    """ Iterator over the rows of an entity's table matching the filters
+
+    filters maps indexed fields to values; one of them picks the rows
+    through its index, the others are checked row by row. since is a
+    timestamp the rows' updated_at must be at or after. Raises ValueError
+    for an unknown entity or a filter on a field without an index.
+    """
+    if entity not in TABLES:
+        raise ValueError("Unknown entity: {}".format(entity))
+
+    table = TABLES[entity]
+    filters = dict(filters or {})
+    for field in filters:
+        if field not in table.indexes:
+            raise ValueError("Can't filter {} on {} (indexed fields: {})".format(
+                entity, field, ", ".join(table.indexes) or "none"))
+
+    field, value = filters.popitem() if filters else (None, None)
+    return _matching(table.iter_rows(field, value), filters, since)
+
+
+def _matching(rows, filters, since):
+    """ Generator behind export_rows """
+    for row in rows:
+        if any(row.get(name) != other for name, other in filters.items()):
+            continue
+        if since is not None and row.get("updated_at", 0) < since:
+            continue
+        yield row
+
+
+def export_ndjson(entity, filters=None, since=None, buffer_size=64 * 1024):
+    """ Same as export_rows, as chunks of NDJSON text of about buffer_size characters """
+    return _ndjson_chunks(export_rows(entity, filters, since), buffer_size)
+
+
+def _ndjson_chunks(rows, buffer_size):
+    """ Generator behind export_ndjson """
+    buffer = []
+    size = 0
+
+    for row in rows:
+        line = json.dumps(row) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield "".join(buffer)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in TABLES:
+        sys.exit(__doc__.strip())
+
+    filters = dict(argument.split("=", 1) for argument in sys.argv[2:])
+    since = parse_since(filters.pop("since")) if "since" in filters else None
+
+    try:
+        for chunk in export_ndjson(sys.argv[1], filters, since):
+            sys.stdout.write(chunk)
+    except ValueError as exc:
+        sys.exit(str(exc))
@@ -2,29 +2,212 @@
 """This module defines a class to manage file storage for hbnb evolution"""
 
 import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from data import compression
+from data.binary_snapshot import BinarySnapshot, write_snapshot
+from data.json_stream import iter_rows
+from data.lazy_table import LazyTable
+from data.many_to_many import ManyToMany
+from data.repository import Repository
+from data.transaction import Transaction
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, where the shared mode is not supported
+    fcntl = None
+
+# data file names (without extension) of the tables data/__init__.py loads;
+# the other JSON files next to them (the version file, the batch file) are
+# the storage's own, always read and written as plain JSON
+DATA_FILES = ["country", "country_testing", "city", "amenity", "place", "user", "review", "place_to_amenity"]
+
+
+def shard_of(row_id, count):
+    """ Shard number of a row id; stable across processes, unlike hash() """
+    return zlib.crc32(row_id.encode("utf-8")) % count
+
 
 class FileStorage():
     """ Class for reading from files """
 
+    # when to fsync what we write: never, after every write, or at most
+    # once every fsync_interval seconds per file (a write whose fsync is
+    # skipped is synced once the interval is over, or on close)
+    FSYNC_POLICIES = ("none", "per-write", "interval")
+
+    def __init__(self, write_behind=False, flush_interval=1.0,
+                 journal_file=None, compact_threshold=1024 * 1024,
+                 fsync="per-write", fsync_interval=1.0, shards=1, version_file=None,
+                 batch_file=None):
+        """ constructor
+
+        With write_behind enabled, save_table only marks the table as dirty
+        and a background thread writes the dirty tables at most once every
+        flush_interval seconds, so a burst of writes costs a single dump.
+
+        With a journal_file, tables are no longer rewritten on save. Each
+        change is appended to the journal as one NDJSON record instead, and
+        once the journal grows past compact_threshold bytes it is folded
+        into fresh snapshots of the tables in the background.
+
+        Data files are always replaced atomically (temp file + rename). The
+        fsync policy decides how much of that also survives a power loss.
+
+        A table can be split by id into several data files (shards), e.g.
+        place.0-of-4.json to place.3-of-4.json next to place.json. The
+        shards are loaded in parallel, and saving the table only rewrites
+        the shards holding changed rows. Tables still kept in a single file
+        are split into `shards` files the first time they are saved; use
+        data/reshard.py to change the layout of existing data files.
+
+        Data files may be compressed (place.json.gz or place.json.xz, see
+        data/compression.py). Files are rewritten in the format they are in,
+        and new shards take the format of the file(s) they replace.
+
+        With a version_file, several processes (e.g. gunicorn workers) can
+        share the data files. Saves are serialised with a file lock and
+        bump the table's counter in version_file; refresh() reloads the
+        tables whose counter moved. A table saved by another process since
+        it was read is reloaded before being written, with this process's
+        changes applied on top, so no process overwrites another's rows.
+
+        A transaction (see transaction()) changing several tables is
+        committed as a single journal record. Without a journal its changes
+        are first written to batch_file, then the tables are rewritten and
+        batch_file is removed; a batch interrupted in between is replayed
+        and finished by open_journal() on the next start.
+        """
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError("Invalid fsync policy: {}".format(fsync))
+        if shards < 1:
+            raise ValueError("Invalid number of shards: {}".format(shards))
+        if version_file is not None and journal_file is not None:
+            raise ValueError("The journal can't be shared between processes")
+        if version_file is not None and fcntl is None:
+            raise ValueError("Sharing the data files needs fcntl file locks")
+
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.journal_file = journal_file
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.shards = shards
+        self.version_file = version_file
+        self.batch_file = batch_file
+
+        # model name -> (snapshot filename, table), see load_table
+        self.__tables = {}
+        # model name -> number of files the table is stored in
+        self.__shard_counts = {}
+        # model name -> numbers of the shards holding unsaved changes
+        self.__dirty_shards = {}
+        # model name -> LazyTable proxy, see lazy_table
+        self.__lazy_tables = {}
+        # model name -> (filename, LazyTable proxy), see watch
+        self.__watched = {}
+        # model name -> the files' mtime and size when last read or written
+        self.__signatures = {}
+        self.__watcher = None
+        self.__stop_watching = threading.Event()
+        # model name -> version of the table last read or written, see refresh
+        self.__versions = {}
+        # mtime, size and inode of the version file when last read
+        self.__version_signature = None
+        # random token written to the version file when it is created, so
+        # that versions counted in a version file that was since replaced
+        # are not taken for the current ones, see shared_version
+        self.__epoch = ""
+        # model name -> changes made since the table was last saved (shared mode)
+        self.__changes = {}
+        # serialises refreshes and shared saves within this process
+        self.__shared_lock = threading.RLock()
+        # True while the tables are replaced by private forks, see isolated
+        self.__isolated = False
+        self.__journaling = False
+        # model name -> table waiting to be written by the flusher
+        self.__dirty = {}
+        # journal records not yet appended to the journal file
+        self.__pending = []
+        # .batch: (model name, record) collected by the current thread, see batch
+        self.__local = threading.local()
+        # one batch file write at a time
+        self.__batch_lock = threading.Lock()
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__flusher = None
+        # serialises journal appends with the journal rotation in compact()
+        self.__journal_lock = threading.Lock()
+        self.__compact_lock = threading.Lock()
+        self.__compactor = None
+        # filename -> time of the last fsync, for the 'interval' policy
+        self.__last_fsync = {}
+        # files written since their last fsync, and the timer syncing them
+        self.__unsynced = set()
+        self.__syncer = None
+        # filename -> write counters, see stats()
+        self.__stats = {}
+
     def load_model_data(self, filename):
-        """ Load JSON data from file and returns as dictionary """
+        """ Load JSON data from file and returns as dictionary
+
+        If an up-to-date binary snapshot of the file exists (same name with
+        the .hbs extension, see data/convert_to_binary.py), it is mmap'ed
+        instead and returned as a lazily decoded mapping keyed by id.
+
+        The JSON file is read incrementally: each row goes straight into the
+        id-keyed dictionary, without holding the whole parsed document too.
+
+        If the table is sharded, the shards are loaded in parallel and merged.
+        """
 
         data = {}
 
-        if not Path(filename).is_file():
+        shard_filenames = self.shard_filenames(filename)
+        if shard_filenames is not None:
+            return self.__load_shards(shard_filenames)
+
+        data_filename = self.data_filename(filename)
+        if data_filename is None:
             raise FileNotFoundError("Data file '{}' missing".format(filename))
+        filename = data_filename
+
+        binary_filename = self.binary_snapshot_name(filename)
+        if Path(binary_filename).is_file() and \
+                os.path.getmtime(binary_filename) >= os.path.getmtime(filename):
+            return BinarySnapshot(binary_filename)
 
+        # To make it easier to look for certain ids in the loaded data
+        # the row id (uuid) is also the key for the record
         try:
-            with open(filename, 'r') as f:
-                rows = json.load(f)
-            for key in rows:
-                data[key] = rows[key]
+            with compression.open_text(filename) as f:
+                for name, row in iter_rows(f):
+                    data[row['id']] = row
         except ValueError as exc:
             raise ValueError("Unable to load data from file '{}'".format(filename)) from exc
 
-        # The data at this point is not directly usable. It needs to be cleaned up
-        data = self.reorganise_model_data(data)
+        return data
+
+    def __load_shards(self, filenames):
+        """ Load the shards of a table in parallel and merge them """
+        data = {}
+
+        with ThreadPoolExecutor(max_workers=min(len(filenames), os.cpu_count() or 1)) as pool:
+            for rows in pool.map(self.load_model_data, filenames):
+                # a binary snapshot gets decoded here
+                data.update(rows.items())
 
         return data
 
@@ -49,44 +232,1051 @@ class FileStorage():
     def load_many_to_many_data(self, filename):
         """ many to many data is loaded by this function """
 
-        data = {}
         grouped_data = {}
 
-        if not Path(filename).is_file():
+        data_filename = self.data_filename(filename)
+        if data_filename is None:
             raise FileNotFoundError("Data file '{}' missing".format(filename))
+        filename = data_filename
 
         try:
-            with open(filename, 'r') as f:
-                rows = json.load(f)
-            for key in rows:
-                data[key] = rows[key]
+            with compression.open_text(filename) as f:
+                # name is 'Place_to_Amenity'
+                for name, row in iter_rows(f):
+                    place_id = row['place_id']
+                    amenity_id = row['amenity_id']
+
+                    if place_id not in grouped_data:
+                        grouped_data[place_id] = []
+                    grouped_data[place_id].append(amenity_id)
         except ValueError as exc:
             raise ValueError("Unable to load data from file '{}'".format(filename)) from exc
 
-        # print(data.items())
-
-        for key in data:
-            # key's value is 'Place_to_Amenity'
-            for row in data[key]:
-                place_id = row['place_id']
-                amenity_id = row['amenity_id']
-
-                if place_id not in grouped_data:
-                    grouped_data[place_id] = []
-                grouped_data[place_id].append(amenity_id)
-
         return grouped_data
     
-    @staticmethod
-    def save_model_data(filename=None, data=None):
-        """Save data to JSON file"""
+    def save_model_data(self, filename=None, data=None):
+        """Save data to JSON file
+
+        The data is written to a temp file next to the target which is then
+        renamed over it, so a crash mid-write never leaves a truncated file.
+        A filename ending in .gz or .xz gets compressed as it is written.
+        """
         if filename is None:
             filename = "testing.json"
         if not isinstance(data, dict):
             raise ValueError("Data should be a dictionary")
 
+        directory = os.path.dirname(os.path.abspath(filename))
+        tmp_filename = None
+        try:
+            fd, tmp_filename = tempfile.mkstemp(dir=directory, prefix=Path(filename).name + ".", suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                with compression.text_writer(f, filename) as text:
+                    json.dump(data, text)
+                f.flush()
+                written = f.tell()
+                synced, fsync_time = self.__sync(filename, f.fileno())
+
+            if Path(filename).is_file():
+                shutil.copymode(filename, tmp_filename)
+            os.replace(tmp_filename, filename)
+            tmp_filename = None
+
+            if synced:
+                # make the rename itself durable
+                fsync_time += self.__fsync_dir(directory)
+        except IOError as exc:
+            raise IOError(f"Unable to save data to file '{filename}'") from exc
+        finally:
+            if tmp_filename is not None and Path(tmp_filename).is_file():
+                os.remove(tmp_filename)
+
+        self.__count_write(filename, written, synced, fsync_time)
+
+    def stats(self):
+        """ Return the write counters of every file written so far
+
+        For each filename: number of writes, bytes written, number of fsyncs
+        and the total time (in seconds) spent in fsync.
+        """
+        with self.__lock:
+            return {filename: dict(counters) for filename, counters in self.__stats.items()}
+
+    def __sync(self, filename, fd):
+        """ fsync fd if the policy asks for it; returns (synced, seconds spent) """
+        now = time.monotonic()
+
+        if self.fsync == "none":
+            return False, 0.0
+        if self.fsync == "interval":
+            with self.__lock:
+                if now - self.__last_fsync.get(filename, 0.0) < self.fsync_interval:
+                    return False, 0.0
+                self.__last_fsync[filename] = now
+
+        os.fsync(fd)
+        return True, time.monotonic() - now
+
+    @staticmethod
+    def __fsync_dir(directory):
+        """ fsync a directory so a rename inside it is durable; returns seconds spent """
+        start = time.monotonic()
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            # not supported on this platform (e.g. Windows)
+            return 0.0
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        return time.monotonic() - start
+
+    def __count_write(self, filename, written, synced, fsync_time):
+        """ Add a write to the counters of filename
+
+        Called once the write is complete (renamed into place), so that a
+        write whose fsync the 'interval' policy skipped can be synced later.
+        """
+        with self.__lock:
+            if not synced and self.fsync == "interval":
+                self.__defer_sync(filename)
+            counters = self.__stats.setdefault(filename, {
+                "writes": 0, "bytes_written": 0, "fsyncs": 0, "fsync_time": 0.0
+            })
+            counters["writes"] += 1
+            counters["bytes_written"] += written
+            if synced:
+                counters["fsyncs"] += 1
+                counters["fsync_time"] += fsync_time
+
+    def __defer_sync(self, filename):
+        """ fsync filename once its interval is over; self.__lock must be held """
+        self.__unsynced.add(filename)
+        if self.__syncer is not None:
+            return
+
+        delay = self.__last_fsync.get(filename, 0.0) + self.fsync_interval - time.monotonic()
+        self.__syncer = threading.Timer(max(delay, 0.0), self.__sync_deferred_quietly)
+        self.__syncer.daemon = True
+        self.__syncer.start()
+
+    def __sync_deferred(self):
+        """ fsync the files written since their last fsync """
+        with self.__lock:
+            filenames = self.__unsynced
+            self.__unsynced = set()
+            self.__syncer = None
+
+        for filename in filenames:
+            start = time.monotonic()
+            try:
+                fd = os.open(filename, os.O_RDONLY)
+            except FileNotFoundError:
+                # removed since (e.g. a finished batch file)
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            fsync_time = time.monotonic() - start + self.__fsync_dir(os.path.dirname(os.path.abspath(filename)))
+
+            with self.__lock:
+                self.__last_fsync[filename] = start
+                counters = self.__stats[filename]
+                counters["fsyncs"] += 1
+                counters["fsync_time"] += fsync_time
+
+    def __sync_deferred_quietly(self):
+        """ Background timer: __sync_deferred, reporting errors instead of raising them """
+        try:
+            self.__sync_deferred()
+        except OSError as exc:
+            print("Deferred fsync failed: {}".format(exc), file=sys.stderr)
+
+    def load_table(self, filename, name, indexes=None, sorted_indexes=None):
+        """ Load a model's data file into a Repository bound to that file """
+        # read the version first: if another process saves the table during
+        # the load, the next refresh loads it again
+        version = self.__read_versions().get(name, 0)
+        shard_filenames = self.shard_filenames(filename)
+        table = Repository(self.load_model_data(filename), indexes=indexes, name=name,
+                           sorted_indexes=sorted_indexes)
+
+        with self.__lock:
+            self.__shard_counts[name] = len(shard_filenames) if shard_filenames else 1
+
+        return self.__register(filename, table, version)
+
+    def load_many_to_many_table(self, filename, name):
+        """ Load a many to many data file into a ManyToMany table bound to that file """
+        version = self.__read_versions().get(name, 0)
+        table = ManyToMany(self.load_many_to_many_data(filename), name=name)
+
+        return self.__register(filename, table, version)
+
+    def __register(self, filename, table, version):
+        """ Replay the table's journaled changes and bind it to this storage """
+        self.__replay_table(table)
+        # changes are reported to record(), which journals them, tracks the
+        # dirty shards, keeps the changes to re-apply in shared mode and
+        # collects the changes made by a transaction
+        table.journal = self
+
+        with self.__lock:
+            self.__tables[table.name] = (filename, table)
+            self.__versions[table.name] = version
+
+        return table
+
+    def lazy_table(self, filename, name, indexes=None, sorted_indexes=None):
+        """ Same as load_table, but the file is only loaded on first access """
+        table = LazyTable(lambda: self.__load_watched(name, filename,
+                                                      lambda: self.load_table(filename, name, indexes, sorted_indexes)))
+        self.__lazy_tables[name] = table
+        self.__watched[name] = (filename, table)
+
+        return table
+
+    def lazy_many_to_many_data(self, filename, name):
+        """ Same as load_many_to_many_table, but the file is only loaded on first access """
+        table = LazyTable(lambda: self.__load_watched(name, filename,
+                                                      lambda: self.load_many_to_many_table(filename, name)))
+        self.__lazy_tables[name] = table
+        self.__watched[name] = (filename, table)
+
+        return table
+
+    # --- snapshots ---
+
+    def snapshot(self, *tables):
+        """ Read-only views of the given tables, all as of the same moment
+
+        Each view is taken in O(1) (see Repository.snapshot), so a request
+        can take one of every table it reads and get a consistent answer
+        while other threads keep writing.
+        """
+        return Repository.snapshot_all(
+            table.load() if isinstance(table, LazyTable) else table for table in tables)
+
+    @contextmanager
+    def isolated(self):
+        """ Run a with block against private copies of the tables
+
+        Every lazy table is replaced by an O(1) fork for the duration of the
+        block, and saves are skipped, so a test can change what it likes
+        without touching the data files or what other tests see.
+        """
+        if self.__isolated:
+            raise RuntimeError("The tables are already isolated")
+
+        originals = {}
+        for name, table in self.__lazy_tables.items():
+            originals[name] = table.load()
+            table.swap(originals[name].fork())
+        self.__isolated = True
+
+        try:
+            yield
+        finally:
+            self.__isolated = False
+            for name, table in originals.items():
+                self.__lazy_tables[name].swap(table)
+
+    # --- hot reload ---
+
+    def watch(self, interval=1.0):
+        """ Reload data files changed by someone else, polling every interval seconds
+
+        Only mtimes and sizes are polled. A changed file is loaded in the
+        background and then swapped in for the old table (see
+        LazyTable.reload). Changes made through a table that is being
+        reloaded are lost unless they are journaled.
+        """
+        with self.__lock:
+            if self.__watcher is not None:
+                return
+            self.__stop_watching.clear()
+            self.__watcher = threading.Thread(target=self.__watch_loop, args=(interval,), daemon=True)
+            self.__watcher.start()
+
+    def reload_changed(self):
+        """ Reload the loaded tables whose files changed on disk; returns their names """
+        reloaded = []
+
+        for key, (filename, table) in list(self.__watched.items()):
+            if not table.loaded:
+                # it will read the current files when first used
+                continue
+
+            signature = self.__signature(filename)
+            with self.__lock:
+                unchanged = signature == self.__signatures.get(key)
+                # don't throw away changes that have not been written yet
+                unsaved = key in self.__dirty or (not self.__journaling and key in self.__dirty_shards)
+            if unchanged or unsaved:
+                continue
+
+            try:
+                table.reload()
+            except (IOError, ValueError) as exc:
+                # e.g. caught half way through a non-atomic write;
+                # keep the old table and try again on the next poll
+                print("Unable to reload '{}': {}".format(filename, exc), file=sys.stderr)
+                continue
+            reloaded.append(key)
+
+        return reloaded
+
+    def __watch_loop(self, interval):
+        """ Background thread: poll the data files for changes """
+        while not self.__stop_watching.wait(interval):
+            self.reload_changed()
+
+    def __load_watched(self, key, filename, loader):
+        """ Run loader and remember what the files looked like before reading them """
+        # taken first, so a change made during the load is picked up next time
+        signature = self.__signature(filename)
+        table = loader()
+        with self.__lock:
+            self.__signatures[key] = signature
+
+        return table
+
+    def __signature(self, filename):
+        """ Names, mtimes and sizes of the files a data file is read from """
+        filenames = self.shard_filenames(filename) or [self.data_filename(filename)]
+        filenames = [name for name in filenames if name is not None]
+        filenames += [self.binary_snapshot_name(name) for name in filenames
+                      if Path(self.binary_snapshot_name(name)).is_file()]
+
+        signature = []
+        for name in filenames:
+            try:
+                stat = os.stat(name)
+            except OSError:
+                continue
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+
+        return tuple(signature)
+
+    @staticmethod
+    def binary_snapshot_name(filename):
+        """ Name of the binary snapshot matching a JSON data file """
+        return str(Path(compression.strip_suffix(filename)).with_suffix(".hbs"))
+
+    @staticmethod
+    def data_filename(filename):
+        """ The file holding a data file: itself or a compressed variant
+
+        Returns the most recently written of place.json, place.json.gz and
+        place.json.xz (etc.), or None if there is none.
+        """
+        filenames = [name for name in FileStorage.__variants(filename) if Path(name).is_file()]
+        if not filenames:
+            return None
+
+        return max(filenames, key=os.path.getmtime)
+
+    @staticmethod
+    def __variants(filename):
+        """ Every name a data file can be stored under """
+        filename = compression.strip_suffix(filename)
+        return [filename] + [filename + suffix for suffix in compression.SUFFIXES]
+
+    @staticmethod
+    def shard_filename(filename, number, count):
+        """ Name of one shard of a data file: place.json -> place.0-of-4.json """
+        path = Path(filename)
+        return str(path.with_name("{}.{}-of-{}{}".format(path.stem, number, count, path.suffix)))
+
+    @staticmethod
+    def shard_filenames(filename):
+        """ The shards of a data file in shard order, or None if it isn't sharded
+
+        If an interrupted reshard left two complete sets of shards behind,
+        the most recently written set wins.
+        """
+        path = Path(compression.strip_suffix(filename))
+        pattern = re.compile(r"{}\.(\d+)-of-(\d+){}({})?$".format(
+            re.escape(path.stem), re.escape(path.suffix),
+            "|".join(re.escape(suffix) for suffix in compression.SUFFIXES)))
+
+        # shard count -> { shard number -> filename }
+        found = {}
+        for candidate in path.parent.glob("{}.*-of-*{}*".format(path.stem, path.suffix)):
+            match = pattern.match(candidate.name)
+            if match:
+                number, count = int(match.group(1)), int(match.group(2))
+                if number < count:
+                    found.setdefault(count, {})[number] = str(candidate)
+
+        complete = [[shards[number] for number in range(count)]
+                    for count, shards in found.items() if len(shards) == count]
+        if not complete:
+            return None
+
+        return max(complete, key=lambda filenames: min(os.path.getmtime(name) for name in filenames))
+
+    def save_snapshot(self, table):
+        """ Rewrite a table's data file in the same format it was loaded from
+
+        For a sharded table, only the shards with changes are rewritten.
+        """
+        filename = self.__tables[table.name][0]
+        self.__write_snapshot(filename, table)
+
+        # our own writes are not changes to reload
+        if table.name in self.__watched:
+            signature = self.__signature(filename)
+            with self.__lock:
+                self.__signatures[table.name] = signature
+
+    def __write_snapshot(self, filename, table):
+        """ Rewrite the files of a table, see save_snapshot """
+        if isinstance(table, ManyToMany):
+            # links are not sharded
+            self.save_model_data(self.data_filename(filename) or filename, {table.name: table.to_rows()})
+            return
+
+        with self.__lock:
+            count = self.__shard_counts.get(table.name, 1)
+            dirty = self.__dirty_shards.pop(table.name, set())
+
+        if count == 1 and self.shards == 1:
+            self.__write_data_file(filename, table.name, table.to_dict())
+            return
+
+        if count == 1:
+            # first save of a table still kept in a single file: split it up
+            suffix = compression.suffix_of(self.data_filename(filename) or filename)
+            self.__write_shards(filename, table.name, table.to_dict(), self.shards, suffix=suffix)
+            self.__remove_data_file(filename)
+            with self.__lock:
+                self.__shard_counts[table.name] = self.shards
+            return
+
+        try:
+            self.__write_shards(filename, table.name, table.to_dict(), count, dirty)
+        except IOError:
+            with self.__lock:
+                self.__dirty_shards.setdefault(table.name, set()).update(dirty)
+            raise
+
+    def reshard(self, filename, name, count):
+        """ Rewrite a data file (sharded or not) as count shards
+
+        count 1 puts the table back into a single file. Meant for the
+        data/reshard.py tool, while the app is not running.
+        """
+        if count < 1:
+            raise ValueError("Invalid number of shards: {}".format(count))
+
+        old_filenames = self.shard_filenames(filename) or [self.data_filename(filename)]
+        suffix = compression.suffix_of(old_filenames[0])
+        rows = dict(self.load_model_data(filename).items())
+
+        # write the new files before removing the old ones, so the data
+        # is complete on disk at any point
+        if count == 1:
+            new_filenames = [self.__write_data_file(filename, name, rows, suffix)]
+        else:
+            new_filenames = self.__write_shards(filename, name, rows, count, suffix=suffix)
+
+        for old_filename in old_filenames:
+            if old_filename not in new_filenames:
+                self.__remove_data_file(old_filename)
+
+        return new_filenames
+
+    def __write_shards(self, filename, name, rows, count, numbers=None, suffix=""):
+        """ Write the given shards (all of them by default) of a table
+
+        Returns the names of the files written.
+        """
+        numbers = range(count) if numbers is None else numbers
+        shards = {number: {} for number in numbers}
+        if not shards:
+            return []
+
+        for row_id, row in rows.items():
+            shard = shards.get(shard_of(row_id, count))
+            if shard is not None:
+                shard[row_id] = row
+
+        return [self.__write_data_file(self.shard_filename(filename, number, count), name, shard, suffix)
+                for number, shard in shards.items()]
+
+    def __write_data_file(self, filename, name, rows, suffix=""):
+        """ Write rows (keyed by id) to a data file; returns the name written
+
+        The file keeps its current format; a new file gets the compression
+        extension suffix ('' for plain JSON).
+        """
+        filename = self.data_filename(filename) or compression.strip_suffix(filename) + suffix
+        self.save_model_data(filename, {name: list(rows.values())})
+
+        # keep an existing binary snapshot in step, or it would go stale
+        binary_filename = self.binary_snapshot_name(filename)
+        if Path(binary_filename).is_file():
+            write_snapshot(binary_filename, name, rows)
+
+        return filename
+
+    def __remove_data_file(self, filename):
+        """ Remove a data file replaced by other files, with its binary snapshot """
+        for path in self.__variants(filename) + [self.binary_snapshot_name(filename)]:
+            if Path(path).is_file():
+                os.remove(path)
+
+    def save_table(self, table):
+        """ Save a table now, or mark it dirty when write-behind is enabled """
+        if self.__isolated:
+            return
+
+        if not self.write_behind:
+            self.__commit({table.name: table})
+            return
+
+        with self.__lock:
+            self.__dirty[table.name] = table
+            if self.__flusher is None:
+                self.__stop.clear()
+                self.__flusher = threading.Thread(target=self.__flush_loop, daemon=True)
+                self.__flusher.start()
+
+    def flush(self):
+        """ Write every dirty table (or the pending journal records) to disk """
+        with self.__lock:
+            dirty = self.__dirty
+            self.__dirty = {}
+
         try:
-            with open(filename, 'w') as f:
-                json.dump(data, f)
+            self.__commit(dirty)
+        except Exception:
+            # keep the tables dirty so the next flush retries them,
+            # unless they have been marked dirty again in the meantime
+            with self.__lock:
+                for name, table in dirty.items():
+                    self.__dirty.setdefault(name, table)
+            raise
+
+    def close(self):
+        """ Stop the background threads and write whatever is still dirty """
+        with self.__lock:
+            flusher = self.__flusher
+            self.__flusher = None
+            watcher = self.__watcher
+            self.__watcher = None
+
+        if watcher is not None:
+            self.__stop_watching.set()
+            watcher.join()
+
+        if flusher is not None:
+            self.__stop.set()
+            flusher.join()
+
+        self.flush()
+
+        # don't leave a half-written snapshot behind
+        with self.__lock:
+            compactor = self.__compactor
+        if compactor is not None:
+            compactor.join()
+
+        # with the 'interval' policy the last writes may not be synced yet
+        with self.__lock:
+            syncer = self.__syncer
+        if syncer is not None:
+            syncer.cancel()
+        self.__sync_deferred()
+
+    def __commit(self, tables):
+        """ Persist the given tables: append to the journal or rewrite them """
+        if self.version_file is not None:
+            self.__commit_shared(tables)
+            return
+
+        if self.journal_file is None:
+            for table in tables.values():
+                self.save_snapshot(table)
+            return
+
+        # the journal holds the changes of every table, so a single
+        # append commits everything recorded so far
+        self.__append_journal()
+
+    def __flush_loop(self):
+        """ Background thread: group the writes made during each interval """
+        while not self.__stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as exc:
+                # whatever failed, the thread keeps running: the tables stay
+                # dirty and the next interval retries them
+                print("Write-behind flush failed: {!r}".format(exc), file=sys.stderr)
+
+    # --- transactions ---
+
+    @contextmanager
+    def transaction(self):
+        """ Group changes to several tables into one atomic commit, see Transaction
+
+        The changes are applied when the with block ends, and not at all
+        if it raises.
+        """
+        transaction = Transaction(self)
+        yield transaction
+        transaction.commit()
+
+    @contextmanager
+    def batch(self, persist=True):
+        """ Persist the changes this thread makes in the with block as one commit
+
+        On a normal exit the changes are persisted together, right away
+        (write-behind does not apply): one journal record, or the batch
+        file followed by the rewrite of the tables. If the block raises or
+        persist is False, nothing is written; undoing the changes in memory
+        is up to the caller (see Transaction.commit).
+        """
+        if getattr(self.__local, "batch", None) is not None:
+            raise RuntimeError("Batches can't be nested")
+
+        self.__local.batch = records = []
+        try:
+            yield
+        finally:
+            self.__local.batch = None
+
+        if persist and records:
+            self.__commit_batch(records)
+
+    def __commit_batch(self, records):
+        """ Persist the (model name, record) of a batch in one commit """
+        line = '{{"type": "batch", "records": [{}]}}'.format(", ".join(record for _, record in records))
+
+        if self.journal_file is not None:
+            with self.__lock:
+                self.__pending.append(line)
+            self.__append_journal()
+            return
+
+        tables = {}
+        for name, _ in records:
+            if name not in tables:
+                tables[name] = self.__table_named(name)
+
+        if self.version_file is not None:
+            self.__commit_shared(tables, line)
+            return
+
+        if self.batch_file is None:
+            # no batch file: the tables can't be rewritten atomically
+            for table in tables.values():
+                self.save_snapshot(table)
+            return
+
+        with self.__batch_lock:
+            self.__finish_batch()
+            self.__write_batch_file(line)
+            try:
+                for table in tables.values():
+                    self.save_snapshot(table)
+            except IOError as exc:
+                # the batch is safe in the batch file, which the next batch
+                # (or the next start) finishes
+                print("Unable to save batch, kept in '{}': {}".format(self.batch_file, exc), file=sys.stderr)
+                return
+            os.remove(self.batch_file)
+
+    def __write_batch_file(self, line):
+        """ Write a batch record to the batch file, atomically """
+        directory = os.path.dirname(os.path.abspath(self.batch_file))
+        tmp_filename = "{}.tmp".format(self.batch_file)
+        try:
+            with open(tmp_filename, 'w') as f:
+                written = f.write(line + "\n")
+                f.flush()
+                synced, fsync_time = self.__sync(self.batch_file, f.fileno())
+            os.replace(tmp_filename, self.batch_file)
+            if synced:
+                fsync_time += self.__fsync_dir(directory)
         except IOError as exc:
-            raise IOError(f"Unable to save data to file '{filename}'") from exc
\ No newline at end of file
+            raise IOError(f"Unable to write batch file '{self.batch_file}'") from exc
+
+        self.__count_write(self.batch_file, written, synced, fsync_time)
+
+    def __finish_batch(self):
+        """ Finish a batch interrupted before all its tables were rewritten """
+        if self.batch_file is None or not Path(self.batch_file).is_file():
+            return
+
+        tables = {}
+        for record in self.__read_journal(self.batch_file):
+            name = record["type"]
+            if name not in tables:
+                tables[name] = self.__table_named(name)
+            # already there if the table was loaded after the batch was
+            # written; the table reports the change, e.g. to mark its shard dirty
+            self.__apply_change(tables[name], record["op"], record["id"], record["data"])
+
+        if self.version_file is not None:
+            self.__save_shared(tables)
+        else:
+            for table in tables.values():
+                self.save_snapshot(table)
+        os.remove(self.batch_file)
+
+    def __recover_batch(self):
+        """ Finish a batch left behind by a crash, see __finish_batch """
+        if self.batch_file is None or not Path(self.batch_file).is_file():
+            return
+
+        if self.version_file is not None:
+            with self.__shared_lock, self.__file_lock():
+                self.__finish_batch()
+        else:
+            with self.__batch_lock:
+                self.__finish_batch()
+
+    def __table_named(self, name):
+        """ The current table of a model, loading it if needed """
+        with self.__lock:
+            if name in self.__tables:
+                return self.__tables[name][1]
+
+        return self.__lazy_tables[name].load()
+
+    # --- sharing the data files between processes ---
+
+    def refresh(self):
+        """ Reload the tables other processes have saved since we last read them
+
+        Meant to run at the start of every request: when nothing changed,
+        it costs a single stat() of the version file. Returns the names of
+        the tables reloaded.
+        """
+        if self.version_file is None:
+            return []
+
+        try:
+            stat = os.stat(self.version_file)
+        except FileNotFoundError:
+            return []
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if signature == self.__version_signature:
+            return []
+
+        with self.__shared_lock:
+            versions = self.__read_versions()
+            with self.__lock:
+                stale = [name for name in self.__tables
+                         if versions.get(name, 0) != self.__versions.get(name, 0)]
+
+            for name in stale:
+                self.__rebase(name)
+            self.__version_signature = signature
+
+        return stale
+
+    def shared_version(self, name):
+        """ Token of the saved state of a table, the same in every process sharing the data files
+
+        None if the data files aren't shared, or if the table has changes
+        not saved yet, or its lazy proxy is not serving the table the
+        version was read with yet (see __rebase).
+        """
+        if self.version_file is None or self.__isolated:
+            return None
+
+        proxy = self.__lazy_tables.get(name)
+        with self.__lock:
+            if name not in self.__tables or self.__changes.get(name):
+                return None
+            table = self.__tables[name][1]
+            version = self.__versions.get(name, 0)
+            epoch = self.__epoch
+        if proxy is not None and proxy.load() is not table:
+            return None
+
+        return "{}.{}".format(epoch, version)
+
+    def __commit_shared(self, tables, batch=None):
+        """ Save tables while holding the lock shared with the other processes
+
+        batch is the record of a batch (see batch()), written to the batch
+        file before the tables are saved.
+        """
+        if not tables:
+            return
+
+        with self.__shared_lock, self.__file_lock():
+            self.__finish_batch()
+            if batch is not None and self.batch_file is not None:
+                self.__write_batch_file(batch)
+
+            self.__save_shared(tables)
+
+            if batch is not None and self.batch_file is not None:
+                os.remove(self.batch_file)
+
+    def __save_shared(self, tables):
+        """ Save tables and bump their versions; the file lock must be held """
+        versions = self.__read_versions()
+
+        for name in tables:
+            with self.__lock:
+                stale = versions.get(name, 0) != self.__versions.get(name, 0)
+            # another process saved the table since we read it: start from its version
+            table = self.__rebase(name) if stale else self.__tables[name][1]
+
+            with self.__lock:
+                saved = len(self.__changes.get(name, []))
+            self.save_snapshot(table)
+
+            versions[name] = versions.get(name, 0) + 1
+            with self.__lock:
+                del self.__changes.get(name, [])[:saved]
+                self.__versions[name] = versions[name]
+
+        if "epoch" not in versions:
+            versions["epoch"] = self.__epoch = uuid.uuid4().hex[:12]
+        self.save_model_data(self.version_file, versions)
+
+    def __rebase(self, name):
+        """ Reload a table from disk and apply the changes not saved yet on top """
+        filename, table = self.__tables[name]
+        version = self.__read_versions().get(name, 0)
+        if isinstance(table, ManyToMany):
+            fresh = ManyToMany(self.load_many_to_many_data(filename), name=name)
+        else:
+            fresh = Repository(self.load_model_data(filename), indexes=table.indexes, name=name,
+                               sorted_indexes=table.sorted_indexes)
+
+        with self.__lock:
+            changes = list(self.__changes.get(name, []))
+        for op, row_id, data in changes:
+            self.__apply_change(fresh, op, row_id, data)
+        fresh.journal = self
+
+        proxy = self.__lazy_tables.get(name)
+        if proxy is None:
+            # nothing to swap it behind: refresh the table in place
+            table.load(fresh.to_dict())
+            fresh = table
+
+        with self.__lock:
+            self.__tables[name] = (filename, fresh)
+            self.__versions[name] = version
+        if proxy is not None:
+            proxy.swap(fresh)
+
+        return fresh
+
+    def __read_versions(self):
+        """ Table versions from the version file (empty when not sharing); also remembers its epoch """
+        if self.version_file is None:
+            return {}
+
+        try:
+            with open(self.version_file, 'r') as f:
+                versions = json.load(f)
+        except FileNotFoundError:
+            return {}
+
+        self.__epoch = versions.get("epoch", "")
+        return versions
+
+    @contextmanager
+    def __file_lock(self):
+        """ Hold the exclusive lock shared by every process using the data files """
+        with open(self.version_file + ".lock", 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    # --- write-ahead journal ---
+
+    def open_journal(self):
+        """ Start journaling the changes made to the tables
+
+        The journaled changes of a table are replayed on top of its data file
+        when it is loaded, so tables loaded with lazy_table don't have to be
+        loaded up front. A batch left behind by a crash is finished first.
+        """
+        self.__recover_batch()
+        if self.journal_file is None:
+            return
+
+        with self.__lock:
+            self.__journaling = True
+            loaded = [table for filename, table in self.__tables.values()]
+
+        for table in loaded:
+            # a sharded table already reports its changes; replayed changes
+            # must not be journaled a second time
+            table.journal = None
+            self.__replay_table(table)
+            table.journal = self
+
+    def record(self, name, op, row_id, data=None):
+        """ Queue a change record (insert, update or delete) for the journal
+
+        Also marks the shard holding the row as dirty for sharded tables,
+        and keeps the change until the table is saved in shared mode.
+        """
+        self.__mark_dirty(name, row_id)
+        if self.version_file is not None:
+            with self.__lock:
+                self.__changes.setdefault(name, []).append((op, row_id, data))
+
+        batch = getattr(self.__local, "batch", None)
+        if batch is None and not self.__journaling:
+            return
+
+        # serialise right away: the row may be changed again before the append
+        line = json.dumps({"type": name, "op": op, "id": row_id, "data": data})
+        if batch is not None:
+            batch.append((name, line))
+            return
+        with self.__lock:
+            self.__pending.append(line)
+
+    def __mark_dirty(self, name, row_id):
+        """ Remember that the shard holding row_id needs to be rewritten """
+        with self.__lock:
+            count = self.__shard_counts.get(name, 1)
+            if count > 1:
+                self.__dirty_shards.setdefault(name, set()).add(shard_of(row_id, count))
+
+    def compact(self):
+        """ Fold the journal into fresh snapshots of the tables it mentions """
+        with self.__compact_lock:
+            old_journal = self.journal_file + ".old"
+
+            # rotate the journal: changes recorded from now on go to a new
+            # journal, and are replayed on top of the snapshots written below
+            with self.__journal_lock:
+                if Path(self.journal_file).is_file():
+                    if Path(old_journal).is_file():
+                        # a previous compaction did not finish, keep its records too
+                        with open(old_journal, 'a') as dst, open(self.journal_file, 'r') as src:
+                            shutil.copyfileobj(src, dst)
+                        os.remove(self.journal_file)
+                    else:
+                        os.replace(self.journal_file, old_journal)
+
+            if not Path(old_journal).is_file():
+                return
+
+            # only the tables with journaled changes need a new snapshot;
+            # lazy tables get loaded here, which replays their changes
+            for name in self.__journaled_names(old_journal):
+                if name in self.__tables:
+                    self.save_snapshot(self.__tables[name][1])
+                elif name in self.__lazy_tables:
+                    self.save_snapshot(self.__lazy_tables[name].load())
+
+            os.remove(old_journal)
+
+    def __append_journal(self):
+        """ Append the pending records to the journal file """
+        with self.__journal_lock:
+            with self.__lock:
+                lines = self.__pending
+                self.__pending = []
+
+            if not lines:
+                return
+
+            try:
+                with open(self.journal_file, 'a') as f:
+                    written = f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    synced, fsync_time = self.__sync(self.journal_file, f.fileno())
+                    size = f.tell()
+            except IOError as exc:
+                with self.__lock:
+                    self.__pending[:0] = lines
+                raise IOError(f"Unable to append to journal '{self.journal_file}'") from exc
+
+            self.__count_write(self.journal_file, written, synced, fsync_time)
+
+        if size >= self.compact_threshold:
+            self.__start_compaction()
+
+    def __start_compaction(self):
+        """ Run compact() in a background thread unless one is already running """
+        with self.__lock:
+            if self.__compactor is not None and self.__compactor.is_alive():
+                return
+            self.__compactor = threading.Thread(target=self.__compact_quietly, daemon=True)
+            self.__compactor.start()
+
+    def __compact_quietly(self):
+        """ Background thread body for compact() """
+        try:
+            self.compact()
+        except Exception as exc:
+            # the rotated journal is kept, and folded in by the next compaction
+            print("Journal compaction failed: {!r}".format(exc), file=sys.stderr)
+
+    def __read_journal(self, path):
+        """ Yield the records of a journal file, unpacking the batches """
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a torn write at the tail of the journal, nothing follows it
+                    break
+
+                if record["type"] == "batch":
+                    yield from record["records"]
+                else:
+                    yield record
+
+    def __journaled_names(self, path):
+        """ Names of the tables with at least one record in a journal file """
+        return {record["type"] for record in self.__read_journal(path)}
+
+    def __replay_table(self, table):
+        """ Apply the journaled changes of a table (rotated journal first) """
+        paths = [self.batch_file] if self.batch_file is not None else []
+        if self.__journaling:
+            paths += [self.journal_file + ".old", self.journal_file]
+
+        for path in paths:
+            if not Path(path).is_file():
+                continue
+
+            for record in self.__read_journal(path):
+                if record["type"] != table.name:
+                    continue
+                row_id = record["id"]
+
+                # the records are idempotent, so replaying changes that are
+                # already part of the snapshot is harmless
+                self.__apply_change(table, record["op"], row_id, record["data"])
+
+    def __apply_change(self, table, op, row_id, data):
+        """ Apply a change record to a table that is not reporting its changes """
+        if op == "insert":
+            table.insert(data)
+        elif op == "update" and row_id in table:
+            table.update(row_id, data)
+        elif op == "delete" and row_id in table:
+            table.delete(row_id)
+        elif op == "link":
+            table.link(row_id, data)
+        elif op == "unlink":
+            table.unlink(row_id, data)
+        else:
+            return
+
+        # the change is not in the shard files yet
+        self.__mark_dirty(table.name, row_id)
@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+"""This module defines an incremental reader for the hbnb evolution data files
+
+The data files look like {"Place": [ {row}, {row}, ... ]}. Instead of
+parsing the whole document at once, iter_rows reads the file in chunks and
+decodes one row at a time, so only the current chunk and the rows kept by
+the caller are held in memory.
+"""
+
+import json
+
+WHITESPACE = " \t\n\r"
+
+
+class _Reader():
+    """ Chunked text buffer with just enough helpers to walk the top level """
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        """ Read another chunk; returns False at the end of the file """
+        if self.eof:
+            return False
+
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        # drop what has been consumed already so the buffer stays small
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """ Return the next non-whitespace character (without consuming it) """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of data")
+
+    def expect(self, char):
+        """ Consume char, which must be the next non-whitespace character """
+        if self.peek() != char:
+            raise ValueError("Expected '{}' at position {}".format(char, self.pos))
+        self.pos += 1
+
+    def value(self):
+        """ Decode the next complete JSON value, reading more data as needed """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # the value may just be cut off at the end of the buffer
+                if self.fill():
+                    continue
+                raise
+            self.pos = end
+            return value
+
+
+def iter_rows(f, chunk_size=64 * 1024):
+    """ Yield (model name, row) for every row of an open data file """
+    reader = _Reader(f, chunk_size)
+    # json.load shares the field names between all the rows of a document,
+    # but each raw_decode call starts afresh, so share them here instead
+    keys = {}
+
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        # key is the model name: 'Place', 'Country', etc.
+        name = reader.value()
+        reader.expect(":")
+        reader.expect("[")
+
+        if reader.peek() != "]":
+            while True:
+                row = reader.value()
+                if isinstance(row, dict):
+                    row = {keys.setdefault(key, key): value for key, value in row.items()}
+                yield name, row
+                if reader.peek() == "]":
+                    break
+                reader.expect(",")
+        reader.expect("]")
+
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""This module defines a proxy that loads a table on first access for hbnb evolution"""
+
+import threading
+from collections.abc import Mapping
+
+
+class LazyTable(Mapping):
+    """ Stand-in for a table (Repository or dict) that is loaded on first use
+
+    `loader` is called once, by whichever thread touches the table first;
+    other threads wait for it and then share the same table. Everything else
+    is forwarded to the loaded table.
+    """
+
+    def __init__(self, loader):
+        """ constructor """
+        self.__loader = loader
+        self.__table = None
+        self.__lock = threading.Lock()
+
+    def load(self):
+        """ Load the table if it isn't loaded yet, and return it """
+        table = self.__table
+        if table is None:
+            with self.__lock:
+                if self.__table is None:
+                    self.__table = self.__loader()
+                table = self.__table
+
+        return table
+
+    def reload(self):
+        """ Load the table again and swap it in
+
+        The old table keeps serving until the new one is fully loaded, so
+        readers get one or the other, never a half-loaded table.
+        """
+        return self.swap(self.__loader())
+
+    def swap(self, table):
+        """ Replace the table with an already loaded one """
+        with self.__lock:
+            self.__table = table
+
+        return table
+
+    @property
+    def loaded(self):
+        """ True once the table has been loaded """
+        return self.__table is not None
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def __contains__(self, key):
+        return key in self.load()
+
+    def get(self, key, default=None):
+        return self.load().get(key, default)
+
+    def keys(self):
+        return self.load().keys()
+
+    def values(self):
+        return self.load().values()
+
+    def items(self):
+        return self.load().items()
+
+    def __getattr__(self, name):
+        # only called for attributes the proxy itself doesn't have
+        return getattr(self.load(), name)
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""This module defines a many to many relation table for hbnb evolution"""
+
+import threading
+import time
+from collections.abc import Mapping
+from data.repository import next_version
+
+
+class ManyToMany(Mapping):
+    """ Relation between two tables, e.g. places and their amenities
+
+    Reads like the dict load_many_to_many_data returns: left id (place id)
+    -> list of right ids (amenity ids). link() and unlink() change it and,
+    like Repository, report the change to an attached journal. The lists
+    are replaced rather than changed in place, so one handed out earlier
+    never changes under the reader. version and modified change with every
+    write, as for a Repository.
+    """
+
+    def __init__(self, grouped=None, name=None, left="place_id", right="amenity_id"):
+        """ constructor """
+        # model name ('Place_to_Amenity') used in the data files
+        self.name = name
+        # field names of the two ids in the data file
+        self.left = left
+        self.right = right
+        self.journal = None
+        self.version = next_version()
+        self.modified = time.time()
+
+        self.__grouped = {key: list(ids) for key, ids in (grouped or {}).items()}
+        self.__lock = threading.Lock()
+
+    def __getitem__(self, left_id):
+        return self.__grouped[left_id]
+
+    def __iter__(self):
+        return iter(list(self.__grouped))
+
+    def __len__(self):
+        return len(self.__grouped)
+
+    def __contains__(self, left_id):
+        return left_id in self.__grouped
+
+    def linked(self, left_id, right_id):
+        """ True if the two ids are linked """
+        return right_id in self.__grouped.get(left_id, ())
+
+    def link(self, left_id, right_id):
+        """ Link two ids (does nothing if they are linked already) """
+        with self.__lock:
+            ids = self.__grouped.get(left_id, [])
+            if right_id in ids:
+                return
+            self.__grouped[left_id] = ids + [right_id]
+            self.version = next_version()
+            self.modified = time.time()
+
+            if self.journal is not None:
+                self.journal.record(self.name, "link", left_id, right_id)
+
+    def unlink(self, left_id, right_id):
+        """ Remove the link between two ids (does nothing if there is none) """
+        with self.__lock:
+            ids = self.__grouped.get(left_id, [])
+            if right_id not in ids:
+                return
+            ids = [other for other in ids if other != right_id]
+            if ids:
+                self.__grouped[left_id] = ids
+            else:
+                del self.__grouped[left_id]
+            self.version = next_version()
+            self.modified = time.time()
+
+            if self.journal is not None:
+                self.journal.record(self.name, "unlink", left_id, right_id)
+
+    def to_rows(self):
+        """ The links as rows, the way they are stored in the data file """
+        return [{self.left: left_id, self.right: right_id}
+                for left_id, ids in list(self.__grouped.items()) for right_id in ids]
+
+    def to_dict(self):
+        """ Copy of the links as a plain dict: left id -> list of right ids """
+        return dict(self.__grouped)
+
+    def load(self, grouped):
+        """ Replace every link (the journal is not told) """
+        with self.__lock:
+            self.__grouped = {key: list(ids) for key, ids in grouped.items()}
+            self.version = next_version()
+            self.modified = time.time()
+
+    def fork(self):
+        """ Independent copy, without a journal attached """
+        return ManyToMany(self.__grouped, name=self.name, left=self.left, right=self.right)
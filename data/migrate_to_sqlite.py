@@ -0,0 +1,17 @@
+#!/usr/bin/python3
+""" One-shot import of the JSON data files into a SQLite database
+
+usage: python3 -m data.migrate_to_sqlite [db_file] [data_dir]
+"""
+
+import sys
+from data.sqlite_storage import SQLiteStorage
+
+if __name__ == '__main__':
+    db_file = sys.argv[1] if len(sys.argv) > 1 else 'data/hbnb.db'
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else 'data'
+
+    storage = SQLiteStorage(db_file)
+    for name, count in storage.import_json_files(data_dir).items():
+        print("Imported {} {} rows into {}".format(count, name, db_file))
+    storage.close()
@@ -0,0 +1,459 @@
+#!/usr/bin/python3
+"""This module defines an indexed in-memory table for hbnb evolution"""
+
+import bisect
+import itertools
+import time
+import weakref
+from collections.abc import Mapping
+from contextlib import ExitStack
+from data.rwlock import ReadWriteLock
+
+# shared by every table, so a version number is never reused, even by a
+# table swapped in for another one (see LazyTable.swap)
+_versions = itertools.count(1)
+
+
+def next_version():
+    """ New version number, greater than any handed out before """
+    return next(_versions)
+
+
+class Repository(Mapping):
+    """ In-memory table of rows keyed by id, with optional secondary indexes
+
+    The rows are the same dicts produced by FileStorage.reorganise_model_data.
+    Lookups by id are O(1). Each declared index maps a field value to the ids
+    of the rows holding that value, so lookups by that field are proportional
+    to the number of matches instead of the size of the table.
+
+    When a journal is attached (see FileStorage.open_journal), every insert,
+    update and delete is also reported to it as a change record.
+
+    The rows can also come from a lazily decoded mapping such as a
+    BinarySnapshot. Lookups by id then only decode the rows they touch, and
+    the whole table is decoded the first time anything else needs it.
+
+    The table is safe to share between threads: index lookups and
+    snapshots hold a shared lock, writes an exclusive one. Iterating,
+    values() and items() work on a snapshot of the table, so they never see
+    it change size, and updates replace the row with an updated copy
+    instead of changing it in place, so a row handed out earlier is never
+    half updated.
+
+    snapshot() and fork() return a frozen view or a private copy of the
+    table in O(1): they share the rows and indexes with the table, and
+    whichever side is changed first takes its own copy of them. That copy
+    is O(n): it is paid by the first write made while a snapshot is
+    alive, e.g. during an unpaginated list GET, whose iter_rows() holds
+    one until the body has been sent (about 40 ms on 100k places, against
+    0.2 ms for a write with no snapshot, see benchmarks/snapshot_writes.py).
+    Later writes are back to O(1) until the next snapshot.
+
+    Each declared sorted index keeps the rows ordered by a field (ties
+    broken by id), so page() can return the rows following a given one
+    in O(log n + page size).
+
+    version changes with every write, and no two tables (or two states of
+    a table) ever have the same version, so anything computed from the
+    table can be cached as long as its version hasn't moved; modified is
+    the time of that last write.
+    """
+
+    def __init__(self, rows=None, indexes=None, name=None, sorted_indexes=None):
+        """ constructor """
+        # model name ('Place', 'Country', etc.) used in the data files
+        self.name = name
+        self.journal = None
+        self.version = next_version()
+        self.modified = time.time()
+
+        self.__rows = {}
+        # lazily decoded rows not copied into __rows yet, see load()
+        self.__base = None
+        # field name -> { field value -> { row id: None } }
+        # the inner dict is used as an insertion-ordered set of ids
+        self.__indexes = {}
+        # field name -> sorted list of sort_key() of every row
+        self.__sorted = {}
+        self.__lock = ReadWriteLock()
+        # every table (this one, snapshots, forks) using the same dicts, by id
+        # (tables compare by content, so they can't go in a set)
+        self.__sharers = weakref.WeakValueDictionary({id(self): self})
+        self.__read_only = False
+
+        for field in indexes or []:
+            self.__indexes[field] = {}
+        for field in sorted_indexes or []:
+            self.__sorted[field] = []
+
+        if rows:
+            self.load(rows)
+
+    # --- Mapping interface (read-only access by id) ---
+
+    # Lookups by id don't take the lock: a single dict read is atomic,
+    # and the rows themselves are never changed in place.
+
+    def __getitem__(self, row_id):
+        base = self.__base
+        row = self.__rows.get(row_id)
+        if row is not None:
+            return row
+        if base is None:
+            raise KeyError(row_id)
+
+        # decode the row once and keep it, so later changes stick
+        row = base[row_id]
+        with self.__lock.write():
+            if self.__base is base:
+                row = self.__rows.setdefault(row_id, row)
+        return row
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        base = self.__base
+        if base is not None:
+            return len(base)
+        return len(self.__rows)
+
+    def __contains__(self, row_id):
+        base = self.__base
+        if row_id in self.__rows:
+            return True
+        return base is not None and row_id in base
+
+    def get(self, row_id, default=None):
+        """ Return the row with the given id, or default """
+        if self.__base is None:
+            return self.__rows.get(row_id, default)
+        try:
+            return self[row_id]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """ Snapshot of the ids """
+        self.__materialise()
+        with self.__lock.read():
+            return list(self.__rows)
+
+    def values(self):
+        """ Snapshot of the rows """
+        self.__materialise()
+        with self.__lock.read():
+            return list(self.__rows.values())
+
+    def items(self):
+        """ Snapshot of the (id, row) pairs """
+        self.__materialise()
+        with self.__lock.read():
+            return list(self.__rows.items())
+
+    def iter_rows(self, field=None, value=None):
+        """ Iterate over the rows, or over those whose field matches value
+        (using the declared index), without copying the table
+
+        The rows are those of the moment of the call: the iterator reads
+        from an O(1) snapshot, so it is not disturbed by later writes (the
+        first of which copies the table while the iterator is alive).
+        """
+        if field is not None and field not in self.__indexes:
+            raise KeyError("No index declared on field '{}'".format(field))
+
+        self.__materialise()
+        view = self.snapshot()
+        return view.__iter_rows(field, value)
+
+    def __iter_rows(self, field, value):
+        """ Generator behind iter_rows, run on a snapshot whose dicts never change """
+        if field is None:
+            yield from self.__rows.values()
+            return
+
+        for row_id in self.__indexes[field].get(value, {}):
+            yield self.__rows[row_id]
+
+    @property
+    def indexes(self):
+        """ Names of the fields with a secondary index """
+        return list(self.__indexes)
+
+    @property
+    def sorted_indexes(self):
+        """ Names of the fields with a sorted index """
+        return list(self.__sorted)
+
+    def to_dict(self):
+        """ Return a shallow copy of the table as a plain dict keyed by id """
+        self.__materialise()
+        with self.__lock.read():
+            return dict(self.__rows)
+
+    # --- snapshots ---
+
+    def snapshot(self):
+        """ Read-only view of the table as it is now, in O(1) """
+        with self.__lock.write():
+            return self.__share(read_only=True)
+
+    def fork(self):
+        """ Writable copy of the table, in O(1), without a journal attached """
+        with self.__lock.write():
+            return self.__share(read_only=False)
+
+    @staticmethod
+    def snapshot_all(tables):
+        """ Read-only views of several tables, all taken at the same moment """
+        tables = list(tables)
+
+        with ExitStack() as stack:
+            # always locked in the same order, so two callers can't deadlock
+            for _, table in sorted({id(table): table for table in tables}.items()):
+                stack.enter_context(table.__lock.write())
+            return [table.__share(read_only=True) for table in tables]
+
+    def __share(self, read_only):
+        """ New table sharing this one's dicts (callers hold the write lock) """
+        view = Repository(indexes=self.indexes, name=self.name, sorted_indexes=self.sorted_indexes)
+        view.__rows = self.__rows
+        view.__base = self.__base
+        view.__indexes = self.__indexes
+        view.__sorted = self.__sorted
+        view.version = self.version
+        view.modified = self.modified
+        view.__read_only = read_only
+
+        self.__sharers[id(view)] = view
+        view.__sharers = self.__sharers
+
+        return view
+
+    def __own(self):
+        """ Copy the dicts before changing them if anything else uses them """
+        if self.__read_only:
+            raise TypeError("Snapshot of table '{}' is read-only".format(self.name))
+        if len(self.__sharers) == 1:
+            return
+
+        self.__detach()
+        self.__rows = dict(self.__rows)
+        self.__indexes = {field: {value: dict(ids) for value, ids in index.items()}
+                          for field, index in self.__indexes.items()}
+        self.__sorted = {field: list(keys) for field, keys in self.__sorted.items()}
+
+    def __detach(self):
+        """ Stop sharing dicts, before replacing them with new ones """
+        self.__sharers.pop(id(self), None)
+        self.__sharers = weakref.WeakValueDictionary({id(self): self})
+
+    # --- writes ---
+
+    def load(self, rows):
+        """ Replace the whole table with rows (keyed by id) and rebuild the indexes """
+        with self.__lock.write():
+            if self.__read_only:
+                raise TypeError("Snapshot of table '{}' is read-only".format(self.name))
+            self.__detach()
+
+            self.version = next_version()
+            self.modified = time.time()
+            if isinstance(rows, dict):
+                self.__base = None
+                self.__rows = dict(rows)
+                self.__rebuild_indexes()
+                return
+
+            # a lazily decoded mapping: the indexes are built once it is materialised
+            self.__base = rows
+            self.__rows = {}
+
+    def insert(self, row):
+        """ Add a new row (or replace the row with the same id) """
+        self.__materialise()
+        row_id = row['id']
+        with self.__lock.write():
+            # raises before anything is changed if the row can't be indexed
+            keys = self.__index_keys(row)
+            self.__own()
+            if row_id in self.__rows:
+                self.__unindex_row(self.__rows[row_id])
+
+            self.__rows[row_id] = row
+            self.__index_row(row, keys)
+            self.version = next_version()
+            self.modified = time.time()
+
+            if self.journal is not None:
+                self.journal.record(self.name, "insert", row_id, row)
+
+        return row
+
+    def update(self, row_id, changes):
+        """ Apply the changes to an existing row and return the updated row """
+        self.__materialise()
+        with self.__lock.write():
+            old_row = self.__rows[row_id]
+            row = dict(old_row)
+            row.update(changes)
+            # raises before anything is changed if the row can't be indexed
+            keys = self.__index_keys(row)
+
+            self.__own()
+            self.__unindex_row(old_row)
+            self.__rows[row_id] = row
+            self.__index_row(row, keys)
+            self.version = next_version()
+            self.modified = time.time()
+
+            if self.journal is not None:
+                self.journal.record(self.name, "update", row_id, changes)
+
+        return row
+
+    def delete(self, row_id):
+        """ Remove the row with the given id and return it """
+        self.__materialise()
+        with self.__lock.write():
+            row = self.__rows[row_id]
+            self.__own()
+            self.__unindex_row(row)
+            del self.__rows[row_id]
+            self.version = next_version()
+            self.modified = time.time()
+
+            if self.journal is not None:
+                self.journal.record(self.name, "delete", row_id)
+
+        return row
+
+    # --- secondary indexes ---
+
+    def find_by(self, field, value):
+        """ Return the rows whose field matches value using the declared index """
+        if field not in self.__indexes:
+            raise KeyError("No index declared on field '{}'".format(field))
+
+        self.__materialise()
+        with self.__lock.read():
+            ids = self.__indexes[field].get(value, {})
+            return [self.__rows[row_id] for row_id in ids]
+
+    def find_one_by(self, field, value):
+        """ Return the first row whose field matches value, or None """
+        rows = self.find_by(field, value)
+        return rows[0] if rows else None
+
+    @staticmethod
+    def sort_key(row, field):
+        """ Position of a row in the sorted index of field
+
+        Rows without a value for the field come first, then numbers, then
+        strings, then any other values (by type name and repr), so values
+        of different types never need comparing; ties are broken by id.
+        """
+        value = row.get(field)
+        if value is None or isinstance(value, (int, float)):
+            kind = ""
+        elif isinstance(value, str):
+            kind = "str"
+        else:
+            kind, value = type(value).__name__, repr(value)
+        return (value is not None, kind, value, row['id'])
+
+    def page(self, field, after=None, limit=None, descending=False):
+        """ Rows in the order of the sorted index of field, at most limit of them
+
+        after is the sort_key() of the last row of the previous page (None
+        for the first page). The rows are looked up by binary search, so a
+        page costs O(log n + limit) wherever it is in the table.
+        """
+        if field not in self.__sorted:
+            raise KeyError("No sorted index declared on field '{}'".format(field))
+
+        self.__materialise()
+        with self.__lock.read():
+            keys = self.__sorted[field]
+            if descending:
+                end = len(keys) if after is None else bisect.bisect_left(keys, after)
+                start = 0 if limit is None else max(0, end - limit)
+                selected = reversed(keys[start:end])
+            else:
+                start = 0 if after is None else bisect.bisect_right(keys, after)
+                end = len(keys) if limit is None else start + limit
+                selected = keys[start:end]
+
+            return [self.__rows[key[-1]] for key in selected]
+
+    def rebuild_indexes(self):
+        """ Rebuild every declared index from scratch """
+        self.__materialise()
+        with self.__lock.write():
+            self.__rebuild_indexes()
+
+    def __rebuild_indexes(self):
+        """ rebuild_indexes, for callers already holding the write lock """
+        # new dicts and lists, the old ones may be shared with a snapshot
+        self.__indexes = {field: {} for field in self.__indexes}
+        fields = list(self.__sorted)
+        self.__sorted = {}
+
+        for row in self.__rows.values():
+            self.__index_row(row)
+
+        # sorted in one go, rather than inserting the rows one by one
+        self.__sorted = {field: sorted(self.sort_key(row, field) for row in self.__rows.values())
+                         for field in fields}
+
+    def __materialise(self):
+        """ Decode the rows not decoded yet from the lazy mapping """
+        # checked without the lock first: once materialised, it stays so
+        # until the next load()
+        if self.__base is None:
+            return
+
+        with self.__lock.write():
+            if self.__base is None:
+                return
+
+            decoded = self.__rows
+            # decode in file order, but keep the rows already handed out
+            self.__detach()
+            self.__rows = {row_id: decoded.get(row_id, row) for row_id, row in self.__base.items()}
+            self.__base = None
+            self.__rebuild_indexes()
+
+    def __index_keys(self, row):
+        """ Sort keys of the row for every sorted index; raises TypeError if a
+        hash-indexed value is unhashable """
+        for field in self.__indexes:
+            if field in row:
+                hash(row[field])
+        return {field: self.sort_key(row, field) for field in self.__sorted}
+
+    def __index_row(self, row, keys=None):
+        """ Add the row to every declared index """
+        for field, index in self.__indexes.items():
+            if field in row:
+                index.setdefault(row[field], {})[row['id']] = None
+        for field, sorted_keys in self.__sorted.items():
+            bisect.insort(sorted_keys, keys[field] if keys else self.sort_key(row, field))
+
+    def __unindex_row(self, row):
+        """ Remove the row from every declared index """
+        for field, index in self.__indexes.items():
+            if field not in row:
+                continue
+            ids = index.get(row[field])
+            if ids is None:
+                continue
+            ids.pop(row['id'], None)
+            if not ids:
+                del index[row[field]]
+        for field, keys in self.__sorted.items():
+            key = self.sort_key(row, field)
+            position = bisect.bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
@@ -0,0 +1,39 @@
+#!/usr/bin/python3
+""" Split the JSON data files into shards (or merge them back into one file)
+
+usage: python3 -m data.reshard count [data_dir]
+
+Stop the app first: it keeps the tables in memory and would write the old layout back.
+"""
+
+import sys
+from pathlib import Path
+from data.file_storage import FileStorage
+
+# data file name (without extension) -> model name; many to many data is
+# not keyed by id, so it is never sharded
+DATA_FILES = {
+    "country": "Country",
+    "country_testing": "Country",
+    "city": "City",
+    "amenity": "Amenity",
+    "place": "Place",
+    "user": "User",
+    "review": "Review"
+}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit(__doc__.strip())
+
+    count = int(sys.argv[1])
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else 'data'
+    storage = FileStorage()
+
+    for stem, name in DATA_FILES.items():
+        filename = str(Path(data_dir) / "{}.json".format(stem))
+        if storage.data_filename(filename) is None and storage.shard_filenames(filename) is None:
+            continue
+
+        filenames = storage.reshard(filename, name, count)
+        print("Rewrote {} as {}".format(filename, ", ".join(filenames)))
@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+"""This module defines a reader-writer lock for hbnb evolution"""
+
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock():
+    """ Any number of readers, or a single writer
+
+    Waiting writers go first: once a writer is waiting, new readers wait
+    too, so a steady stream of reads can't starve the writes. The lock is
+    not reentrant; don't take it again while holding it.
+    """
+
+    def __init__(self):
+        """ constructor """
+        self.__condition = threading.Condition()
+        self.__readers = 0
+        self.__writer = False
+        self.__waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        """ Hold the lock shared with other readers for a with block """
+        with self.__condition:
+            while self.__writer or self.__waiting_writers:
+                self.__condition.wait()
+            self.__readers += 1
+
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__readers -= 1
+                if not self.__readers:
+                    self.__condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """ Hold the lock exclusively for a with block """
+        with self.__condition:
+            self.__waiting_writers += 1
+            try:
+                while self.__writer or self.__readers:
+                    self.__condition.wait()
+            finally:
+                self.__waiting_writers -= 1
+            self.__writer = True
+
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__writer = False
+                self.__condition.notify_all()
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""This module binds database connections to Flask requests for hbnb evolution"""
+
+from contextlib import contextmanager
+from flask import g, has_app_context
+
+
+@contextmanager
+def connection(pool):
+    """ Yield the current request's connection, checking it out on first use
+
+    Outside of a request (startup, scripts, tests) the connection is only
+    checked out for the duration of the with block.
+    """
+    if not has_app_context():
+        with pool.connection() as conn:
+            yield conn
+        return
+
+    if "db_connection" not in g:
+        g.db_connection = (pool, pool.acquire())
+
+    yield g.db_connection[1]
+
+
+def release_connection(exc=None):
+    """ Give the request's connection back to its pool """
+    entry = g.pop("db_connection", None)
+    if entry is not None:
+        pool, conn = entry
+        pool.release(conn)
+
+
+def init_app(app):
+    """ Release the request's connection when the app context is torn down """
+    app.teardown_appcontext(release_connection)
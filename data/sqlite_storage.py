@@ -0,0 +1,542 @@
+#!/usr/bin/python3
+"""This module defines a class to manage SQLite storage for hbnb evolution"""
+
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from data import session
+from data.connection_pool import ConnectionPool
+from data.file_storage import FileStorage
+from data.lazy_table import LazyTable
+from data.many_to_many import ManyToMany
+from data.repository import Repository
+from data.transaction import Transaction
+
+# One table per data file. Foreign keys and natural keys get real indexes.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS country (
+    id TEXT PRIMARY KEY, name TEXT, code TEXT,
+    created_at REAL, updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS country_code ON country (code);
+
+CREATE TABLE IF NOT EXISTS city (
+    id TEXT PRIMARY KEY, country_id TEXT, name TEXT,
+    created_at REAL, updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS city_country_id ON city (country_id);
+
+CREATE TABLE IF NOT EXISTS amenity (
+    id TEXT PRIMARY KEY, name TEXT,
+    created_at REAL, updated_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS place (
+    id TEXT PRIMARY KEY, host_user_id TEXT, city_id TEXT, name TEXT,
+    description TEXT, address TEXT, latitude REAL, longitude REAL,
+    number_of_rooms INTEGER, bathrooms INTEGER, price_per_night REAL,
+    max_guests INTEGER, created_at REAL, updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS place_city_id ON place (city_id);
+CREATE INDEX IF NOT EXISTS place_host_user_id ON place (host_user_id);
+
+CREATE TABLE IF NOT EXISTS user (
+    id TEXT PRIMARY KEY, first_name TEXT, last_name TEXT, email TEXT,
+    password TEXT, created_at REAL, updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS user_email ON user (email);
+
+CREATE TABLE IF NOT EXISTS review (
+    id TEXT PRIMARY KEY, commentor_user_id TEXT, place_id TEXT,
+    feedback TEXT, rating REAL, created_at REAL, updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS review_place_id ON review (place_id);
+CREATE INDEX IF NOT EXISTS review_commentor_user_id ON review (commentor_user_id);
+
+CREATE TABLE IF NOT EXISTS place_to_amenity (
+    place_id TEXT, amenity_id TEXT,
+    PRIMARY KEY (place_id, amenity_id)
+);
+CREATE INDEX IF NOT EXISTS place_to_amenity_amenity_id ON place_to_amenity (amenity_id);
+"""
+
+# model name used in the data files -> SQL table
+MODEL_TABLES = {
+    "Country": "country",
+    "City": "city",
+    "Amenity": "amenity",
+    "Place": "place",
+    "User": "user",
+    "Review": "review",
+    "Place_to_Amenity": "place_to_amenity"
+}
+
+# Every write to a table bumps its counter in table_version, whichever
+# process (or tool) makes it, so that refresh() can tell which tables
+# other processes have changed. The 'epoch' row is a random number set
+# when the database is created, see shared_version.
+SCHEMA += """
+CREATE TABLE IF NOT EXISTS table_version (
+    name TEXT PRIMARY KEY, version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO table_version (name, version) VALUES ('epoch', abs(random() % 1000000000000));
+""" + "".join("""
+CREATE TRIGGER IF NOT EXISTS {table}_version_{event} AFTER {event} ON "{table}" BEGIN
+    INSERT INTO table_version (name, version) VALUES ('{table}', 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1;
+END;
+""".format(table=table, event=event) for table in MODEL_TABLES.values()
+    for event in ("INSERT", "UPDATE", "DELETE"))
+
+# data file name (without extension) -> model name
+DATA_FILES = {
+    "country": "Country",
+    "country_testing": "Country",
+    "city": "City",
+    "amenity": "Amenity",
+    "place": "Place",
+    "user": "User",
+    "review": "Review",
+    "place_to_amenity": "Place_to_Amenity"
+}
+
+# FileStorage fsync policy -> equivalent sqlite synchronous setting
+SYNCHRONOUS = {"none": "OFF", "per-write": "FULL", "interval": "NORMAL"}
+
+
+class SQLiteStorage():
+    """ Drop-in replacement for FileStorage that keeps the data in SQLite
+
+    The data file names used with FileStorage ('data/place.json', etc.) are
+    mapped to the matching tables, so data/__init__.py can switch between
+    the two backends. Writes are row-level: every insert, update or delete
+    made on a loaded table is queued as a single statement and save_table
+    commits the queued statements in one transaction.
+
+    Connections come from a bounded pool. Within a Flask request the same
+    connection is reused until the request ends (see data/session.py).
+
+    Several processes (gunicorn workers) can share the database: refresh()
+    reloads the tables other processes have written to since we read them.
+    """
+
+    def __init__(self, db_file, fsync="per-write", pool_size=5, pool_timeout=10.0):
+        """ constructor """
+        if fsync not in SYNCHRONOUS:
+            raise ValueError("Invalid fsync policy: {}".format(fsync))
+
+        self.db_file = db_file
+        self.synchronous = SYNCHRONOUS[fsync]
+        self.pool = ConnectionPool(self.__connect, size=pool_size, timeout=pool_timeout)
+        self.__lock = threading.Lock()
+
+        # model name -> (data file name, table), see load_table
+        self.__tables = {}
+        # model name -> LazyTable proxy, see lazy_table
+        self.__lazy_tables = {}
+        # True while the tables are replaced by private forks, see isolated
+        self.__isolated = False
+        self.__journaling = False
+        # statements not yet committed: (model name, (sql, params))
+        self.__pending = []
+        # .batch: statements collected by the current thread, see batch
+        self.__local = threading.local()
+        # model name -> number of changes recorded but not committed yet
+        self.__uncommitted = Counter()
+        # model name -> table_version counter the loaded table is current with
+        self.__versions = {}
+        # connection kept for refresh(): PRAGMA data_version only changes
+        # for a given connection when others have committed
+        self.__poll = sqlite3.connect(db_file, check_same_thread=False)
+        self.__poll_lock = threading.Lock()
+        self.__data_version = None
+
+        # table -> column names, read back from the schema
+        self.__columns = {}
+        with self.pool.connection() as connection:
+            connection.executescript(SCHEMA)
+            (self.__epoch,) = connection.execute("SELECT version FROM table_version WHERE name = 'epoch'").fetchone()
+            for table in MODEL_TABLES.values():
+                cursor = connection.execute('PRAGMA table_info("{}")'.format(table))
+                self.__columns[table] = [column[1] for column in cursor]
+
+    # --- FileStorage interface ---
+
+    def load_model_data(self, filename):
+        """ Load the table matching a data file and returns as dictionary keyed by id """
+        table = self.__table_for(filename)
+        columns = self.__columns[table]
+
+        with session.connection(self.pool) as connection:
+            cursor = connection.execute(
+                'SELECT {} FROM "{}"'.format(", ".join(columns), table))
+            rows = cursor.fetchall()
+
+        data = {}
+        for values in rows:
+            # leave out NULL columns so the rows look like the ones loaded from JSON
+            row = {column: value for column, value in zip(columns, values) if value is not None}
+            data[row['id']] = row
+
+        return data
+
+    def load_many_to_many_data(self, filename):
+        """ many to many data is loaded by this function """
+        table = self.__table_for(filename)
+        grouped_data = {}
+
+        with session.connection(self.pool) as connection:
+            cursor = connection.execute(
+                'SELECT place_id, amenity_id FROM "{}" ORDER BY rowid'.format(table))
+            rows = cursor.fetchall()
+
+        for place_id, amenity_id in rows:
+            if place_id not in grouped_data:
+                grouped_data[place_id] = []
+            grouped_data[place_id].append(amenity_id)
+
+        return grouped_data
+
+    def save_model_data(self, filename=None, data=None):
+        """ Replace the contents of the tables with data ({"Model": [rows]}) """
+        if not isinstance(data, dict):
+            raise ValueError("Data should be a dictionary")
+
+        statements = []
+        for name, rows in data.items():
+            table = MODEL_TABLES[name]
+            statements.append(('DELETE FROM "{}"'.format(table), ()))
+            for row in rows:
+                statements.append(self.__insert_statement(table, row))
+
+        self.__execute(statements)
+
+    def load_table(self, filename, name, indexes=None, sorted_indexes=None):
+        """ Load a model's table into a Repository bound to this storage """
+        # read before the rows: a write made in between only causes a reload
+        version = self.__read_versions().get(MODEL_TABLES[name], 0)
+        table = Repository(self.load_model_data(filename), indexes=indexes, name=name,
+                           sorted_indexes=sorted_indexes)
+        if self.__journaling:
+            table.journal = self
+
+        with self.__lock:
+            self.__tables[name] = (filename, table)
+            self.__versions[name] = version
+
+        return table
+
+    def lazy_table(self, filename, name, indexes=None, sorted_indexes=None):
+        """ Same as load_table, but the table is only loaded on first access """
+        table = LazyTable(lambda: self.load_table(filename, name, indexes, sorted_indexes))
+        self.__lazy_tables[name] = table
+
+        return table
+
+    def load_many_to_many_table(self, filename, name):
+        """ Load a many to many table into a ManyToMany bound to this storage """
+        version = self.__read_versions().get(MODEL_TABLES[name], 0)
+        table = ManyToMany(self.load_many_to_many_data(filename), name=name)
+        if self.__journaling:
+            table.journal = self
+
+        with self.__lock:
+            self.__tables[name] = (filename, table)
+            self.__versions[name] = version
+
+        return table
+
+    def lazy_many_to_many_data(self, filename, name):
+        """ Same as load_many_to_many_table, but the table is only loaded on first access """
+        table = LazyTable(lambda: self.load_many_to_many_table(filename, name))
+        self.__lazy_tables[name] = table
+
+        return table
+
+    def open_journal(self):
+        """ Start recording the changes made to the tables """
+        with self.__lock:
+            self.__journaling = True
+            loaded = [table for filename, table in self.__tables.values()]
+
+        for table in loaded:
+            table.journal = self
+
+    def record(self, name, op, row_id, data=None):
+        """ Queue the statement for a change (insert, update, delete, link or unlink) """
+        table = MODEL_TABLES[name]
+
+        if op == "link":
+            statement = ('INSERT OR IGNORE INTO "{}" (place_id, amenity_id) VALUES (?, ?)'.format(table),
+                         (row_id, data))
+        elif op == "unlink":
+            statement = ('DELETE FROM "{}" WHERE place_id = ? AND amenity_id = ?'.format(table),
+                         (row_id, data))
+        elif op == "insert":
+            statement = self.__insert_statement(table, data)
+        elif op == "update":
+            columns = [column for column in data if column in self.__columns[table]]
+            if not columns:
+                return
+            statement = (
+                'UPDATE "{}" SET {} WHERE id = ?'.format(
+                    table, ", ".join("{} = ?".format(column) for column in columns)),
+                [data[column] for column in columns] + [row_id]
+            )
+        else:
+            statement = ('DELETE FROM "{}" WHERE id = ?'.format(table), (row_id,))
+
+        batch = getattr(self.__local, "batch", None)
+        with self.__lock:
+            self.__uncommitted[name] += 1
+            if batch is None:
+                self.__pending.append((name, statement))
+        if batch is not None:
+            batch.append((name, statement))
+
+    @contextmanager
+    def transaction(self):
+        """ Group changes to several tables into one atomic commit, see Transaction """
+        transaction = Transaction(self)
+        yield transaction
+        transaction.commit()
+
+    @contextmanager
+    def batch(self, persist=True):
+        """ Commit the changes this thread makes in the with block in one SQL transaction
+
+        Nothing is written if the block raises or persist is False (see
+        FileStorage.batch).
+        """
+        if getattr(self.__local, "batch", None) is not None:
+            raise RuntimeError("Batches can't be nested")
+
+        self.__local.batch = statements = []
+        try:
+            yield
+        finally:
+            self.__local.batch = None
+
+        try:
+            if persist:
+                self.__execute(statement for _, statement in statements)
+        finally:
+            self.__committed(statements)
+
+    def refresh(self):
+        """ Reload the tables other processes have written to since we last read them
+
+        Meant to run at the start of every request: when nothing changed,
+        it costs a PRAGMA data_version. Changes not committed yet are
+        committed first. Returns the names of the tables reloaded.
+        """
+        if self.__isolated:
+            return []
+
+        with self.__poll_lock:
+            (data_version,) = self.__poll.execute("PRAGMA data_version").fetchone()
+            if data_version == self.__data_version:
+                return []
+            self.__data_version = data_version
+            versions = dict(self.__poll.execute("SELECT name, version FROM table_version"))
+
+        with self.__lock:
+            stale = [name for name in self.__tables
+                     if versions.get(MODEL_TABLES[name], 0) != self.__versions.get(name, 0)]
+        if not stale:
+            return []
+
+        self.flush()
+        for name in stale:
+            self.__reload(name)
+
+        return stale
+
+    def save_table(self, table):
+        """ Commit the changes recorded so far """
+        if self.__isolated:
+            return
+
+        self.flush()
+
+    def snapshot(self, *tables):
+        """ Read-only views of the given tables, all as of the same moment """
+        return Repository.snapshot_all(
+            table.load() if isinstance(table, LazyTable) else table for table in tables)
+
+    @contextmanager
+    def isolated(self):
+        """ Run a with block against private copies of the tables (see FileStorage.isolated) """
+        if self.__isolated:
+            raise RuntimeError("The tables are already isolated")
+
+        originals = {}
+        for name, table in self.__lazy_tables.items():
+            originals[name] = table.load()
+            table.swap(originals[name].fork())
+        self.__isolated = True
+
+        try:
+            yield
+        finally:
+            self.__isolated = False
+            for name, table in originals.items():
+                self.__lazy_tables[name].swap(table)
+
+    def flush(self):
+        """ Commit the changes recorded so far, in one transaction """
+        with self.__lock:
+            statements = self.__pending
+            self.__pending = []
+
+        try:
+            self.__execute(statement for _, statement in statements)
+        except sqlite3.Error:
+            with self.__lock:
+                self.__pending[:0] = statements
+            raise
+        self.__committed(statements)
+
+    def __committed(self, statements):
+        """ Forget the (model name, statement) pairs, committed or dropped """
+        with self.__lock:
+            self.__uncommitted.subtract(name for name, _ in statements)
+
+    def shared_version(self, name):
+        """ Token of the committed state of a table, the same in every process using the database
+
+        None if the table has changes not committed yet, or its lazy proxy
+        is not serving the table the version was read with yet (see
+        __reload), see FileStorage.shared_version.
+        """
+        if self.__isolated:
+            return None
+
+        proxy = self.__lazy_tables.get(name)
+        with self.__lock:
+            if name not in self.__tables or self.__uncommitted[name] > 0:
+                return None
+            table = self.__tables[name][1]
+            version = self.__versions.get(name, 0)
+        if proxy is not None and proxy.load() is not table:
+            return None
+
+        return "{}.{}".format(self.__epoch, version)
+
+    def close(self):
+        """ Commit whatever is still pending and close the database """
+        self.flush()
+        self.pool.close()
+        with self.__poll_lock:
+            self.__poll.close()
+
+    def stats(self):
+        """ Return the connection pool usage counters """
+        return {self.db_file: self.pool.stats()}
+
+    # --- migration ---
+
+    def import_json_files(self, data_dir='data'):
+        """ One-shot import of the JSON data files into the database """
+        file_storage = FileStorage()
+        data = {}
+
+        for stem, name in DATA_FILES.items():
+            filename = str(Path(data_dir) / "{}.json".format(stem))
+            if stem == "country_testing":
+                continue
+            if file_storage.data_filename(filename) is None and file_storage.shard_filenames(filename) is None:
+                continue
+
+            if name == "Place_to_Amenity":
+                grouped = file_storage.load_many_to_many_data(filename)
+                data[name] = [{"place_id": place_id, "amenity_id": amenity_id}
+                              for place_id, amenity_ids in grouped.items()
+                              for amenity_id in amenity_ids]
+            else:
+                data[name] = list(file_storage.load_model_data(filename).values())
+
+        self.save_model_data(data=data)
+
+        return {name: len(rows) for name, rows in data.items()}
+
+    # --- helpers ---
+
+    def __table_for(self, filename):
+        """ Return the SQL table matching a data file name """
+        stem = Path(filename).stem
+        if stem not in DATA_FILES:
+            raise FileNotFoundError("No table for data file '{}'".format(filename))
+
+        return MODEL_TABLES[DATA_FILES[stem]]
+
+    def __insert_statement(self, table, row):
+        """ Build the insert statement for a row, ignoring unknown fields """
+        columns = [column for column in self.__columns[table] if column in row]
+        return (
+            'INSERT OR REPLACE INTO "{}" ({}) VALUES ({})'.format(
+                table, ", ".join(columns), ", ".join("?" * len(columns))),
+            [row[column] for column in columns]
+        )
+
+    def __connect(self):
+        """ Open a new connection for the pool """
+        # connections are handed from thread to thread by the pool,
+        # but only ever used by one thread at a time
+        connection = sqlite3.connect(self.db_file, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous={}".format(self.synchronous))
+
+        return connection
+
+    def __execute(self, statements):
+        """ Run the statements in a single transaction """
+        statements = list(statements)
+        if not statements:
+            return
+
+        # sqlite3 keeps a cache of compiled statements per connection, so
+        # the same SQL text with new parameters does not get parsed again
+        with session.connection(self.pool) as connection:
+            with connection:
+                # the versions are read inside the (write) transaction, so
+                # no other process can commit between them and our changes
+                connection.execute("BEGIN IMMEDIATE")
+                before = dict(connection.execute("SELECT name, version FROM table_version"))
+                for sql, params in statements:
+                    connection.execute(sql, params)
+                after = dict(connection.execute("SELECT name, version FROM table_version"))
+
+        # our own changes are already in memory: a table that was current
+        # stays so, one that other processes had changed is left to refresh
+        with self.__lock:
+            for name in self.__tables:
+                table = MODEL_TABLES[name]
+                if after.get(table, 0) != before.get(table, 0) and \
+                        self.__versions.get(name, 0) == before.get(table, 0):
+                    self.__versions[name] = after[table]
+
+    def __read_versions(self):
+        """ SQL table -> table_version counter """
+        with session.connection(self.pool) as connection:
+            return dict(connection.execute("SELECT name, version FROM table_version"))
+
+    def __reload(self, name):
+        """ Load a table again from the database, behind its lazy proxy if it has one """
+        filename, table = self.__tables[name]
+        proxy = self.__lazy_tables.get(name)
+        if isinstance(table, ManyToMany):
+            fresh = self.load_many_to_many_table(filename, name)
+        else:
+            fresh = self.load_table(filename, name, table.indexes, table.sorted_indexes)
+
+        if proxy is not None:
+            proxy.swap(fresh)
+        else:
+            # nothing to swap it behind: refresh the table in place
+            table.load(fresh.to_dict())
+            with self.__lock:
+                self.__tables[name] = (filename, table)
+
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+"""This module defines multi-table write batches for hbnb evolution"""
+
+
+class Transaction():
+    """ Changes to several tables, applied and persisted all together
+
+    Changes are only queued until commit(). commit() checks them first
+    (updated and deleted rows must exist), then applies them to the tables
+    and persists them in a single commit (see storage.batch). If applying
+    or persisting fails, the changes already applied are undone, so the
+    tables are left as they were.
+
+    Use it through storage.transaction():
+
+        with storage.transaction() as transaction:
+            transaction.insert(place_data, place)
+            transaction.link(place_to_amenity_data, place["id"], amenity_id)
+    """
+
+    def __init__(self, storage):
+        """ constructor """
+        self.__storage = storage
+        # (op, table, key, data)
+        self.__operations = []
+
+    def insert(self, table, row):
+        """ Queue a new row (or the replacement of the row with the same id) """
+        if 'id' not in row:
+            raise ValueError("Row without an id")
+        self.__operations.append(("insert", table, row['id'], row))
+
+    def update(self, table, row_id, changes):
+        """ Queue changes to an existing row """
+        self.__operations.append(("update", table, row_id, changes))
+
+    def delete(self, table, row_id):
+        """ Queue the removal of a row """
+        self.__operations.append(("delete", table, row_id, None))
+
+    def link(self, table, left_id, right_id):
+        """ Queue a link in a many to many table """
+        self.__operations.append(("link", table, left_id, right_id))
+
+    def unlink(self, table, left_id, right_id):
+        """ Queue the removal of a link from a many to many table """
+        self.__operations.append(("unlink", table, left_id, right_id))
+
+    def rollback(self):
+        """ Forget the queued changes """
+        self.__operations = []
+
+    def commit(self):
+        """ Apply and persist the queued changes, all or nothing """
+        operations = self.__operations
+        self.__operations = []
+        self.__check(operations)
+
+        undo = []
+        try:
+            with self.__storage.batch():
+                for op, table, key, data in operations:
+                    undo.append(self.__apply(op, table, key, data))
+        except BaseException:
+            # the undo itself must not be persisted
+            with self.__storage.batch(persist=False):
+                for revert in reversed(undo):
+                    revert()
+            raise
+
+    @staticmethod
+    def __check(operations):
+        """ Raise ValueError if a change refers to a row that won't exist """
+        # (table, row id) -> whether the row exists after the changes so far
+        exists = {}
+        for op, table, key, data in operations:
+            if op not in ("insert", "update", "delete"):
+                continue
+
+            present = exists.get((id(table), key))
+            if present is None:
+                present = key in table
+            if op != "insert" and not present:
+                raise ValueError("Row '{}' not found".format(key))
+            exists[(id(table), key)] = op != "delete"
+
+    @staticmethod
+    def __apply(op, table, key, data):
+        """ Apply one change; returns a function that reverts it """
+        if op == "insert":
+            previous = table.get(key)
+            table.insert(data)
+            if previous is None:
+                return lambda: table.delete(key)
+            return lambda: table.insert(previous)
+
+        if op == "update":
+            previous = table[key]
+            table.update(key, data)
+            return lambda: table.insert(previous)
+
+        if op == "delete":
+            previous = table.delete(key)
+            return lambda: table.insert(previous)
+
+        # linking ids that are linked already (or unlinking ids that are
+        # not) changes nothing, so there is nothing to revert
+        if table.linked(key, data) == (op == "link"):
+            return lambda: None
+        if op == "link":
+            table.link(key, data)
+            return lambda: table.unlink(key, data)
+
+        table.unlink(key, data)
+        return lambda: table.link(key, data)
@@ -3,10 +3,13 @@
 
 # from io import StringIO
 # import sys
+import base64
+import json
 import os
 import unittest
 import data as data
 from app import app
+from flask import jsonify
 
 class TestApp(unittest.TestCase):
     """Test that the app API endpoints work as expected
@@ -34,5 +37,76 @@ class TestApp(unittest.TestCase):
         output = response.get_data(as_text=True)
         self.assertEqual(output, expected)
 
+    def test_streamed_list(self):
+        """ Test that list endpoints stream a complete JSON array """
+        response = self.app.get('/api/v1/countries')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        countries = response.get_json()
+        self.assertEqual(len(countries), len(data.country_data))
+        self.assertEqual(sorted(countries[0]), ["code", "created_at", "id", "name", "updated_at"])
+
+    def test_streamed_list_error(self):
+        """ Test that a row that can't be serialised gives a 500, not a truncated 200 """
+        with data.storage.isolated():
+            data.amenity_data.insert({"id": "broken", "created_at": 0, "updated_at": 0})
+            response = self.app.get('/api/v1/amenities')
+            self.assertEqual(response.status_code, 500)
+
+    def test_pagination(self):
+        """ Test paging through a collection with a cursor """
+        ids = []
+        url = '/api/v1/users?limit=2&sort=-created_at'
+        while True:
+            response = self.app.get(url)
+            self.assertEqual(response.status_code, 200)
+            users = response.get_json()
+            self.assertLessEqual(len(users), 2)
+            ids.extend(user["id"] for user in users)
+
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            url = '/api/v1/users?limit=2&sort=-created_at&cursor=' + cursor
+
+        expected = sorted(data.user_data.values(), key=lambda user: (user["created_at"], user["id"]), reverse=True)
+        self.assertEqual(ids, [user["id"] for user in expected])
+
+        self.assertEqual(self.app.get('/api/v1/users?sort=password').status_code, 400)
+        self.assertEqual(self.app.get('/api/v1/users?limit=0').status_code, 400)
+        self.assertEqual(self.app.get('/api/v1/users?cursor=bogus').status_code, 400)
+        cursor = self.app.get('/api/v1/users?limit=1').headers["X-Next-Cursor"]
+        self.assertEqual(self.app.get('/api/v1/users?sort=updated_at&cursor=' + cursor).status_code, 400)
+
+        # cursors whose value doesn't match what they claim it is
+        for key in (["created_at", True, "", None, "x"], ["created_at", False, "", 1.5, "x"],
+                    ["created_at", False, "str", None, "x"], ["created_at", True, "str", 1.5, "x"]):
+            cursor = base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+            self.assertEqual(self.app.get('/api/v1/users?cursor=' + cursor).status_code, 400)
+        key = ["created_at", True, "", 1.5, "x"]
+        cursor = base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+        self.assertEqual(self.app.get('/api/v1/users?cursor=' + cursor).status_code, 200)
+
+    def test_streamed_body(self):
+        """ Test that streamed lists are the bytes jsonify would have sent """
+        for url in ('/api/v1/countries', '/api/v1/users', '/api/v1/reviews', '/api/v1/places_amenties'):
+            response = self.app.get(url)
+            self.assertEqual(response.status_code, 200)
+            with app.app_context():
+                self.assertEqual(response.get_data(), jsonify(response.get_json()).get_data())
+
+    def test_non_string_name(self):
+        """ Test that a PUT with a non-string name keeps the table consistent """
+        with data.storage.isolated():
+            amenity_id = next(iter(data.amenity_data))
+            response = self.app.put('/api/v1/amenities/' + amenity_id, json={"name": 123})
+            self.assertEqual(response.status_code, 200)
+
+            rows = self.app.get('/api/v1/amenities?sort=name').get_json()
+            self.assertEqual(len(rows), len(data.amenity_data))
+            self.assertEqual(self.app.delete('/api/v1/amenities/' + amenity_id).status_code, 204)
+            self.assertNotIn(amenity_id, data.amenity_data)
+
 if __name__ == '__main__':
     unittest.main()
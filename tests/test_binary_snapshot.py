@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import os
+import tempfile
+import unittest
+from data.binary_snapshot import BinarySnapshot, write_snapshot
+from data.repository import Repository
+
+class TestBinarySnapshot(unittest.TestCase):
+    """Test that binary snapshots round-trip and decode lazily
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, "place.hbs")
+        self.rows = {
+            "p2": {"id": "p2", "name": "Box Hill Motel", "city_id": "c1", "max_guests": 3,
+                   "price_per_night": 99.5, "description": None},
+            "p1": {"id": "p1", "name": "Ringwood Hotel", "city_id": "c1", "max_guests": 2,
+                   "price_per_night": 150.0, "description": "A decent hotel"}
+        }
+        write_snapshot(self.filename, "Place", self.rows)
+        self.snapshot = BinarySnapshot(self.filename)
+
+    def tearDown(self):
+        self.snapshot.close()
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """ Tests that every row decodes to the row that was written """
+        self.assertEqual(self.snapshot.name, "Place")
+        self.assertEqual(len(self.snapshot), 2)
+        self.assertEqual(list(self.snapshot), ["p2", "p1"])
+        self.assertEqual(dict(self.snapshot.items()), self.rows)
+
+    def test_lookup_by_id(self):
+        """ Tests lookups through the sorted id index """
+        self.assertEqual(self.snapshot["p1"], self.rows["p1"])
+        self.assertIn("p2", self.snapshot)
+        self.assertNotIn("p3", self.snapshot)
+        with self.assertRaises(KeyError):
+            self.snapshot["p3"]
+
+    def test_repository_over_snapshot(self):
+        """ Tests that a repository decodes rows lazily until it is written to """
+        repo = Repository(self.snapshot, indexes=["city_id"])
+        place = repo["p1"]
+        self.assertEqual(len(repo), 2)
+
+        # decoding the whole table keeps the row already handed out
+        self.assertEqual(len(repo.find_by("city_id", "c1")), 2)
+        self.assertIs(repo["p1"], place)
+
+        # updates replace the row, the one handed out stays as it was
+        self.assertEqual(repo.update("p1", {"name": "Ringwood Inn"})["name"], "Ringwood Inn")
+        self.assertEqual(repo["p1"]["name"], "Ringwood Inn")
+        self.assertEqual(place["name"], "Ringwood Hotel")
+
+
+if __name__ == '__main__':
+    unittest.main()
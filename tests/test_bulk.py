@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import io
+import json
+import multiprocessing
+import unittest
+from unittest import mock
+import data
+from data import storage, user_data
+from data.bulk import bulk_import
+from app import app
+
+USERS = [
+    {"id": "bulk-1", "first_name": "Ada", "last_name": "Lovelace",
+     "email": "ada@example.com", "password": "secret1"},
+    {"id": "bulk-2", "first_name": "Alan", "last_name": "Turing",
+     "email": "not an email", "password": "secret2"},
+    {"id": "bulk-3", "first_name": "Grace", "last_name": "Hopper",
+     "email": "grace@example.com", "password": "secret3"}
+]
+
+
+def child_setup():
+    """ Whether data, imported again in a spawned process, set the storage up """
+    return not data.is_child_process
+
+
+def ndjson(rows):
+    return "\n".join(json.dumps(row) for row in rows) + "\n{not json\n"
+
+
+class TestBulkImport(unittest.TestCase):
+    """Test that bulk imports keep the valid rows and report the others
+    """
+
+    def test_bulk_import(self):
+        """ Tests an import validated in this process, in small batches """
+        with storage.isolated():
+            report = bulk_import("users", io.StringIO(ndjson(USERS)), workers=0,
+                                 chunk_size=2, batch_size=1)
+
+            self.assertEqual(report["imported"], 2)
+            self.assertEqual(report["failed"], 2)
+            self.assertEqual([error["line"] for error in report["errors"]], [2, 4])
+            self.assertEqual(user_data["bulk-3"]["email"], "grace@example.com")
+            self.assertNotIn("bulk-2", user_data)
+
+        self.assertNotIn("bulk-1", user_data)
+
+    def test_bulk_import_workers(self):
+        """ Tests an import validated by worker processes """
+        with storage.isolated():
+            rows = [dict(row, id="{}-{}".format(row["id"], copy)) for copy in range(3) for row in USERS]
+            report = bulk_import("users", io.StringIO(ndjson(rows)), workers=2, chunk_size=2)
+
+            self.assertEqual(report["imported"], 6)
+            self.assertEqual(report["failed"], 4)
+            self.assertIn("bulk-1-0", user_data)
+
+    def test_bulk_import_ids(self):
+        """ Tests that rows with an invalid or taken id are reported and skipped """
+        existing = next(iter(user_data))
+        rows = [dict(USERS[0], id=[1]), dict(USERS[0], id={"a": 1}), dict(USERS[0], id=1),
+                dict(USERS[0], id=""), dict(USERS[0], id=existing), USERS[0], USERS[0], USERS[2]]
+        with storage.isolated():
+            before = dict(user_data[existing])
+            report = bulk_import("users", io.StringIO(ndjson(rows)), workers=0, batch_size=2)
+
+            self.assertEqual(report["imported"], 2)
+            self.assertEqual([error["line"] for error in report["errors"]], [1, 2, 3, 4, 5, 7, 9])
+            self.assertIn("Invalid id", report["errors"][0]["error"])
+            self.assertIn("Duplicate id", report["errors"][4]["error"])
+            self.assertEqual(user_data[existing], before)
+            self.assertIn("bulk-1", user_data)
+            self.assertIn("bulk-3", user_data)
+
+    def test_spawned_workers(self):
+        """ Tests that a spawned worker importing data leaves the data files alone """
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            self.assertFalse(pool.apply(child_setup))
+        self.assertTrue(child_setup())
+
+    def test_bulk_api(self):
+        """ Tests the /bulk endpoint """
+        client = app.test_client()
+        # no worker processes forked from the server
+        with storage.isolated(), mock.patch("data.bulk.ProcessPoolExecutor", side_effect=AssertionError):
+            response = client.post('/api/v1/bulk/users', data=ndjson(USERS),
+                                   content_type="application/x-ndjson")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()["imported"], 2)
+            self.assertIn("bulk-1", user_data)
+
+            response = client.post('/api/v1/bulk/planets', data=ndjson(USERS))
+            self.assertEqual(response.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from data import compression
+from data.compress import data_filenames
+from data.file_storage import FileStorage
+
+class TestCompression(unittest.TestCase):
+    """Test that compressed data files are read and written transparently
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, "city.json")
+        self.data = {"City": [{"id": "c1", "name": "Melbourne"}, {"id": "c2", "name": "Sydney"}]}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_save_and_load(self):
+        """ Tests that the extension picks the codec on save """
+        storage = FileStorage()
+        for suffix, codec in (("", None), (".gz", gzip), (".xz", compression.lzma)):
+            storage.save_model_data(self.filename + suffix, self.data)
+            self.assertIs(compression.codec_for(self.filename + suffix), codec)
+            self.assertEqual(list(storage.load_model_data(self.filename + suffix)), ["c1", "c2"])
+            os.remove(self.filename + suffix)
+
+    def test_magic_bytes(self):
+        """ Tests that the content, not the name, decides how a file is read """
+        with gzip.open(self.filename, 'wt') as f:
+            json.dump(self.data, f)
+
+        self.assertEqual(len(FileStorage().load_model_data(self.filename)), 2)
+
+    def test_compressed_table(self):
+        """ Tests that a table keeps the format of its data file """
+        storage = FileStorage()
+        storage.save_model_data(self.filename + ".gz", self.data)
+
+        table = storage.load_table(self.filename, "City")
+        table.delete("c2")
+        storage.save_table(table)
+
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["city.json.gz"])
+        with gzip.open(self.filename + ".gz", 'rt') as f:
+            self.assertEqual(json.load(f), {"City": [{"id": "c1", "name": "Melbourne"}]})
+
+    def test_recompress(self):
+        """ Tests switching a data file from one codec to another """
+        FileStorage().save_model_data(self.filename, self.data)
+
+        new_filename = compression.recompress(self.filename, "lzma")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["city.json.xz"])
+        self.assertEqual(compression.recompress(new_filename, "none"), self.filename)
+        with open(self.filename, 'r') as f:
+            self.assertEqual(json.load(f), self.data)
+
+    def test_reshard_keeps_format(self):
+        """ Tests that new shards take the format of the file they replace """
+        storage = FileStorage()
+        storage.save_model_data(self.filename + ".gz", self.data)
+
+        self.assertEqual(storage.reshard(self.filename, "City", 2),
+                         [storage.shard_filename(self.filename, number, 2) + ".gz" for number in range(2)])
+        self.assertEqual(len(storage.load_model_data(self.filename)), 2)
+        self.assertEqual(storage.reshard(self.filename, "City", 1), [self.filename + ".gz"])
+
+    def test_data_filenames(self):
+        """ Tests that data/compress.py only picks the tables' data files """
+        storage = FileStorage()
+        storage.save_model_data(self.filename + ".gz", self.data)
+        storage.save_model_data(os.path.join(self.tmp_dir.name, "place.json"), {"Place": [{"id": "p1"}]})
+        storage.reshard(os.path.join(self.tmp_dir.name, "place.json"), "Place", 2)
+        for name in ("versions.json", "batch.json"):
+            with open(os.path.join(self.tmp_dir.name, name), 'w') as f:
+                f.write("{}")
+
+        self.assertEqual(sorted(os.path.basename(name) for name in data_filenames(self.tmp_dir.name)),
+                         ["city.json.gz", "place.0-of-2.json", "place.1-of-2.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import time
+from datetime import datetime, timezone
+import unittest
+from unittest import mock
+from app import app
+from data import storage, country_data, place_data
+from werkzeug.http import http_date
+
+
+class TestConditional(unittest.TestCase):
+    """Test that GET responses carry validators and answer 304 when they match
+    """
+
+    def setUp(self):
+        self.app = app.test_client()
+
+    def test_collection(self):
+        """ Tests ETag and Last-Modified on a collection route """
+        # a second later, so that Last-Modified is sent
+        later = time.time() + 1
+        with storage.isolated(), mock.patch("api.conditional.time.time", return_value=later):
+            response = self.app.get('/api/v1/countries')
+            self.assertEqual(response.status_code, 200)
+            response.get_data()
+            etag = response.headers["ETag"]
+            last_modified = response.headers["Last-Modified"]
+
+            response = self.app.get('/api/v1/countries', headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.get_data(), b"")
+            self.assertEqual(response.headers["ETag"], etag)
+
+            response = self.app.get('/api/v1/countries', headers={"If-Modified-Since": last_modified})
+            self.assertEqual(response.status_code, 304)
+
+            # a write changes the ETag
+            country = next(iter(country_data.values()))
+            country_data.update(country["id"], {"name": "Renamed"})
+            response = self.app.get('/api/v1/countries', headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers["ETag"], etag)
+            self.assertIn("Renamed", response.get_data(as_text=True))
+
+    def test_shared_version(self):
+        """ Tests that the ETag is made of the storage's shared versions when it has them """
+        with storage.isolated():
+            etag = self.app.get('/api/v1/countries').headers["ETag"]
+            country = next(iter(country_data.values()))
+            country_data.update(country["id"], {"name": "Renamed"})
+            self.assertNotEqual(self.app.get('/api/v1/countries').headers["ETag"], etag)
+
+            # as with every worker holding the same saved data
+            with mock.patch.object(storage, "shared_version", return_value="epoch.7"):
+                etag = self.app.get('/api/v1/countries').headers["ETag"]
+                self.assertEqual(etag, '"epoch.7"')
+                response = self.app.get('/api/v1/countries', headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 304)
+
+    def test_same_second(self):
+        """ Tests that Last-Modified isn't sent, nor If-Modified-Since trusted, within the second of a write """
+        with storage.isolated():
+            country = next(iter(country_data.values()))
+            country_data.update(country["id"], {"name": "Renamed"})
+            last_modified = datetime.fromtimestamp(int(country_data.modified), timezone.utc)
+
+            response = self.app.get('/api/v1/countries')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("Last-Modified", response.headers)
+            response = self.app.get('/api/v1/countries', headers={"If-Modified-Since": http_date(last_modified)})
+            self.assertEqual(response.status_code, 200)
+
+            # once the second is over, it is
+            with mock.patch("api.conditional.time.time", return_value=country_data.modified + 1):
+                response = self.app.get('/api/v1/countries')
+                self.assertEqual(response.headers["Last-Modified"], http_date(last_modified))
+                response = self.app.get('/api/v1/countries', headers={"If-Modified-Since": http_date(last_modified)})
+                self.assertEqual(response.status_code, 304)
+
+    def test_row(self):
+        """ Tests ETag and Last-Modified on a single row route """
+        place_id = next(iter(place_data))
+        url = '/api/v1/places/' + place_id
+        with storage.isolated():
+            response = self.app.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers["ETag"]
+            self.assertIn("Last-Modified", response.headers)
+
+            response = self.app.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(self.app.get(url, headers={"If-None-Match": '"other"'}).status_code, 200)
+            self.assertEqual(self.app.get(url, headers={"If-None-Match": "*"}).status_code, 304)
+
+            response = self.app.put(url, json={"name": "Renamed"})
+            self.assertEqual(response.status_code, 200)
+            response = self.app.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()["name"], "Renamed")
+
+        # not found is not affected
+        self.assertEqual(self.app.get('/api/v1/places/nope', headers={"If-None-Match": "*"}).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import sqlite3
+import threading
+import unittest
+from data.connection_pool import ConnectionPool
+
+class TestConnectionPool(unittest.TestCase):
+    """Test that the connection pool is bounded and reports its usage
+    """
+
+    def setUp(self):
+        self.pool = ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False),
+                                   size=2, timeout=0.05)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_reuses_released_connections(self):
+        """ Tests that a released connection is handed out again """
+        first = self.pool.acquire()
+        self.pool.release(first)
+        second = self.pool.acquire()
+
+        self.assertIs(first, second)
+        self.assertEqual(self.pool.stats()["opened"], 1)
+
+    def test_checkout_timeout(self):
+        """ Tests that checkouts beyond the pool size time out """
+        self.pool.acquire()
+        self.pool.acquire()
+
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire()
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["saturation"], 1.0)
+
+    def test_waits_for_release(self):
+        """ Tests that a waiting checkout gets the next released connection """
+        self.pool.timeout = 5
+        held = [self.pool.acquire(), self.pool.acquire()]
+        threading.Timer(0.05, self.pool.release, args=[held[0]]).start()
+
+        self.assertIs(self.pool.acquire(), held[0])
+        stats = self.pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreater(stats["max_wait_time"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
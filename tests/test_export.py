@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import json
+import unittest
+from data import storage, place_data
+from data.export import export_ndjson, parse_since
+from app import app
+
+class TestExport(unittest.TestCase):
+    """Test that tables are exported as NDJSON
+    """
+
+    def setUp(self):
+        self.place_id, place = next(iter(place_data.items()))
+        self.city_id = place["city_id"]
+
+    def test_export_ndjson(self):
+        """ Tests exporting a table, filtered and incrementally """
+        rows = [json.loads(line) for line in "".join(export_ndjson("places", buffer_size=1)).splitlines()]
+        self.assertEqual(len(rows), len(place_data))
+
+        rows = "".join(export_ndjson("places", {"city_id": self.city_id})).splitlines()
+        self.assertIn(self.place_id, [json.loads(line)["id"] for line in rows])
+
+        with storage.isolated():
+            place_data.update(self.place_id, {"updated_at": 4102444800.0})
+            rows = "".join(export_ndjson("places", since=parse_since("2100-01-01T00:00:00+00:00")))
+            self.assertEqual([json.loads(line)["id"] for line in rows.splitlines()], [self.place_id])
+
+        with self.assertRaises(ValueError):
+            export_ndjson("places", {"name": "Ringwood Hotel"})
+
+    def test_export_api(self):
+        """ Tests the /export endpoint """
+        client = app.test_client()
+        response = client.get('/api/v1/export/places?city_id=' + self.city_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertIn(self.place_id, response.get_data(as_text=True))
+
+        self.assertEqual(client.get('/api/v1/export/places?name=x').status_code, 400)
+        self.assertEqual(client.get('/api/v1/export/places?since=yesterday').status_code, 400)
+        self.assertEqual(client.get('/api/v1/export/planets').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,368 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from data.file_storage import FileStorage
+
+def insert_cities(filename, version_file, number):
+    """ Child process body for test_shared_between_processes """
+    storage = FileStorage(version_file=version_file)
+    table = storage.lazy_table(filename, "City")
+    for count in range(10):
+        storage.refresh()
+        table.insert({"id": "p{}-{}".format(number, count), "name": "City"})
+        storage.save_table(table)
+
+
+class TestFileStorage(unittest.TestCase):
+    """Test that the file storage persists tables as expected
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, "city.json")
+        self.journal_file = os.path.join(self.tmp_dir.name, "journal.ndjson")
+        with open(self.filename, 'w') as f:
+            json.dump({"City": [{"id": "c1", "name": "Melbourne"}]}, f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read_back(self):
+        with open(self.filename, 'r') as f:
+            return json.load(f)
+
+    def test_save_table_synchronous(self):
+        """ Tests that tables are written immediately without write-behind """
+        storage = FileStorage()
+        table = storage.load_table(self.filename, "City")
+        table.insert({"id": "c2", "name": "Sydney"})
+        storage.save_table(table)
+
+        self.assertEqual(len(self.read_back()["City"]), 2)
+
+    def test_save_model_data_atomic(self):
+        """ Tests that a failed write leaves the previous file intact """
+        storage = FileStorage()
+
+        with self.assertRaises(TypeError):
+            # sets can't be serialised, so the dump fails half way
+            storage.save_model_data(self.filename, {"City": [{"id": "c1"}, {"id": {1}}]})
+
+        self.assertEqual(self.read_back()["City"][0]["name"], "Melbourne")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["city.json"])
+
+    def test_fsync_policy_and_stats(self):
+        """ Tests the fsync policies and the write counters """
+        with self.assertRaises(ValueError):
+            FileStorage(fsync="sometimes")
+
+        storage = FileStorage(fsync="per-write")
+        table = storage.load_table(self.filename, "City")
+        storage.save_table(table)
+        storage.save_table(table)
+        counters = storage.stats()[self.filename]
+        self.assertEqual(counters["writes"], 2)
+        self.assertEqual(counters["fsyncs"], 2)
+        self.assertEqual(counters["bytes_written"], 2 * os.path.getsize(self.filename))
+
+        storage = FileStorage(fsync="interval", fsync_interval=60)
+        table = storage.load_table(self.filename, "City")
+        storage.save_table(table)
+        storage.save_table(table)
+        self.assertEqual(storage.stats()[self.filename]["fsyncs"], 1)
+        # the skipped write is synced on close
+        storage.close()
+        self.assertEqual(storage.stats()[self.filename]["fsyncs"], 2)
+
+    def test_fsync_interval_catches_up(self):
+        """ Tests that a write whose fsync was skipped is synced once the interval is over """
+        storage = FileStorage(fsync="interval", fsync_interval=0.1)
+        table = storage.load_table(self.filename, "City")
+        storage.save_table(table)
+        storage.save_table(table)
+        storage.save_table(table)
+        self.assertEqual(storage.stats()[self.filename]["fsyncs"], 1)
+
+        deadline = time.monotonic() + 5
+        while storage.stats()[self.filename]["fsyncs"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        # both skipped writes are covered by a single fsync
+        self.assertEqual(storage.stats()[self.filename]["fsyncs"], 2)
+        storage.close()
+        self.assertEqual(storage.stats()[self.filename]["fsyncs"], 2)
+
+    def test_save_table_write_behind(self):
+        """ Tests that write-behind defers and coalesces writes until flushed """
+        storage = FileStorage(write_behind=True, flush_interval=60)
+        table = storage.load_table(self.filename, "City")
+        table.insert({"id": "c2", "name": "Sydney"})
+        storage.save_table(table)
+        table.insert({"id": "c3", "name": "Perth"})
+        storage.save_table(table)
+
+        self.assertEqual(len(self.read_back()["City"]), 1)
+
+        storage.close()
+        self.assertEqual(len(self.read_back()["City"]), 3)
+
+    def test_write_behind_error(self):
+        """ Tests that the flusher reports a failed flush and retries it on the next interval """
+        storage = FileStorage(write_behind=True, flush_interval=0.05)
+        table = storage.load_table(self.filename, "City")
+        save_snapshot = storage.save_snapshot
+        calls = []
+
+        def fail_once(table):
+            calls.append(table)
+            if len(calls) == 1:
+                raise ValueError("boom")
+            save_snapshot(table)
+
+        errors = io.StringIO()
+        with mock.patch.object(storage, "save_snapshot", side_effect=fail_once), \
+                contextlib.redirect_stderr(errors):
+            table.insert({"id": "c2", "name": "Sydney"})
+            storage.save_table(table)
+
+            deadline = time.monotonic() + 5
+            while len(self.read_back()["City"]) < 2 and time.monotonic() < deadline:
+                time.sleep(0.02)
+
+        self.assertEqual(len(self.read_back()["City"]), 2)
+        self.assertIn("boom", errors.getvalue())
+        storage.close()
+
+    def test_journal_replay(self):
+        """ Tests that journaled changes survive a restart without a snapshot """
+        storage = FileStorage(journal_file=self.journal_file)
+        table = storage.load_table(self.filename, "City")
+        storage.open_journal()
+        table.insert({"id": "c2", "name": "Sydney"})
+        table.update("c1", {"name": "Geelong"})
+        table.delete("c2")
+        storage.save_table(table)
+
+        # the data file itself is untouched, only the journal grows
+        self.assertEqual(self.read_back()["City"][0]["name"], "Melbourne")
+        with open(self.journal_file, 'r') as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+        restarted = FileStorage(journal_file=self.journal_file)
+        table = restarted.lazy_table(self.filename, "City")
+        restarted.open_journal()
+        self.assertFalse(table.loaded)
+        self.assertEqual(list(table), ["c1"])
+        self.assertEqual(table["c1"]["name"], "Geelong")
+
+        # compacting folds the journal into the data file
+        restarted.compact()
+        self.assertFalse(os.path.exists(self.journal_file))
+        self.assertEqual(self.read_back()["City"][0]["name"], "Geelong")
+
+    def test_journal_compaction(self):
+        """ Tests that the journal is compacted once it crosses the threshold """
+        storage = FileStorage(journal_file=self.journal_file, compact_threshold=1)
+        table = storage.load_table(self.filename, "City")
+        storage.open_journal()
+        table.insert({"id": "c2", "name": "Sydney"})
+        storage.save_table(table)
+        storage.close()
+
+        self.assertFalse(os.path.exists(self.journal_file))
+        self.assertEqual(len(self.read_back()["City"]), 2)
+
+    def test_journal_compaction_error(self):
+        """ Tests that a failed compaction is reported and leaves the journal to replay """
+        storage = FileStorage(journal_file=self.journal_file, compact_threshold=1)
+        table = storage.load_table(self.filename, "City")
+        storage.open_journal()
+        errors = io.StringIO()
+        with mock.patch.object(storage, "save_snapshot", side_effect=ValueError("boom")), \
+                contextlib.redirect_stderr(errors):
+            table.insert({"id": "c2", "name": "Sydney"})
+            storage.save_table(table)
+            storage.close()
+
+        self.assertIn("boom", errors.getvalue())
+        self.assertEqual(len(self.read_back()["City"]), 1)
+
+        storage = FileStorage(journal_file=self.journal_file)
+        table = storage.load_table(self.filename, "City")
+        storage.open_journal()
+        self.assertIn("c2", table)
+
+    def test_sharded_tables(self):
+        """ Tests that a sharded table only rewrites the shards with changes """
+        storage = FileStorage(shards=4)
+        table = storage.load_table(self.filename, "City")
+        for number in range(2, 40):
+            table.insert({"id": "c{}".format(number), "name": "City {}".format(number)})
+        storage.save_table(table)
+
+        # the first save splits the single file up
+        self.assertFalse(os.path.exists(self.filename))
+        shard_filenames = storage.shard_filenames(self.filename)
+        self.assertEqual(len(shard_filenames), 4)
+
+        table.update("c7", {"name": "Ballarat"})
+        storage.save_table(table)
+        writes = {name: counters["writes"] for name, counters in storage.stats().items()}
+        self.assertEqual(sorted(writes.values()), [1, 1, 1, 2])
+
+        restarted = FileStorage()
+        table = restarted.load_table(self.filename, "City")
+        self.assertEqual(len(table), 39)
+        self.assertEqual(table["c7"]["name"], "Ballarat")
+
+        # merge back into one file
+        self.assertEqual(restarted.reshard(self.filename, "City", 1), [self.filename])
+        self.assertIsNone(restarted.shard_filenames(self.filename))
+        self.assertEqual(len(self.read_back()["City"]), 39)
+
+    def test_interrupted_reshard(self):
+        """ Tests that the newest complete set of shards is the one loaded """
+        storage = FileStorage()
+        for filename in storage.reshard(self.filename, "City", 2):
+            os.utime(filename, (1, 1))
+
+        # as if a reshard to 3 had stopped before removing the old shards
+        for number in range(3):
+            storage.save_model_data(storage.shard_filename(self.filename, number, 3), {"City": []})
+        self.assertEqual(len(storage.shard_filenames(self.filename)), 3)
+
+        # an incomplete set is ignored
+        os.remove(storage.shard_filename(self.filename, 1, 3))
+        self.assertEqual(len(storage.shard_filenames(self.filename)), 2)
+        self.assertEqual(list(storage.load_model_data(self.filename)), ["c1"])
+
+    def test_isolated(self):
+        """ Tests that changes made in isolation are thrown away """
+        storage = FileStorage()
+        table = storage.lazy_table(self.filename, "City")
+
+        with storage.isolated():
+            table.insert({"id": "c2", "name": "Sydney"})
+            storage.save_table(table)
+            self.assertEqual(len(table), 2)
+            (snapshot,) = storage.snapshot(table)
+
+        self.assertEqual(len(table), 1)
+        self.assertEqual(len(snapshot), 2)
+        self.assertEqual(len(self.read_back()["City"]), 1)
+
+    def test_hot_reload(self):
+        """ Tests that files changed by someone else are reloaded and swapped in """
+        storage = FileStorage()
+        table = storage.lazy_table(self.filename, "City", indexes=["name"])
+        self.assertEqual(storage.reload_changed(), [])
+
+        old = table.load()
+        table.insert({"id": "c2", "name": "Sydney"})
+        storage.save_table(table)
+        # our own writes are not reloaded
+        self.assertEqual(storage.reload_changed(), [])
+
+        other = FileStorage()
+        other.save_model_data(self.filename, {"City": [{"id": "c3", "name": "Perth"}]})
+        self.assertEqual(storage.reload_changed(), ["City"])
+        self.assertEqual(list(table), ["c3"])
+        self.assertEqual(table.find_one_by("name", "Perth")["id"], "c3")
+        # whoever still holds the old table sees it whole
+        self.assertEqual(list(old), ["c1", "c2"])
+
+        # a broken file leaves the current table in place
+        with open(self.filename, 'w') as f:
+            f.write('{"City": [')
+        self.assertEqual(storage.reload_changed(), [])
+        self.assertEqual(list(table), ["c3"])
+
+    def test_watch(self):
+        """ Tests the polling thread """
+        storage = FileStorage()
+        table = storage.lazy_table(self.filename, "City")
+        self.assertEqual(len(table), 1)
+        storage.watch(0.01)
+
+        FileStorage().save_model_data(self.filename, {"City": []})
+        for _ in range(500):
+            if len(table) == 0:
+                break
+            time.sleep(0.01)
+        storage.close()
+
+        self.assertEqual(len(table), 0)
+
+
+    def test_shared_between_storages(self):
+        """ Tests that storages sharing the data files don't overwrite each other """
+        version_file = os.path.join(self.tmp_dir.name, "versions.json")
+        first = FileStorage(version_file=version_file)
+        second = FileStorage(version_file=version_file)
+        first_table = first.lazy_table(self.filename, "City")
+        second_table = second.lazy_table(self.filename, "City")
+        self.assertEqual(len(second_table), 1)
+
+        first_table.insert({"id": "c2", "name": "Sydney"})
+        first.save_table(first_table)
+        # the second storage has not seen c2, but keeps it when saving
+        second_table.insert({"id": "c3", "name": "Perth"})
+        second.save_table(second_table)
+        self.assertEqual(sorted(row["id"] for row in self.read_back()["City"]), ["c1", "c2", "c3"])
+
+        self.assertEqual(first.refresh(), ["City"])
+        self.assertEqual(first.refresh(), [])
+        self.assertEqual(sorted(first_table), ["c1", "c2", "c3"])
+
+        with self.assertRaises(ValueError):
+            FileStorage(version_file=version_file, journal_file=self.journal_file)
+
+    def test_shared_version(self):
+        """ Tests that storages holding the same saved data agree on its version """
+        self.assertIsNone(FileStorage().shared_version("City"))
+
+        version_file = os.path.join(self.tmp_dir.name, "versions.json")
+        first = FileStorage(version_file=version_file)
+        second = FileStorage(version_file=version_file)
+        first_table = first.lazy_table(self.filename, "City")
+        second_table = second.lazy_table(self.filename, "City")
+        self.assertEqual(len(first_table), len(second_table))
+        self.assertEqual(first.shared_version("City"), second.shared_version("City"))
+
+        # unsaved changes have no shared version
+        first_table.insert({"id": "c2", "name": "Sydney"})
+        self.assertIsNone(first.shared_version("City"))
+        first.save_table(first_table)
+        version = first.shared_version("City")
+        self.assertIsNotNone(version)
+        self.assertNotEqual(second.shared_version("City"), version)
+        second.refresh()
+        self.assertEqual(second.shared_version("City"), version)
+
+        with second.isolated():
+            self.assertIsNone(second.shared_version("City"))
+
+    def test_shared_between_processes(self):
+        """ Tests concurrent saves from several processes """
+        version_file = os.path.join(self.tmp_dir.name, "versions.json")
+        processes = [multiprocessing.get_context("fork").Process(
+            target=insert_cities, args=(self.filename, version_file, number)) for number in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual(len(self.read_back()["City"]), 1 + 4 * 10)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
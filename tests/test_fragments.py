@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import json
+import unittest
+from data.repository import Repository
+from api.fragments import FragmentCache
+
+
+class TestFragmentCache(unittest.TestCase):
+    """Test that row fragments are reused until the row changes
+    """
+
+    def setUp(self):
+        self.table = Repository({"1": {"id": "1", "name": "a"}, "2": {"id": "2", "name": "b"}})
+        self.renders = 0
+
+        def render(row):
+            self.renders += 1
+            return {"id": row["id"], "name": row["name"].upper()}
+
+        self.fragments = FragmentCache(self.table, render)
+
+    def test_reuse(self):
+        """ Tests that an unchanged row is encoded once """
+        first = self.fragments.get(self.table["1"], json.dumps)
+        self.assertEqual(json.loads(first), {"id": "1", "name": "A"})
+        self.assertIs(self.fragments.get(self.table["1"], json.dumps), first)
+        self.assertEqual(self.renders, 1)
+
+        # a snapshot shares the row, and so the fragment
+        self.assertIs(self.fragments.get(self.table.snapshot()["1"], json.dumps), first)
+        self.assertEqual(self.renders, 1)
+
+    def test_invalidation(self):
+        """ Tests that an updated row is encoded again """
+        snapshot = self.table.snapshot()
+        self.fragments.get(self.table["1"], json.dumps)
+        self.table.update("1", {"name": "c"})
+        self.assertEqual(json.loads(self.fragments.get(self.table["1"], json.dumps))["name"], "C")
+        self.assertEqual(json.loads(self.fragments.get(snapshot["1"], json.dumps))["name"], "A")
+        self.assertEqual(self.renders, 3)
+
+    def test_prune(self):
+        """ Tests that the fragments of deleted rows are dropped """
+        for number in range(3000):
+            row = self.table.insert({"id": str(number + 10), "name": "x"})
+            self.fragments.get(row, json.dumps)
+            self.table.delete(row["id"])
+
+        self.assertLessEqual(len(self.fragments), 2 * len(self.table) + 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import io
+import json
+import unittest
+from data.json_stream import iter_rows
+
+class TestJsonStream(unittest.TestCase):
+    """Test that the incremental reader yields the same rows as json.load
+    """
+
+    def test_matches_json_load(self):
+        """ Tests every data file, with chunks small enough to split rows """
+        for filename in ['data/place.json', 'data/review.json', 'data/place_to_amenity.json']:
+            with open(filename, 'r') as f:
+                expected = json.load(f)
+            for chunk_size in (1, 7, 64 * 1024):
+                with open(filename, 'r') as f:
+                    rows = list(iter_rows(f, chunk_size=chunk_size))
+                self.assertEqual([(name, row) for name in expected for row in expected[name]], rows)
+
+    def test_empty_and_multiple_models(self):
+        """ Tests empty documents, empty lists and several models in one file """
+        self.assertEqual(list(iter_rows(io.StringIO(' { } '))), [])
+        text = '{"City": [], "Country": [{"id": "c1"}, {"id": "c2"}]}'
+        self.assertEqual(list(iter_rows(io.StringIO(text), chunk_size=3)),
+                         [("Country", {"id": "c1"}), ("Country", {"id": "c2"})])
+
+    def test_malformed(self):
+        """ Tests that broken documents raise ValueError """
+        for text in ['', '[]', '{"City": [{"id": "c1"}', '{"City": [{"id": "c1"} {"id": "c2"}]}']:
+            with self.assertRaises(ValueError):
+                list(iter_rows(io.StringIO(text), chunk_size=4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import threading
+import time
+import unittest
+from data.lazy_table import LazyTable
+from data.repository import Repository
+
+class TestLazyTable(unittest.TestCase):
+    """Test that lazy tables load once, on first access
+    """
+
+    def setUp(self):
+        self.calls = 0
+
+    def loader(self):
+        self.calls += 1
+        # widen the window for a second thread to race the first one
+        time.sleep(0.01)
+        return Repository({"c1": {"id": "c1", "name": "Melbourne"}}, name="City")
+
+    def test_loads_on_first_access(self):
+        """ Tests that nothing is loaded until the table is used """
+        table = LazyTable(self.loader)
+        self.assertFalse(table.loaded)
+        self.assertEqual(self.calls, 0)
+
+        self.assertEqual(table["c1"]["name"], "Melbourne")
+        self.assertEqual(table.name, "City")
+        self.assertTrue(table.loaded)
+
+    def test_loads_once_across_threads(self):
+        """ Tests that concurrent first accesses share a single load """
+        table = LazyTable(self.loader)
+        threads = [threading.Thread(target=len, args=[table]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import threading
+import time
+import unittest
+from data.repository import Repository
+
+class TestRepository(unittest.TestCase):
+    """Test that the repository keeps rows and indexes consistent
+    """
+
+    def setUp(self):
+        rows = {
+            "c1": {"id": "c1", "name": "Melbourne", "country_id": "au"},
+            "c2": {"id": "c2", "name": "Sydney", "country_id": "au"},
+            "c3": {"id": "c3", "name": "Vancouver", "country_id": "ca"}
+        }
+        self.repo = Repository(rows, indexes=["country_id"])
+
+    def test_get_by_id(self):
+        """ Tests lookup of a row by id """
+        self.assertEqual(self.repo["c1"]["name"], "Melbourne")
+        self.assertIsNone(self.repo.get("missing"))
+        self.assertEqual(len(self.repo), 3)
+
+    def test_find_by_index(self):
+        """ Tests lookup of rows through a secondary index """
+        names = [row["name"] for row in self.repo.find_by("country_id", "au")]
+        self.assertEqual(names, ["Melbourne", "Sydney"])
+        self.assertEqual(self.repo.find_by("country_id", "nz"), [])
+
+    def test_update_moves_index_entry(self):
+        """ Tests that updating an indexed field keeps the index in sync """
+        self.repo.update("c2", {"country_id": "ca"})
+        self.assertEqual(len(self.repo.find_by("country_id", "au")), 1)
+        self.assertEqual(len(self.repo.find_by("country_id", "ca")), 2)
+
+    def test_delete_removes_index_entry(self):
+        """ Tests that deleting a row removes it from the indexes """
+        self.repo.delete("c3")
+        self.assertNotIn("c3", self.repo)
+        self.assertIsNone(self.repo.find_one_by("country_id", "ca"))
+
+    def test_load_rebuilds_indexes(self):
+        """ Tests that loading a new table rebuilds the indexes """
+        self.repo.load({"c4": {"id": "c4", "name": "Auckland", "country_id": "nz"}})
+        self.assertEqual(len(self.repo), 1)
+        self.assertEqual(self.repo.find_by("country_id", "au"), [])
+        self.assertEqual(self.repo.find_one_by("country_id", "nz")["name"], "Auckland")
+
+    def test_find_by_undeclared_field(self):
+        """ Tests that only declared indexes can be queried """
+        with self.assertRaises(KeyError):
+            self.repo.find_by("name", "Sydney")
+
+    def test_iter_rows(self):
+        """ Tests iterating over the rows while the table changes """
+        rows = self.repo.iter_rows("country_id", "au")
+        self.repo.delete("c2")
+        self.repo.insert({"id": "c4", "name": "Perth", "country_id": "au"})
+
+        self.assertEqual([row["id"] for row in rows], ["c1", "c2"])
+        self.assertEqual([row["id"] for row in self.repo.iter_rows()], ["c1", "c3", "c4"])
+        with self.assertRaises(KeyError):
+            self.repo.iter_rows("name", "Perth")
+
+    def test_page(self):
+        """ Tests paging through a sorted index """
+        repo = Repository({"c{}".format(number): {"id": "c{}".format(number), "name": name}
+                           for number, name in enumerate(["b", "a", "c", "a", None])},
+                          sorted_indexes=["name"])
+        self.assertEqual([row["id"] for row in repo.page("name", limit=3)], ["c4", "c1", "c3"])
+
+        after = repo.sort_key(repo["c3"], "name")
+        self.assertEqual([row["id"] for row in repo.page("name", after)], ["c0", "c2"])
+        self.assertEqual([row["id"] for row in repo.page("name", after, descending=True)], ["c1", "c4"])
+
+        repo.update("c2", {"name": "0"})
+        repo.delete("c4")
+        self.assertEqual([row["id"] for row in repo.page("name")], ["c2", "c1", "c3", "c0"])
+        with self.assertRaises(KeyError):
+            repo.page("id")
+
+    def test_mixed_types(self):
+        """ Tests that values of any type can be indexed, and that a row that
+        can't be indexed leaves the table unchanged """
+        repo = Repository({"c1": {"id": "c1", "name": "b"}, "c2": {"id": "c2", "name": "a"}},
+                          indexes=["name"], sorted_indexes=["name"])
+        repo.update("c1", {"name": 123})
+        repo.insert({"id": "c3", "name": 1.5})
+        self.assertEqual([row["id"] for row in repo.page("name")], ["c3", "c1", "c2"])
+
+        version = repo.version
+        with self.assertRaises(TypeError):
+            repo.update("c2", {"name": ["not", "hashable"]})
+        with self.assertRaises(TypeError):
+            repo.insert({"id": "c4", "name": {}})
+        self.assertEqual(repo.version, version)
+        self.assertEqual(repo["c2"]["name"], "a")
+        self.assertNotIn("c4", repo)
+        self.assertEqual(len(repo.page("name")), 3)
+
+        repo.delete("c1")
+        self.assertEqual([row["id"] for row in repo.page("name")], ["c3", "c2"])
+
+    def test_snapshot(self):
+        """ Tests that a snapshot keeps the table as it was and can't be changed """
+        snapshot = self.repo.snapshot()
+        self.repo.insert({"id": "c4", "name": "Auckland", "country_id": "nz"})
+        self.repo.update("c1", {"name": "Geelong"})
+        self.repo.delete("c2")
+
+        self.assertEqual(list(snapshot), ["c1", "c2", "c3"])
+        self.assertEqual(snapshot["c1"]["name"], "Melbourne")
+        self.assertEqual(len(snapshot.find_by("country_id", "au")), 2)
+        self.assertIsNone(snapshot.find_one_by("country_id", "nz"))
+        with self.assertRaises(TypeError):
+            snapshot.insert({"id": "c5"})
+
+        self.assertEqual(list(self.repo), ["c1", "c3", "c4"])
+        self.assertEqual(len(self.repo.find_by("country_id", "au")), 1)
+
+    def test_fork(self):
+        """ Tests that a fork and its table don't see each other's changes """
+        fork = self.repo.fork()
+        fork.delete("c1")
+        fork.update("c3", {"country_id": "au"})
+        self.repo.insert({"id": "c4", "name": "Auckland", "country_id": "nz"})
+
+        self.assertEqual(list(fork), ["c2", "c3"])
+        self.assertEqual(len(fork.find_by("country_id", "au")), 2)
+        self.assertEqual(list(self.repo), ["c1", "c2", "c3", "c4"])
+        self.assertEqual(self.repo["c3"]["country_id"], "ca")
+
+    def test_snapshot_all(self):
+        """ Tests snapshots of several tables at once """
+        other = Repository({"p1": {"id": "p1", "city_id": "c1"}}, indexes=["city_id"])
+        cities, places, same_cities = Repository.snapshot_all([self.repo, other, self.repo])
+        other.delete("p1")
+        self.repo.delete("c1")
+
+        self.assertIn("p1", places)
+        self.assertIn("c1", cities)
+        self.assertEqual(list(same_cities), list(cities))
+
+    def test_concurrent_reads_and_writes(self):
+        """ Tests many threads reading while others write """
+        repo = Repository({"r{}".format(number): {"id": "r{}".format(number), "a": 0, "b": 0, "group": 0}
+                           for number in range(200)}, indexes=["group"])
+        errors = []
+        stop = threading.Event()
+
+        def writer(number):
+            count = 0
+            while not stop.is_set():
+                count += 1
+                row_id = "w{}-{}".format(number, count % 50)
+                if row_id in repo and count % 3 == 0:
+                    repo.delete(row_id)
+                else:
+                    repo.insert({"id": row_id, "a": count, "b": count, "group": count % 5})
+                # a and b always change together
+                target = "r{}".format(count % 200)
+                repo.update(target, {"a": count, "b": count, "group": count % 5})
+
+        def reader():
+            while not stop.is_set():
+                for row in repo.values():
+                    if row["a"] != row["b"]:
+                        errors.append("torn row {}".format(row))
+                for row_id in repo:
+                    repo.get(row_id)
+                for group in range(5):
+                    for row in repo.find_by("group", group):
+                        if row["group"] != group:
+                            errors.append("stale index entry {}".format(row))
+
+        def run(target, *args):
+            try:
+                target(*args)
+            except Exception as exc:
+                errors.append(repr(exc))
+
+        threads = [threading.Thread(target=run, args=(writer, number)) for number in range(4)]
+        threads += [threading.Thread(target=run, args=(reader,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(len(repo.find_by("group", group)) for group in range(5)), len(repo))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
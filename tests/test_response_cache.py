@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import unittest
+from flask import Flask
+from app import app
+from api.response_cache import ResponseCache, response_cache
+from data import storage, country_data
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test that GET responses are cached until their tables change
+    """
+
+    def setUp(self):
+        self.app = app.test_client()
+        response_cache.clear()
+
+    def tearDown(self):
+        response_cache.clear()
+
+    def test_hit(self):
+        """ Tests that a repeated request is served from the cache """
+        before = response_cache.stats()
+        first = self.app.get('/api/v1/countries')
+        # a streamed response is cached once it has been sent in full
+        countries = first.get_json()
+        second = self.app.get('/api/v1/countries')
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.get_json(), countries)
+        self.assertEqual(second.mimetype, "application/json")
+
+        stats = response_cache.stats()
+        self.assertEqual(stats["misses"], before["misses"] + 1)
+        self.assertEqual(stats["hits"], before["hits"] + 1)
+        self.assertEqual(stats["entries"], 1)
+
+        # the query string is part of the key
+        self.app.get('/api/v1/countries?limit=1').get_json()
+        self.assertEqual(response_cache.stats()["misses"], stats["misses"] + 1)
+
+    def test_invalidation(self):
+        """ Tests that a write to a table makes its cached responses stale """
+        stale = response_cache.stats()["stale"]
+        with storage.isolated():
+            self.app.get('/api/v1/countries').get_json()
+            country = next(iter(country_data.values()))
+            country_data.update(country["id"], {"name": "Renamed"})
+
+            response = self.app.get('/api/v1/countries')
+            names = [row["name"] for row in response.get_json() if row["id"] == country["id"]]
+            self.assertEqual(names, ["Renamed"])
+            self.assertEqual(response_cache.stats()["stale"], stale + 1)
+
+        # the original table is back: so is its own version
+        names = [row["name"] for row in self.app.get('/api/v1/countries').get_json()
+                 if row["id"] == country["id"]]
+        self.assertEqual(names, [country["name"]])
+
+    def test_eviction(self):
+        """ Tests that the least recently used entries are evicted under the cap """
+        cache = ResponseCache(max_bytes=8 * 100)
+        test_app = Flask(__name__)
+
+        @test_app.route('/test_response_cache/<number>')
+        @cache.cached(country_data)
+        def cached_number(number):
+            return "x" * 60
+
+        test_app = test_app.test_client()
+
+        for number in range(12):
+            self.assertEqual(test_app.get('/test_response_cache/{}'.format(number)).status_code, 200)
+
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], stats["max_bytes"])
+        self.assertGreater(stats["evictions"], 0)
+        self.assertLess(stats["entries"], 12)
+
+        # the most recent one is still there
+        test_app.get('/test_response_cache/11')
+        self.assertEqual(cache.stats()["hits"], 1)
+
+        # too big to be cached at all
+        cache.max_bytes = 80
+        test_app.get('/test_response_cache/12')
+        test_app.get('/test_response_cache/12')
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_stats_api(self):
+        """ Tests the /stats/cache endpoint """
+        self.app.get('/api/v1/users').get_json()
+        response = self.app.get('/api/v1/stats/cache')
+        self.assertEqual(response.status_code, 200)
+        stats = response.get_json()
+        for key in ("hits", "misses", "stale", "evictions", "entries", "bytes", "max_bytes"):
+            self.assertIn(key, stats)
+        self.assertEqual(stats["entries"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
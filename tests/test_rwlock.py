@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import threading
+import time
+import unittest
+from data.rwlock import ReadWriteLock
+
+class TestReadWriteLock(unittest.TestCase):
+    """Test that readers share the lock and writers get it alone
+    """
+
+    def test_readers_share(self):
+        """ Tests that several readers hold the lock at once """
+        lock = ReadWriteLock()
+        inside = threading.Barrier(3, timeout=5)
+
+        def reader():
+            with lock.read():
+                inside.wait()
+
+        threads = [threading.Thread(target=reader) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(inside.broken)
+
+    def test_writer_waits_for_readers(self):
+        """ Tests that a writer waits for the readers, and new readers wait for it """
+        lock = ReadWriteLock()
+        events = []
+
+        def writer():
+            with lock.write():
+                events.append("write")
+
+        def late_reader():
+            with lock.read():
+                events.append("late read")
+
+        with lock.read():
+            writer_thread = threading.Thread(target=writer)
+            writer_thread.start()
+            time.sleep(0.05)
+            # the writer is waiting, so this reader queues behind it
+            reader_thread = threading.Thread(target=late_reader)
+            reader_thread.start()
+            time.sleep(0.05)
+            events.append("read")
+
+        writer_thread.join()
+        reader_thread.join()
+        self.assertEqual(events, ["read", "write", "late read"])
+
+
+if __name__ == '__main__':
+    unittest.main()
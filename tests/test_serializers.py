@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import unittest
+from datetime import datetime
+from api.serializers import compile_serializer, register, serializer
+
+
+class TestSerializers(unittest.TestCase):
+    """Test that the compiled serializers build the API representation of rows
+    """
+
+    row = {"id": "1", "name": "Ringwood", "code": "AU", "password": "secret",
+           "feedback": "Nice", "rating": 4, "created_at": 1715400000.5, "updated_at": 1715400001.0}
+
+    def test_compile(self):
+        """ Tests the fields, converters and renamed columns """
+        serialize = compile_serializer("Test", ["id", ("created_at", "isoformat"),
+                                                ("updated_at", "datetime"), ("review", None, "feedback"),
+                                                ("stars", "rating", "rating")])
+        self.assertEqual(serialize(self.row), {
+            "id": "1",
+            "created_at": datetime.fromtimestamp(1715400000.5).isoformat(),
+            "updated_at": datetime.fromtimestamp(1715400001.0),
+            "review": "Nice",
+            "stars": "4 / 5"
+        })
+        self.assertIn("def serialize_test(row):", serialize.source)
+
+        with self.assertRaises(ValueError):
+            compile_serializer("Test", [("id", "nope")])
+
+    def test_registry(self):
+        """ Tests the models' serializers """
+        country = serializer("Country")(self.row)
+        self.assertEqual(sorted(country), ["code", "created_at", "id", "name", "updated_at"])
+        self.assertEqual(country["created_at"], datetime.fromtimestamp(1715400000.5).isoformat())
+
+        self.assertNotIn("password", serializer("UserSummary")({
+            "id": "1", "first_name": "a", "last_name": "b", "email": "c", "password": "d",
+            "created_at": 0, "updated_at": 0}))
+
+        registered = register("TestModel", ["id"])
+        self.assertIs(serializer("TestModel"), registered)
+        with self.assertRaises(KeyError):
+            serializer("Nothing")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import os
+import tempfile
+import unittest
+from data.sqlite_storage import SQLiteStorage
+
+class TestSQLiteStorage(unittest.TestCase):
+    """Test that the SQLite storage behaves like the file storage
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp_dir.name, "hbnb.db")
+        self.storage = SQLiteStorage(self.db_file, fsync="none")
+        self.storage.import_json_files('data')
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmp_dir.cleanup()
+
+    def test_import_json_files(self):
+        """ Tests that the migrated tables match the JSON data files """
+        places = self.storage.load_model_data('data/place.json')
+        self.assertEqual(len(places), 3)
+        self.assertEqual(places["90c83333-35d4-4638-bdd8-1eceac56915e"]["name"], "Ringwood Hotel")
+
+        grouped = self.storage.load_many_to_many_data('data/place_to_amenity.json')
+        self.assertEqual(len(grouped["90c83333-35d4-4638-bdd8-1eceac56915e"]), 3)
+
+    def test_row_level_writes(self):
+        """ Tests that changes made on a loaded table are committed row by row """
+        cities = self.storage.load_table('data/city.json', "City", indexes=["country_id"])
+        self.storage.open_journal()
+        city_id = next(iter(cities))
+        cities.update(city_id, {"name": "Geelong"})
+        cities.insert({"id": "c2", "country_id": "au", "name": "Perth",
+                       "created_at": 1.0, "updated_at": 1.0})
+        self.storage.save_table(cities)
+
+        reopened = SQLiteStorage(self.db_file, fsync="none")
+        rows = reopened.load_model_data('data/city.json')
+        reopened.close()
+        self.assertEqual(rows[city_id]["name"], "Geelong")
+        self.assertEqual(rows["c2"]["name"], "Perth")
+
+    def test_refresh(self):
+        """ Tests that a process sees the rows another one has written """
+        cities = self.storage.load_table('data/city.json', "City", indexes=["country_id"])
+        self.storage.open_journal()
+        other = SQLiteStorage(self.db_file, fsync="none")
+        other_cities = other.lazy_table('data/city.json', "City", indexes=["country_id"])
+        other.open_journal()
+        self.assertEqual(len(other_cities), len(cities))
+        other.refresh()
+
+        cities.insert({"id": "c2", "country_id": "au", "name": "Perth",
+                       "created_at": 1.0, "updated_at": 1.0})
+        self.storage.save_table(cities)
+
+        # our own writes don't make the table stale
+        self.assertEqual(self.storage.refresh(), [])
+        self.assertEqual(other.refresh(), ["City"])
+        self.assertEqual(other_cities["c2"]["name"], "Perth")
+        self.assertEqual(other.refresh(), [])
+        self.assertIsNotNone(other.shared_version("City"))
+        self.assertEqual(other.shared_version("City"), self.storage.shared_version("City"))
+
+        # and changes made after the reload are still written
+        other_cities.update("c2", {"name": "Fremantle"})
+        # not committed yet: no shared version
+        self.assertIsNone(other.shared_version("City"))
+        other.save_table(other_cities)
+        self.assertNotEqual(other.shared_version("City"), self.storage.shared_version("City"))
+        self.assertEqual(self.storage.refresh(), ["City"])
+        self.assertEqual(cities["c2"]["name"], "Fremantle")
+        self.assertEqual(other.shared_version("City"), self.storage.shared_version("City"))
+        other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
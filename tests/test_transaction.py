@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+""" Unittests for HBnB Evolution Part 1 """
+
+import json
+import os
+import tempfile
+import unittest
+from data.file_storage import FileStorage
+from data.sqlite_storage import SQLiteStorage
+
+class TestTransaction(unittest.TestCase):
+    """Test that transactions change several tables all together or not at all
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.place_file = os.path.join(self.tmp_dir.name, "place.json")
+        self.link_file = os.path.join(self.tmp_dir.name, "place_to_amenity.json")
+        self.batch_file = os.path.join(self.tmp_dir.name, "batch.json")
+        self.journal_file = os.path.join(self.tmp_dir.name, "journal.ndjson")
+        with open(self.place_file, 'w') as f:
+            json.dump({"Place": [{"id": "p1", "name": "Ringwood Hotel"}]}, f)
+        with open(self.link_file, 'w') as f:
+            json.dump({"Place_to_Amenity": [{"place_id": "p1", "amenity_id": "a1"}]}, f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def open_storage(self, **kwargs):
+        storage = FileStorage(batch_file=self.batch_file, **kwargs)
+        places = storage.lazy_table(self.place_file, "Place")
+        links = storage.lazy_many_to_many_data(self.link_file, "Place_to_Amenity")
+        storage.open_journal()
+        return storage, places, links
+
+    def read_back(self, filename):
+        with open(filename, 'r') as f:
+            return json.load(f)
+
+    def test_commit(self):
+        """ Tests that the changes to both tables are saved together """
+        storage, places, links = self.open_storage()
+        with storage.transaction() as transaction:
+            transaction.insert(places, {"id": "p2", "name": "Beach House"})
+            transaction.link(links, "p2", "a1")
+            transaction.link(links, "p2", "a2")
+
+        self.assertEqual(links["p2"], ["a1", "a2"])
+        self.assertEqual(len(self.read_back(self.place_file)["Place"]), 2)
+        self.assertEqual(len(self.read_back(self.link_file)["Place_to_Amenity"]), 3)
+        self.assertFalse(os.path.exists(self.batch_file))
+
+        storage, places, links = self.open_storage()
+        self.assertEqual(places["p2"]["name"], "Beach House")
+        self.assertEqual(links["p2"], ["a1", "a2"])
+
+    def test_rollback(self):
+        """ Tests that nothing changes when the block raises or a change is invalid """
+        storage, places, links = self.open_storage()
+
+        with self.assertRaises(ValueError):
+            with storage.transaction() as transaction:
+                transaction.insert(places, {"id": "p2", "name": "Beach House"})
+                raise ValueError("Invalid place")
+
+        with self.assertRaises(ValueError):
+            with storage.transaction() as transaction:
+                transaction.link(links, "p1", "a2")
+                transaction.delete(places, "p1")
+                transaction.update(places, "p1", {"name": "Gone"})
+
+        self.assertEqual(list(places), ["p1"])
+        self.assertEqual(links["p1"], ["a1"])
+        self.assertEqual(len(self.read_back(self.place_file)["Place"]), 1)
+
+    def test_failed_save_is_undone(self):
+        """ Tests that the changes are undone when they can't be persisted """
+        storage, places, links = self.open_storage()
+        places.load()
+        os.mkdir(self.batch_file)
+
+        with self.assertRaises(IOError):
+            with storage.transaction() as transaction:
+                transaction.update(places, "p1", {"name": "Renamed"})
+                transaction.unlink(links, "p1", "a1")
+
+        self.assertEqual(places["p1"]["name"], "Ringwood Hotel")
+        self.assertEqual(links["p1"], ["a1"])
+
+    def test_journal(self):
+        """ Tests that a transaction is journaled as a single record """
+        storage, places, links = self.open_storage(journal_file=self.journal_file, fsync="none")
+        with storage.transaction() as transaction:
+            transaction.delete(places, "p1")
+            transaction.unlink(links, "p1", "a1")
+
+        with open(self.journal_file, 'r') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record["type"] for record in records], ["batch"])
+        self.assertEqual(len(records[0]["records"]), 2)
+
+        storage, places, links = self.open_storage(journal_file=self.journal_file, fsync="none")
+        self.assertNotIn("p1", places)
+        self.assertNotIn("p1", links)
+
+    def test_interrupted_batch(self):
+        """ Tests that a batch left behind by a crash is finished on the next start """
+        with open(self.batch_file, 'w') as f:
+            json.dump({"type": "batch", "records": [
+                {"type": "Place", "op": "insert", "id": "p2", "data": {"id": "p2", "name": "Beach House"}},
+                {"type": "Place_to_Amenity", "op": "link", "id": "p2", "data": "a1"}
+            ]}, f)
+
+        storage, places, links = self.open_storage()
+
+        self.assertFalse(os.path.exists(self.batch_file))
+        self.assertEqual(len(self.read_back(self.place_file)["Place"]), 2)
+        self.assertIn({"place_id": "p2", "amenity_id": "a1"},
+                      self.read_back(self.link_file)["Place_to_Amenity"])
+
+    def test_sqlite(self):
+        """ Tests that the SQLite storage commits a transaction in one go """
+        storage = SQLiteStorage(os.path.join(self.tmp_dir.name, "hbnb.db"), fsync="none")
+        storage.save_model_data(data={"Place": [{"id": "p1", "name": "Ringwood Hotel"}],
+                                      "Place_to_Amenity": []})
+        places = storage.lazy_table('place.json', "Place")
+        links = storage.lazy_many_to_many_data('place_to_amenity.json', "Place_to_Amenity")
+        storage.open_journal()
+
+        with storage.transaction() as transaction:
+            transaction.update(places, "p1", {"name": "Beach House"})
+            transaction.link(links, "p1", "a1")
+
+        self.assertEqual(storage.load_model_data('place.json')["p1"]["name"], "Beach House")
+        self.assertEqual(storage.load_many_to_many_data('place_to_amenity.json'), {"p1": ["a1"]})
+        storage.close()
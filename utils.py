@@ -1,8 +1,152 @@
-from flask import jsonify
+import base64
+import binascii
+import functools
+import itertools
+import json
+from flask import Response, abort, current_app, jsonify, request
+
+# Streamed responses (stream_json_*) serialise the rows as they are sent,
+# in chunks of about STREAM_CHUNK_SIZE characters, so a large list is never
+# held in memory as a whole. The first chunk is built before the response is
+# returned: a row that can't be serialised there still gives a plain 500.
+# Past it the status has been sent, and an error cuts the response off, so
+# clients see an incomplete body rather than a complete 200.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# query string arguments of the collection endpoints, see paginate
+PAGE_ARGS = ("limit", "cursor", "sort")
+# most rows a page can have
+MAX_PAGE_SIZE = 1000
 
 
 def pretty_json(data):
     """Utility function to return pretty-printed JSON response"""
     response = jsonify(data)
     response.headers.add('Content-Type', 'application/json')
-    return response
\ No newline at end of file
+    return response
+
+
+def stream_json_object(pairs):
+    """Utility function to return a JSON object response from (key, value) pairs,
+    serialising one value at a time"""
+    dumps = _compact_dumps()
+
+    def parts():
+        yield "{"
+        for number, (key, value) in enumerate(pairs):
+            yield ("," if number else "") + dumps(key) + ":" + dumps(value)
+        yield "}\n"
+
+    return _streamed(_chunked(parts()))
+
+
+def stream_json_fragments(rows, fragments):
+    """Utility function to return a JSON array response of rows, each encoded once
+    and then reused from the fragment cache (see api.fragments)"""
+    dumps = _compact_dumps()
+
+    def parts():
+        yield b"["
+        for number, row in enumerate(rows):
+            if number:
+                yield b","
+            yield fragments.get(row, dumps)
+        yield b"]\n"
+
+    return _streamed(_chunked(parts(), b""))
+
+
+def _compact_dumps():
+    """The app's JSON encoder, with the separators jsonify uses (outside debug mode):
+    with the newline jsonify ends with, a streamed body is the one pretty_json would send"""
+    return functools.partial(current_app.json.dumps, separators=(",", ":"))
+
+
+def _streamed(chunks):
+    """JSON response sending chunks, the first of which is built right away"""
+    first = next(chunks)
+    return Response(itertools.chain([first], chunks), mimetype="application/json")
+
+
+def _chunked(parts, empty=""):
+    """Group small strings (or bytes) into chunks of about STREAM_CHUNK_SIZE characters"""
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_SIZE:
+            yield empty.join(buffer)
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield empty.join(buffer)
+
+
+def paginate(table, default_sort="created_at"):
+    """Utility function to return the rows asked for by the limit, cursor and sort arguments
+
+    Without any of them, every row is returned (in no particular order).
+    Otherwise the rows are sorted by the sort field ("-name" for descending;
+    ties are broken by id) using the table's sorted index, and at most
+    limit rows following the cursor are returned. Returns (rows, headers):
+    headers holds the cursor of the next page as X-Next-Cursor, unless
+    this is the last page. Aborts with a 400 on invalid arguments.
+    """
+    if not any(arg in request.args for arg in PAGE_ARGS):
+        return table.iter_rows(), {}
+
+    sort = request.args.get("sort", default_sort)
+    field = sort[1:] if sort.startswith("-") else sort
+    if field not in table.sorted_indexes:
+        abort(400, f"Invalid sort: {sort} (sortable fields: {', '.join(table.sorted_indexes)})")
+
+    limit = request.args.get("limit")
+    if limit is not None:
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+            abort(400, f"Invalid limit: must be between 1 and {MAX_PAGE_SIZE}")
+        limit = int(limit)
+
+    after = None
+    if "cursor" in request.args:
+        after = _decode_cursor(request.args["cursor"], sort)
+
+    # one row more than asked for, to know whether there is a next page
+    rows = table.page(field, after, None if limit is None else limit + 1, descending=sort.startswith("-"))
+    if limit is None or len(rows) <= limit:
+        return rows, {}
+
+    rows = rows[:limit]
+    return rows, {"X-Next-Cursor": _encode_cursor(sort, table.sort_key(rows[-1], field))}
+
+
+def _encode_cursor(sort, key):
+    """Opaque cursor: the sort order and the sort key of the last row of a page"""
+    text = json.dumps([sort] + list(key))
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor, sort):
+    """Sort key held by a cursor; aborts with a 400 if it is not one of ours for this sort"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        # [sort, has a value, kind, value, id], see Repository.sort_key
+        valid = (isinstance(key, list) and len(key) == 5 and key[0] == sort
+                 and isinstance(key[1], bool) and isinstance(key[2], str) and isinstance(key[4], str)
+                 and _matches_kind(key[1], key[2], key[3]))
+    except (ValueError, UnicodeError, binascii.Error):
+        valid = False
+    if not valid:
+        abort(400, "Invalid cursor")
+
+    return tuple(key[1:])
+
+
+def _matches_kind(has_value, kind, value):
+    """Whether a cursor's value is of the kind it claims, so it compares with the index's keys"""
+    if not has_value:
+        return kind == "" and value is None
+    if kind == "":
+        return isinstance(value, (int, float))
+    return isinstance(value, str)